@@ -5,17 +5,20 @@
 """
 
 import abc
+import numpy as np
+
 
 class Cache:
     __metaclass__ = abc.ABCMeta
     all = ["access",
+           "access_batch",
            "get",
-           "access",
+           "access_req",
            "evict",
            "_update",
            "_insert"]
 
-    @abc.abstractclassmethod
+    @abc.abstractmethod
     def __init__(self, cache_size, **kwargs):
         self.cache_size = cache_size
         if self.cache_size <= 0:
@@ -73,6 +76,46 @@ class Cache:
         """
         raise NotImplementedError("_insert is not implemented")
 
+    def access_req(self, req, **kwargs):
+        """
+        access the cache with a Req, caches that do not use size, op or cost only need the item id,
+        so the type of the request is decided here instead of in every access
+
+        :param **kwargs:
+        :param req: a Req
+        :return: the return of access
+        """
+        return self.access(req.item_id, **kwargs)
+
+    def access_batch(self, ids, sizes=None, **kwargs):
+        """
+        access the cache with a batch of requests, the result is the same as calling access on each request,
+        this loops over access, caches override it to avoid the per-request overhead
+
+        :param ids: a numpy array or a list of item ids, such as the label column of reader.read_batch
+        :param sizes: the sizes of requests, not used by caches that count objects
+        :param **kwargs: passed to access
+        :return: a tuple of a numpy bool array of whether each request is a hit, and the number of evictions,
+                    which is -1 if the cache does not support len
+        """
+
+        hits = bytearray(len(ids))
+        access = self.access
+        try:
+            num_of_evictions = len(self)
+        except TypeError:
+            num_of_evictions = None
+        for i, req_id in enumerate(ids.tolist() if isinstance(ids, np.ndarray) else ids):
+            if access(req_id, **kwargs):
+                hits[i] = 1
+        hits = np.frombuffer(hits, dtype=np.bool_)
+        if num_of_evictions is None:
+            num_of_evictions = -1
+        else:
+            # every miss inserts an object, the objects that are not in the cache any more are evicted
+            num_of_evictions = len(hits) - int(np.count_nonzero(hits)) - (len(self) - num_of_evictions)
+        return hits, num_of_evictions
+
     def __contains__(self, req_id):
         return bool(self.has(req_id))
 
@@ -1,259 +1,172 @@
 # coding=utf-8
 """
-ARC algorithm, this algorithm has been modified on 02/14/2017, but not tested, may contain bugs
+    ARC (Megiddo and Modha, FAST 2003)
 
-NEED RE-IMPLEMENTATION
+    the cache is split into T1 (objects requested once recently) and T2 (objects requested at least twice),
+    the ids of objects recently evicted from T1 and T2 are kept in the ghost lists B1 and B2,
+    p is the target size of T1, a hit in B1 increases p and a hit in B2 decreases it,
+    the lists are bounded as in the paper, |T1| + |B1| <= cache_size and |T1| + |T2| + |B1| + |B2| <= 2 * cache_size
+
+    each list is an OrderedDict ordered from LRU to MRU, so every request costs O(1),
+    p is kept an integer, the ratio of ghost list sizes used to adapt it is rounded down
+
+    num_of_b1_hits and num_of_b2_hits count the adaptation events (the requests that increase or decrease p)
 
 """
 
-from collections import defaultdict
+from collections import OrderedDict
 
 from PyMimircache.cache.abstractCache import Cache
-from PyMimircache.utils.linkedList import LinkedList
 
 
 class ARC(Cache):
-    def __init__(self, cache_size=1000, p=0.5, ghostlist_size=-1, **kwargs):
+    def __init__(self, cache_size=1000, **kwargs):
         """
-
-        :param cache_size:
-        :param p: the position to separate cache for LRU1 and LRU2
-        :param ghostlist_size:
-        :return:
+        :param cache_size: the max number of objects in the cache
         """
-        super().__init__(cache_size, **kwargs)
-        self.p = p
-        if ghostlist_size == -1:
-            self.ghostlist_size = self.cache_size
-        self.inserted_element = None    # used to record the element just inserted
-
-        # dict/list2 is for referenced more than once
-        self.linked_list_1 = LinkedList()
-        self.linked_list_2 = LinkedList()
-        self.lru_list_head_p1 = None
-        self.lru_list_head_p2 = None
 
-        # key -> linked list node (in reality, it should also contains value)
-        self.cache_dict1 = dict()
-        # key -> linked list node (in reality, it should also contains value)
-        self.cache_dict2 = dict()
-        self.cache_dict1_ghost = defaultdict(
-            lambda: 0)  # key -> linked list node (in reality, it should also contains value)
-        self.cache_dict2_ghost = defaultdict(
-            lambda: 0)  # key -> linked list node (in reality, it should also contains value)
+        super().__init__(cache_size, **kwargs)
+        # the target size of T1
+        self.p = 0
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+        self.num_of_b1_hits = 0
+        self.num_of_b2_hits = 0
 
     def has(self, req_id, **kwargs):
         """
         :param **kwargs:
         :param req_id: the element for search
-        :return: whether the given element is in the cache
+        :return: whether the given element is in the cache (ghost entries are not in the cache)
         """
-        if req_id in self.cache_dict1 or req_id in self.cache_dict2:
-            return True
-        else:
-            return False
+
+        return req_id in self.t1 or req_id in self.t2
 
     def check_ghost_list(self, element):
         """
         :param element: the element for search
-        :return: whether the given element is in the cache
+        :return: whether the given element is in the ghost lists
         """
-        if element in self.cache_dict1_ghost or element in self.cache_dict2_ghost:
-            return True
-        else:
-            return False
+
+        return element in self.b1 or element in self.b2
 
     def _update(self, req_item, **kwargs):
-        """ the given element is in the cache, now update it to new location
+        """ the given element is in the cache, now move it to the MRU end of T2
         :param **kwargs:
         :param req_item:
         :return: None
         """
-        if req_item in self.cache_dict1:
-            # move to part2
-            # get the node and remove from part1, size of part1 reduced by 1
-            node = self.cache_dict1[req_item]
 
-            if node == self.lru_list_head_p1:
-                self.lru_list_head_p1 = self.lru_list_head_p1.next
-            self.linked_list_1.remove_node(node)
+        if req_item in self.t1:
+            del self.t1[req_item]
+            self.t2[req_item] = True
+        else:
+            self.t2.move_to_end(req_item)
 
-            del self.cache_dict1[req_item]
+    def _replace(self, in_b2=False):
+        """
+        move the LRU object of T1 to B1 if T1 is larger than its target, otherwise move the LRU object of T2 to B2
 
-            # insert into part2
-            self.linked_list_2.insert_node_at_tail(node)
-            self.cache_dict2[node.content] = node
-            # delete one from part1, insert one into part2, the total size should not change, just the balance changes
-            # check whether lru_list_head_p2 has been initialized or not
-            if not self.lru_list_head_p2:
-                self.lru_list_head_p2 = node
+        :param in_b2: whether the missed request is in B2
+        :return: the evicted element
+        """
 
+        t1 = self.t1
+        if t1 and (len(t1) > self.p or (in_b2 and len(t1) == self.p) or not self.t2):
+            req_id, _ = t1.popitem(last=False)
+            self.b1[req_id] = True
         else:
-            node = self.cache_dict2[req_item]
-            if node == self.lru_list_head_p2 and node.next:
-                self.lru_list_head_p2 = self.lru_list_head_p2.next
-
-            self.linked_list_2.move_node_to_tail(node)
+            req_id, _ = self.t2.popitem(last=False)
+            self.b2[req_id] = True
+        return req_id
 
     def _insert(self, req_item, **kwargs):
         """
-        the given element is not in the cache, now insert it into cache
+        the given element is not in the cache, now insert it into cache,
+        p is adapted if it is in a ghost list
         :param **kwargs:
         :param req_item:
         :return: evicted element or None
         """
-        return_content = None
-        if self.linked_list_1.size + self.linked_list_2.size >= self.cache_size:
-            # needs to evict one req_item, depend on ghost list to decide evict from part1 or part2
-            return_content = self.evict()
 
-        # insert into part 1
-        node = self.linked_list_1.insert_at_tail(req_item)
-        self.cache_dict1[req_item] = node
-        if not self.lru_list_head_p1:
-            self.lru_list_head_p1 = node
-        self.inserted_element = req_item
-        return return_content
+        t1, t2, b1, b2 = self.t1, self.t2, self.b1, self.b2
+        cache_size = self.cache_size
+        is_full = len(t1) + len(t2) >= cache_size
+        evicted = None
+
+        if req_item in b1:
+            self.num_of_b1_hits += 1
+            self.p = min(self.p + max(len(b2) // len(b1), 1), cache_size)
+            del b1[req_item]
+            if is_full:
+                evicted = self._replace()
+            t2[req_item] = True
+
+        elif req_item in b2:
+            self.num_of_b2_hits += 1
+            self.p = max(self.p - max(len(b1) // len(b2), 1), 0)
+            del b2[req_item]
+            if is_full:
+                evicted = self._replace(in_b2=True)
+            t2[req_item] = True
+
+        else:
+            len_l1 = len(t1) + len(b1)
+            if len_l1 >= cache_size:
+                if len(t1) < cache_size:
+                    b1.popitem(last=False)
+                    if is_full:
+                        evicted = self._replace()
+                else:
+                    # B1 is empty, the LRU object of T1 is evicted without a ghost entry
+                    evicted, _ = t1.popitem(last=False)
+            elif len_l1 + len(t2) + len(b2) >= cache_size:
+                if len_l1 + len(t2) + len(b2) >= 2 * cache_size:
+                    b2.popitem(last=False)
+                if is_full:
+                    evicted = self._replace()
+            t1[req_item] = True
+
+        return evicted
 
     def _print_cache_line(self):
-        print('list 1(including ghost list): ')
-        for i in self.linked_list_1:
-            try:
-                print(i.content, end='\t')
-            except:
-                print(i.content)
-        print('\nlist 2(including ghost list): ')
-        for i in self.linked_list_2:
-            try:
-                print(i.content, end='\t')
-            except:
-                print(i.content)
-        print(' ')
+        for name in ("t1", "t2", "b1", "b2"):
+            print("{}: {}".format(name, "\t".join(str(i) for i in getattr(self, name))))
 
     def evict(self, **kwargs):
         """
-        evict one element from the cache line into ghost list, then check ghost list,
-        if oversize, then evict one from ghost list
+        evict one element from the cache into a ghost list
         :param **kwargs:
-        :param: element: the missed request
-        :return: content of element evicted into ghost list
+        :return: the evicted element
         """
-        return_content = None
 
-        if self.inserted_element and self.inserted_element in self.cache_dict1_ghost and len(self.cache_dict2) > 0:
-            # evict one from part2 LRU, add into ghost list
-            return_content = content = self.lru_list_head_p2.content
-            del self.cache_dict2[content]
-            self.lru_list_head_p2 = self.lru_list_head_p2.next
-            self.cache_dict2_ghost[content] += 1
-
-            if (self.linked_list_2.size - len(self.cache_dict2)) > self.ghostlist_size:
-                # the first part is the size of ghost list of part2
-                content = self.linked_list_2.remove_from_head()
-                if self.cache_dict2_ghost[content] == 1:
-                    del self.cache_dict2_ghost[content]
-                else:
-                    self.cache_dict2_ghost[content] -= 1
-                assert (self.linked_list_2.size -
-                        len(self.cache_dict2)) == self.ghostlist_size
-
-        elif self.inserted_element and self.inserted_element in self.cache_dict2_ghost and len(self.cache_dict1) > 0:
-            # evict one from part1 LRU, add into ghost list
-            return_content = content = self.lru_list_head_p1.content
-            del self.cache_dict1[content]
-
-            self.lru_list_head_p1 = self.lru_list_head_p1.next
-            self.cache_dict1_ghost[content] += 1
-
-            if (self.linked_list_1.size - len(self.cache_dict1)) > self.ghostlist_size:
-                # the first part is the size of ghost list of part1
-                content = self.linked_list_1.remove_from_head()
-                if self.cache_dict1_ghost[content] == 1:
-                    del self.cache_dict1_ghost[content]
-                else:
-                    self.cache_dict1_ghost[content] -= 1
-                assert (self.linked_list_1.size -
-                        len(self.cache_dict1)) == self.ghostlist_size
-
-        else:
-            # not in any ghost list, check p value
-            if len(self.cache_dict2) == 0 or len(self.cache_dict1) / len(self.cache_dict2) > self.p:
-                # remove from part1
-                return_content = content = self.lru_list_head_p1.content
-                del self.cache_dict1[content]
-
-                self.lru_list_head_p1 = self.lru_list_head_p1.next
-                self.cache_dict1_ghost[content] += 1
-
-                if (self.linked_list_1.size - len(self.cache_dict1)) > self.ghostlist_size:
-                    # the first part is the size of ghost list of part1
-                    content = self.linked_list_1.remove_from_head()
-                    if self.cache_dict1_ghost[content] == 1:
-                        del self.cache_dict1_ghost[content]
-                    else:
-                        self.cache_dict1_ghost[content] -= 1
-                    assert (self.linked_list_1.size -
-                            len(self.cache_dict1)) == self.ghostlist_size
-            else:
-                # remove from part2
-                return_content = content = self.lru_list_head_p2.content
-                del self.cache_dict2[content]
-
-                self.lru_list_head_p2 = self.lru_list_head_p2.next
-                self.cache_dict2_ghost[content] += 1
-
-                if (self.linked_list_2.size - len(self.cache_dict2)) > self.ghostlist_size:
-                    # the first part is the size of ghost list of part2
-                    content = self.linked_list_2.remove_from_head()
-                    if self.cache_dict2_ghost[content] == 1:
-                        del self.cache_dict2_ghost[content]
-                    else:
-                        self.cache_dict2_ghost[content] -= 1
-                    assert (self.linked_list_2.size -
-                            len(self.cache_dict2)) == self.ghostlist_size
-
-        return return_content
-
-    # for debug
-    def _check_lru_list_p(self):
-        size1 = sum(i for i in self.cache_dict1_ghost.values())
-        node1 = self.linked_list_1.head.next
-        for i in range(size1):
-            node1 = node1.next
-        assert node1 == self.lru_list_head_p1, "LRU list1 head pointer wrong"
-
-        size2 = sum(i for i in self.cache_dict2_ghost.values())
-        node2 = self.linked_list_2.head.next
-        for i in range(size2):
-            node2 = node2.next
-        print(size2)
-        if node2:
-            print(node2.content)
-        else:
-            print(node2)
-        if self.lru_list_head_p2:
-            print(self.lru_list_head_p2.content)
-        else:
-            print(self.lru_list_head_p2)
-        assert node2 == self.lru_list_head_p2, "LRU list2 head pointer wrong"
+        assert len(self.t1) + len(self.t2), "cannot evict from an empty cache"
+        return self._replace()
 
     def access(self, req_item, **kwargs):
         """
-        :param **kwargs: 
+        :param **kwargs:
         :param req_item: the element in the reference, it can be in the cache, or not
-        :return: None
+        :return: True if element in the cache
         """
-        if self.has(req_item, ):
-            self._update(req_item, )
-            # self.printCacheLine()
-            # self._check_lru_list_p()
+
+        t1 = self.t1
+        if req_item in t1:
+            del t1[req_item]
+            self.t2[req_item] = True
+            return True
+        elif req_item in self.t2:
+            self.t2.move_to_end(req_item)
             return True
         else:
             self._insert(req_item, )
-            # self.printCacheLine()
-            # self._check_lru_list_p()
             return False
 
+    def __len__(self):
+        return len(self.t1) + len(self.t2)
+
     def __repr__(self):
-        return "ARC, given size: {}, current part1 size: {}, part2 size: {}".format(
-            self.cache_size, self.linked_list_1.size, self.linked_list_2.size)
+        return "ARC, given size: {}, T1 size: {}, T2 size: {}, B1 size: {}, B2 size: {}, p: {}".format(
+            self.cache_size, len(self.t1), len(self.t2), len(self.b1), len(self.b2), self.p)
@@ -0,0 +1,117 @@
+# coding=utf-8
+
+"""
+    FIFO for dense integer ids, the counterpart of ArrayLRU,
+    the cached ids are kept in a ring buffer in insertion order and the id index maps an id to
+    its position in the ring (plus 1, 0 if not cached), so there is no per-object python object
+
+"""
+
+from array import array
+from PyMimircache.cache.abstractCache import Cache
+from PyMimircache.cache.arrayLRU import DEF_NUM_OF_IDS, grow_id_index
+
+
+class ArrayFIFO(Cache):
+    """
+    FIFO for dense integer ids, backed by arrays
+
+    """
+
+    def __init__(self, cache_size, num_of_ids=DEF_NUM_OF_IDS, **kwargs):
+        """
+        :param cache_size: the max number of objects in the cache
+        :param num_of_ids: the initial size of the id index, ids are in [0, num_of_ids),
+                            for example the number of unique labels, it grows on a larger id
+        """
+
+        super().__init__(cache_size, **kwargs)
+        assert cache_size < 1 << 31, "cache size must be smaller than 2^31"
+        self.ring = array("q", bytes(8 * cache_size))
+        self.id_index = array("i", bytes(4 * max(num_of_ids, 1)))
+        # the position of the oldest object in the ring and the number of cached objects
+        self.head = 0
+        self.num_of_used = 0
+
+    def has(self, req_id, **kwargs):
+        """
+        check whether the given id in the cache or not
+
+        :return: whether the given element is in the cache
+        """
+
+        return 0 <= req_id < len(self.id_index) and self.id_index[req_id] != 0
+
+    def _update(self, req_id, **kwargs):
+        """ the given element is in the cache, FIFO does not change its position
+
+        :param **kwargs:
+        :param req_id:
+        :return: None
+        """
+
+        pass
+
+    def _insert(self, req_id, **kwargs):
+        """
+        the given element is not in the cache, now insert it into cache,
+        the oldest object is evicted first if the cache is full
+
+        :param **kwargs:
+        :param req_id:
+        :return: evicted id or None
+        """
+
+        assert req_id >= 0, "array caches only support non-negative integer ids, got {}".format(req_id)
+        if req_id >= len(self.id_index):
+            grow_id_index(self.id_index, req_id)
+        evicted = None
+        if self.num_of_used == self.cache_size:
+            evicted = self.evict()
+        pos = self.head + self.num_of_used
+        if pos >= self.cache_size:
+            pos -= self.cache_size
+        self.ring[pos] = req_id
+        self.id_index[req_id] = pos + 1
+        self.num_of_used += 1
+        return evicted
+
+    def evict(self, **kwargs):
+        """
+        evict the oldest object
+
+        :param **kwargs:
+        :return: id of evicted object
+        """
+
+        req_id = self.ring[self.head]
+        self.id_index[req_id] = 0
+        self.head += 1
+        if self.head == self.cache_size:
+            self.head = 0
+        self.num_of_used -= 1
+        return req_id
+
+    def access(self, req_id, **kwargs):
+        """
+        request access cache, it updates cache metadata,
+        it is the underlying method for both get and put
+
+        :param **kwargs:
+        :param req_id: the id of the request, a non-negative integer
+        :return: True if hit, otherwise False
+        """
+
+        id_index = self.id_index
+        if 0 <= req_id < len(id_index) and id_index[req_id]:
+            return True
+        else:
+            self._insert(req_id)
+            return False
+
+    def __len__(self):
+        return self.num_of_used
+
+    def __repr__(self):
+        return "ArrayFIFO cache of size: {}, current size: {}, {}".\
+            format(self.cache_size, self.num_of_used, super().__repr__())
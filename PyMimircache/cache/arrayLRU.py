@@ -0,0 +1,178 @@
+# coding=utf-8
+
+"""
+    LRU for dense integer ids (for example ids from a reader with a LabelTable),
+    the recency list and the id index live in preallocated arrays instead of an OrderedDict,
+    so a cached object costs a few machine integers instead of a dict entry and a list node,
+    which allows simulating caches of 100M objects within memory
+
+    the cache has cache_size slots, slot 0 is the head of a circular doubly linked list,
+    prev and next of slot i are prev[i] and next[i], head.next is the most recently used object,
+    the slot of id x is id_index[x] (0 if not cached), the index grows when a larger id is seen
+
+"""
+
+from array import array
+from PyMimircache.cache.abstractCache import Cache
+
+
+# the initial number of ids in the id index if the max id is not given
+DEF_NUM_OF_IDS = 1 << 16
+
+
+def grow_id_index(id_index, req_id):
+    """
+    grow the id index (filled with 0) so that req_id is a valid index, the size is at least doubled
+
+    :param id_index: an array indexed by id
+    :param req_id: a non-negative integer id
+    """
+
+    assert req_id >= 0, "array caches only support non-negative integer ids, got {}".format(req_id)
+    new_size = max(req_id + 1, 2 * len(id_index))
+    id_index.frombytes(bytes(id_index.itemsize * (new_size - len(id_index))))
+
+
+class ArrayLRU(Cache):
+    """
+    LRU for dense integer ids, backed by arrays
+
+    """
+
+    def __init__(self, cache_size, num_of_ids=DEF_NUM_OF_IDS, **kwargs):
+        """
+        :param cache_size: the max number of objects in the cache
+        :param num_of_ids: the initial size of the id index, ids are in [0, num_of_ids),
+                            for example the number of unique labels, it grows on a larger id
+        """
+
+        super().__init__(cache_size, **kwargs)
+        assert cache_size < 1 << 31, "cache size must be smaller than 2^31"
+        self.prev = array("i", bytes(4 * (cache_size + 1)))
+        self.next = array("i", bytes(4 * (cache_size + 1)))
+        self.id_of_slot = array("q", bytes(8 * (cache_size + 1)))
+        self.id_index = array("i", bytes(4 * max(num_of_ids, 1)))
+        # the number of slots in use, the used slots are 1..num_of_used
+        self.num_of_used = 0
+
+    def has(self, req_id, **kwargs):
+        """
+        check whether the given id in the cache or not
+
+        :return: whether the given element is in the cache
+        """
+
+        return 0 <= req_id < len(self.id_index) and self.id_index[req_id] != 0
+
+    def _unlink(self, slot):
+        prev, nxt = self.prev, self.next
+        p, n = prev[slot], nxt[slot]
+        nxt[p] = n
+        prev[n] = p
+
+    def _link_front(self, slot):
+        prev, nxt = self.prev, self.next
+        n = nxt[0]
+        prev[slot] = 0
+        nxt[slot] = n
+        prev[n] = slot
+        nxt[0] = slot
+
+    def _update(self, req_id, **kwargs):
+        """ the given element is in the cache,
+        now move it to the most recently used position
+
+        :param **kwargs:
+        :param req_id:
+        :return: None
+        """
+
+        slot = self.id_index[req_id]
+        if self.next[0] != slot:
+            self._unlink(slot)
+            self._link_front(slot)
+
+    def _insert(self, req_id, **kwargs):
+        """
+        the given element is not in the cache, now insert it into cache,
+        the least recently used object is evicted first if the cache is full
+
+        :param **kwargs:
+        :param req_id:
+        :return: evicted id or None
+        """
+
+        assert req_id >= 0, "array caches only support non-negative integer ids, got {}".format(req_id)
+        if req_id >= len(self.id_index):
+            grow_id_index(self.id_index, req_id)
+        evicted = None
+        if self.num_of_used == self.cache_size:
+            evicted = self.evict()
+        self.num_of_used += 1
+        slot = self.num_of_used
+        self.id_of_slot[slot] = req_id
+        self.id_index[req_id] = slot
+        self._link_front(slot)
+        return evicted
+
+    def evict(self, **kwargs):
+        """
+        evict the least recently used object,
+        the last used slot is moved into its slot, so used slots are always 1..num_of_used
+
+        :param **kwargs:
+        :return: id of evicted object
+        """
+
+        prev, nxt, id_of_slot = self.prev, self.next, self.id_of_slot
+        slot = prev[0]
+        self._unlink(slot)
+        req_id = id_of_slot[slot]
+        self.id_index[req_id] = 0
+
+        last = self.num_of_used
+        if slot != last:
+            p, n = prev[last], nxt[last]
+            prev[slot], nxt[slot] = p, n
+            nxt[p] = slot
+            prev[n] = slot
+            id_of_slot[slot] = id_of_slot[last]
+            self.id_index[id_of_slot[slot]] = slot
+        self.num_of_used -= 1
+        return req_id
+
+    def access(self, req_id, **kwargs):
+        """
+        request access cache, it updates cache metadata,
+        it is the underlying method for both get and put
+
+        :param **kwargs:
+        :param req_id: the id of the request, a non-negative integer
+        :return: True if hit, otherwise False
+        """
+
+        id_index = self.id_index
+        if 0 <= req_id < len(id_index) and id_index[req_id]:
+            # _update inlined, this is the hot path
+            slot = id_index[req_id]
+            prev, nxt = self.prev, self.next
+            head_next = nxt[0]
+            if head_next != slot:
+                p, n = prev[slot], nxt[slot]
+                nxt[p] = n
+                prev[n] = p
+                prev[slot] = 0
+                nxt[slot] = head_next
+                prev[head_next] = slot
+                nxt[0] = slot
+            return True
+        else:
+            self._insert(req_id)
+            return False
+
+    def __len__(self):
+        return self.num_of_used
+
+    def __repr__(self):
+        return "ArrayLRU cache of size: {}, current size: {}, {}".\
+            format(self.cache_size, self.num_of_used, super().__repr__())
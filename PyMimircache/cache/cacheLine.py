@@ -7,24 +7,26 @@ this module contains the CacheLine class, which describes a cacheLine
 
 
 class CacheLine:
+    """
+    a cached item, slotted so that it has no per-instance __dict__
+    """
+
+    __slots__ = ("item_id", "size", "op", "cost")
+
     def __init__(self, item_id, size=1, op=None, cost=-1, **kwargs):
-        self._item_id = item_id
-        self._size = size
-        self._op = op
-        self._cost = cost
-
-    @property
-    def item_id(self):
-        return self._item_id
-
-    @property
-    def size(self):
-        return self._size
-
-    @property
-    def op(self):
-        return self._op
-
-    @property
-    def cost(self):
-        return self._cost
+        self.item_id = item_id
+        self.size = size
+        self.op = op
+        self.cost = cost
+
+    @classmethod
+    def from_req(cls, req):
+        """
+        :param req: a Req
+        :return: the CacheLine of the request
+        """
+
+        return cls(req.item_id, req.size, req.op, req.cost)
+
+    def __repr__(self):
+        return "CacheLine(item_id={}, size={}, op={}, cost={})".format(self.item_id, self.size, self.op, self.cost)
@@ -0,0 +1,153 @@
+# coding=utf-8
+"""
+    CAR, CLOCK with Adaptive Replacement (Bansal and Modha, FAST 2004)
+
+    CAR replaces the LRU lists T1 and T2 of ARC with two clocks, a hit only sets the reference bit,
+    the ghost lists B1 and B2, the adaptive target size p of T1 and the list bounds are the same as ARC,
+    on a miss in a full cache, the hand of T1 (if T1 is not smaller than p) or of T2 moves
+    until it finds an object without reference, a referenced object in T1 moves to T2,
+    a referenced object in T2 moves to the tail of T2, and the object found is evicted into B1 or B2
+
+    each clock is an OrderedDict of id -> reference bit, the hand is at the first item,
+    so setting the reference bit does not move the object and each step of a hand is O(1)
+
+    num_of_b1_hits and num_of_b2_hits count the adaptation events (the requests that increase or decrease p)
+
+"""
+
+from collections import OrderedDict
+
+from PyMimircache.cache.abstractCache import Cache
+
+
+class CAR(Cache):
+    def __init__(self, cache_size=1000, **kwargs):
+        """
+        :param cache_size: the max number of objects in the cache
+        """
+
+        super().__init__(cache_size, **kwargs)
+        # the target size of T1
+        self.p = 0
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+        self.num_of_b1_hits = 0
+        self.num_of_b2_hits = 0
+
+    def has(self, req_id, **kwargs):
+        """
+        :param **kwargs:
+        :param req_id: the element for search
+        :return: whether the given element is in the cache (ghost entries are not in the cache)
+        """
+
+        return req_id in self.t1 or req_id in self.t2
+
+    def _update(self, req_item, **kwargs):
+        """ the given element is in the cache, now set its reference bit
+        :param **kwargs:
+        :param req_item:
+        :return: None
+        """
+
+        if req_item in self.t1:
+            self.t1[req_item] = 1
+        else:
+            self.t2[req_item] = 1
+
+    def _replace(self):
+        """
+        move the hands until an object without reference is found and move it to its ghost list
+
+        :return: the evicted element
+        """
+
+        t1, t2 = self.t1, self.t2
+        while True:
+            if len(t1) >= max(self.p, 1) or not t2:
+                req_id, ref = t1.popitem(last=False)
+                if ref:
+                    t2[req_id] = 0
+                else:
+                    self.b1[req_id] = True
+                    return req_id
+            else:
+                req_id, ref = t2.popitem(last=False)
+                if ref:
+                    t2[req_id] = 0
+                else:
+                    self.b2[req_id] = True
+                    return req_id
+
+    def _insert(self, req_item, **kwargs):
+        """
+        the given element is not in the cache, now insert it into cache,
+        p is adapted if it is in a ghost list
+        :param **kwargs:
+        :param req_item:
+        :return: evicted element or None
+        """
+
+        t1, t2, b1, b2 = self.t1, self.t2, self.b1, self.b2
+        cache_size = self.cache_size
+        evicted = None
+        if len(t1) + len(t2) >= cache_size:
+            evicted = self._replace()
+
+        if req_item in b1:
+            self.num_of_b1_hits += 1
+            self.p = min(self.p + max(len(b2) // len(b1), 1), cache_size)
+            del b1[req_item]
+            t2[req_item] = 0
+        elif req_item in b2:
+            self.num_of_b2_hits += 1
+            self.p = max(self.p - max(len(b1) // len(b2), 1), 0)
+            del b2[req_item]
+            t2[req_item] = 0
+        else:
+            if len(t1) + len(b1) >= cache_size:
+                b1.popitem(last=False)
+            elif len(t1) + len(t2) + len(b1) + len(b2) >= 2 * cache_size:
+                b2.popitem(last=False)
+            t1[req_item] = 0
+        return evicted
+
+    def _print_cache_line(self):
+        for name in ("t1", "t2", "b1", "b2"):
+            print("{}: {}".format(name, "\t".join(str(i) for i in getattr(self, name))))
+
+    def evict(self, **kwargs):
+        """
+        evict one element from the cache into a ghost list
+        :param **kwargs:
+        :return: the evicted element
+        """
+
+        assert len(self.t1) + len(self.t2), "cannot evict from an empty cache"
+        return self._replace()
+
+    def access(self, req_item, **kwargs):
+        """
+        :param **kwargs:
+        :param req_item: the element in the reference, it can be in the cache, or not
+        :return: True if element in the cache
+        """
+
+        if req_item in self.t1:
+            self.t1[req_item] = 1
+            return True
+        elif req_item in self.t2:
+            self.t2[req_item] = 1
+            return True
+        else:
+            self._insert(req_item, )
+            return False
+
+    def __len__(self):
+        return len(self.t1) + len(self.t2)
+
+    def __repr__(self):
+        return "CAR, given size: {}, T1 size: {}, T2 size: {}, B1 size: {}, B2 size: {}, p: {}".format(
+            self.cache_size, len(self.t1), len(self.t2), len(self.b1), len(self.b2), self.p)
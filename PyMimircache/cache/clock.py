@@ -1,110 +1,190 @@
 # coding=utf-8
-from PyMimircache.cache.lru import LRU
 
+"""
+    CLOCK (second chance) on a ring buffer, the cached ids are kept in a fixed-size list of slots,
+    the reference counters in a bytearray of the same size, and a dict maps an id to its slot,
+    the hand scans the slots in order and the new object takes the slot of the evicted one,
+    so eviction walks contiguous memory and no node object is created per cached object
 
-class Clock(LRU):
+    with num_of_bits > 1, this is the k-bit CLOCK, the counter of an object is increased on each hit
+    up to 2^k - 1, and the hand decreases it instead of clearing it, so frequently used objects survive
+    more rounds of the hand (see KClock)
+
+"""
+
+import numpy as np
+from PyMimircache.cache.abstractCache import Cache
+
+
+class Clock(Cache):
     """
     second chance page replacement algorithm
     """
 
-    def __init__(self, cache_size=1000, **kwargs):
-        # use node id to represent the reference bit
+    def __init__(self, cache_size=1000, num_of_bits=1, **kwargs):
+        """
+        :param cache_size: the max number of objects in the cache
+        :param num_of_bits: the number of bits of the reference counter, 1 for the classic CLOCK
+        """
+
         super(Clock, self).__init__(cache_size, **kwargs)
-        self.hand = None  # points to the node for examination/eviction
+        assert 1 <= num_of_bits <= 8, "the number of bits must be in [1, 8]"
+        self.num_of_bits = num_of_bits
+        self.max_counter = (1 << num_of_bits) - 1
+        self.slots = [None] * cache_size
+        self.counters = bytearray(cache_size)
+        # id -> slot
+        self.slot_dict = {}
+        # points to the slot for examination/eviction
+        self.hand = 0
+        # the number of slots that have been used, and the slots freed by evict
+        self.num_of_used = 0
+        self.free_slots = []
+
+    def has(self, req_id, **kwargs):
+        """
+        :param **kwargs:
+        :param req_id:
+        :return: whether the given element is in the cache
+        """
+
+        return req_id in self.slot_dict
 
     def _update(self, req_item, **kwargs):
-        """ the given element is in the cache, now update it
+        """ the given element is in the cache, now increase its reference counter
         :param **kwargs:
         :param req_item:
         :return: None
         """
-        node = self.cache_dict[req_item]
-        node.id = 1
+
+        slot = self.slot_dict[req_item]
+        if self.counters[slot] < self.max_counter:
+            self.counters[slot] += 1
+
+    def _find_evict_slot(self):
+        """
+        move the hand until it points to a cached object with counter 0,
+        counters of objects passed by the hand are decreased
+
+        :return: the slot of the object to evict, the hand is moved past it
+        """
+
+        slots, counters, cache_size = self.slots, self.counters, self.cache_size
+        hand = self.hand
+        while True:
+            if counters[hand]:
+                counters[hand] -= 1
+            elif slots[hand] is not None:
+                break
+            hand += 1
+            if hand == cache_size:
+                hand = 0
+        self.hand = hand + 1 if hand + 1 < cache_size else 0
+        return hand
 
     def _insert(self, req_item, **kwargs):
         """
-        the given element is not in the cache, now insert it into cache
+        the given element is not in the cache, now insert it into cache,
+        an object is evicted first if the cache is full
         :param **kwargs:
         :param req_item:
-        :return: True on success, False on failure
+        :return: evicted element or None
         """
-        if self.cache_linked_list.size >= self.cache_size:
-            self.evict()
-
-        node = self.cache_linked_list.insert_at_tail(req_item, id=1)
-        self.cache_dict[req_item] = node
-        if not self.hand:
-            # this is the first req_item
-            assert self.cache_linked_list.size == 1, "insert req_item error"
-            self.hand = node
-
-    def _print_cache_line(self):
-        for i in self.cache_linked_list:
-            try:
-                print("{}({})".format(i.content, i.id), end='\t')
-            except:
-                print("{}({})".format(i.content, i.id))
-
-        print(' ')
-
-    def _find_evict_node(self):
-        node = self.hand
-        if node.id == 0:
-            self.hand = node.next
-            if not self.hand:
-                # tail
-                self.hand = self.cache_linked_list.next
-            return node
+
+        evicted = None
+        if len(self.slot_dict) >= self.cache_size:
+            slot = self._find_evict_slot()
+            evicted = self.slots[slot]
+            del self.slot_dict[evicted]
+        elif self.free_slots:
+            slot = self.free_slots.pop()
         else:
-            # set reference bit to 0
-            while node.id == 1:
-                node.set_id(0)
-                node = node.next
-                if not node:
-                    # tail
-                    node = self.cache_linked_list.head.next
-            self.hand = node.next
-            return node
+            slot = self.num_of_used
+            self.num_of_used += 1
+
+        self.slots[slot] = req_item
+        self.counters[slot] = 1
+        self.slot_dict[req_item] = slot
+        return evicted
 
     def evict(self, **kwargs):
         """
         evict one element from the cache line
         :param **kwargs:
-        :return: True on success, False on failure
+        :return: id of evicted element
         """
-        node = self._find_evict_node()
-        self.cache_linked_list.remove_node(node)
-        del self.cache_dict[node.content]
 
-        return True
+        assert len(self.slot_dict), "cannot evict from an empty cache"
+        slot = self._find_evict_slot()
+        evicted = self.slots[slot]
+        del self.slot_dict[evicted]
+        self.slots[slot] = None
+        self.free_slots.append(slot)
+        return evicted
 
     def access(self, req_item, **kwargs):
         """
-        :param **kwargs: 
+        :param **kwargs:
         :param req_item: the element in the reference, it can be in the cache, or not
-        :return: None
+        :return: True if element in the cache
         """
-        if self.has(req_item, ):
-            self._update(req_item, )
-            if len(self.cache_dict) != self.cache_linked_list.size:
-                print(
-                    "1*********########### ERROR detected in LRU size #############***********")
-                print("{}: {}".format(
-                    self.cache_linked_list.size, len(self.cache_dict)))
-                import sys
-                sys.exit(-1)
+
+        slot = self.slot_dict.get(req_item)
+        if slot is not None:
+            if self.counters[slot] < self.max_counter:
+                self.counters[slot] += 1
             return True
         else:
             self._insert(req_item, )
-            if len(self.cache_dict) != self.cache_linked_list.size:
-                print(
-                    "2*********########### ERROR detected in LRU size #############***********")
-                print("{}: {}".format(
-                    self.cache_linked_list.size, len(self.cache_dict)))
-                import sys
-                sys.exit(-1)
             return False
 
+    def access_batch(self, ids, sizes=None, **kwargs):
+        """
+        access the cache with a batch of requests, see Cache.access_batch
+
+        :param ids: a numpy array or a list of item ids
+        :param sizes: not used
+        :param **kwargs:
+        :return: a tuple of a numpy bool array of whether each request is a hit, and the number of evictions
+        """
+
+        hits = bytearray(len(ids))
+        slots, counters, slot_dict = self.slots, self.counters, self.slot_dict
+        max_counter, cache_size = self.max_counter, self.cache_size
+        get_slot = slot_dict.get
+        hand = self.hand
+        num_of_evictions = 0
+        for i, req_id in enumerate(ids.tolist() if isinstance(ids, np.ndarray) else ids):
+            slot = get_slot(req_id)
+            if slot is not None:
+                if counters[slot] < max_counter:
+                    counters[slot] += 1
+                hits[i] = 1
+            elif len(slot_dict) >= cache_size:
+                # the same as _find_evict_slot, inlined with no empty slot since the cache is full
+                while counters[hand]:
+                    counters[hand] -= 1
+                    hand += 1
+                    if hand == cache_size:
+                        hand = 0
+                del slot_dict[slots[hand]]
+                slots[hand] = req_id
+                counters[hand] = 1
+                slot_dict[req_id] = hand
+                hand += 1
+                if hand == cache_size:
+                    hand = 0
+                num_of_evictions += 1
+            else:
+                self.hand = hand
+                self._insert(req_id)
+                hand = self.hand
+        self.hand = hand
+        return np.frombuffer(hits, dtype=np.bool_), num_of_evictions
+
+    def __len__(self):
+        return len(self.slot_dict)
+
     def __repr__(self):
         return "second chance cache, given size: {}, current size: {}, {}".format(
-            self.cache_size, self.cache_linked_list.size, super().__repr__())
+            self.cache_size, len(self.slot_dict), super().__repr__())
@@ -0,0 +1,236 @@
+# coding=utf-8
+
+"""
+    CLOCK-Pro (Jiang, Chen and Zhang, USENIX ATC 2005) on a ring buffer
+
+    like Clock, resident objects are kept in a fixed-size list of slots, their reference and test bits
+    in a bytearray, whether they are hot in another bytearray, and a dict maps an id to its slot,
+    the new object takes the slot freed by the cold hand, two hands scan the slots:
+
+        hand_cold:  evicts a cold object without reference, a referenced cold object in its test period
+                    becomes hot, a referenced cold object not in its test period starts a test period
+        hand_hot:   demotes a hot object without reference to cold and clears the reference of the others,
+                    it also terminates the test period of the cold objects it passes
+
+    each hand skips the slots it does not stop at by searching the hot bytearray with bytearray.find,
+    so a scan over many hot (or cold) objects runs at memory speed instead of one python step per slot
+
+    the non-resident cold objects in their test period are kept in a FIFO ring of cache_size ids,
+    which plays the role of hand_test, an object that is requested again while it is in the ring
+    is inserted as hot and the target size of cold objects grows, an object that leaves the ring
+    without being requested shrinks the target size of cold objects
+
+"""
+
+import numpy as np
+from PyMimircache.cache.abstractCache import Cache
+
+
+REF = 1
+TEST = 2
+
+
+class ClockPro(Cache):
+    """
+    CLOCK-Pro with adaptive cold target
+    """
+
+    def __init__(self, cache_size=1000, init_cold_ratio=0.01, **kwargs):
+        """
+        :param cache_size: the max number of objects in the cache
+        :param init_cold_ratio: the initial target fraction of cold objects in the cache
+        """
+
+        super().__init__(cache_size, **kwargs)
+        assert cache_size >= 2, "CLOCK-Pro needs a cache size of at least 2"
+        assert 0 < init_cold_ratio < 1, "init_cold_ratio must be in (0, 1)"
+        self.slots = [None] * cache_size
+        self.flags = bytearray(cache_size)
+        self.hot = bytearray(cache_size)
+        # a numpy view of flags for clearing test bits of a range of slots
+        self._flags_view = np.frombuffer(self.flags, dtype=np.uint8)
+        # id -> slot
+        self.slot_dict = {}
+        self.num_of_used = 0
+        self.free_slots = []
+        self.hand_hot = 0
+        self.hand_cold = 0
+        self.num_of_hot = 0
+        self.cold_target = min(max(int(cache_size * init_cold_ratio), 1), cache_size - 1)
+
+        # non-resident cold objects in their test period, id -> position in the ring
+        self.test_ring = [None] * cache_size
+        self.test_dict = {}
+        self.test_pos = 0
+
+    def has(self, req_id, **kwargs):
+        """
+        :param **kwargs:
+        :param req_id:
+        :return: whether the given element is in the cache (non-resident objects are not in the cache)
+        """
+
+        return req_id in self.slot_dict
+
+    def _update(self, req_item, **kwargs):
+        """ the given element is in the cache, now set its reference bit
+        :param **kwargs:
+        :param req_item:
+        :return: None
+        """
+
+        self.flags[self.slot_dict[req_item]] |= REF
+
+    def _add_to_test_ring(self, req_item):
+        """
+        keep an evicted cold object in its test period,
+        the oldest non-resident object leaves the ring and ends its test period
+
+        :param req_item:
+        """
+
+        pos = self.test_pos
+        old = self.test_ring[pos]
+        if old is not None and self.test_dict.get(old) == pos:
+            del self.test_dict[old]
+            self.cold_target = max(self.cold_target - 1, 1)
+        self.test_ring[pos] = req_item
+        self.test_dict[req_item] = pos
+        self.test_pos = pos + 1 if pos + 1 < self.cache_size else 0
+
+    def _run_hand_hot(self):
+        """
+        move hand_hot until one hot object is demoted to cold
+        """
+
+        flags, hot, cache_size = self.flags, self.hot, self.cache_size
+        hand = self.hand_hot
+        while True:
+            next_hot = hot.find(1, hand)
+            if next_hot == -1:
+                self._flags_view[hand:] &= ~TEST & 0xff
+                hand = 0
+                next_hot = hot.find(1)
+            if next_hot > hand:
+                # the test periods of the cold objects passed by the hand are terminated
+                self._flags_view[hand: next_hot] &= ~TEST & 0xff
+            hand = next_hot
+            if flags[hand] & REF:
+                flags[hand] = 0
+            else:
+                hot[hand] = 0
+                self.num_of_hot -= 1
+                break
+            hand += 1
+            if hand == cache_size:
+                hand = 0
+        self.hand_hot = hand + 1 if hand + 1 < cache_size else 0
+
+    def _run_hand_cold(self):
+        """
+        move hand_cold until one cold object is evicted
+
+        :return: the slot of the evicted object
+        """
+
+        slots, flags, hot, cache_size = self.slots, self.flags, self.hot, self.cache_size
+        hand = self.hand_cold
+        while True:
+            hand = hot.find(0, hand)
+            if hand == -1:
+                hand = hot.find(0)
+            f = flags[hand]
+            if f & REF:
+                if f & TEST:
+                    hot[hand] = 1
+                    flags[hand] = 0
+                    self.num_of_hot += 1
+                    if self.num_of_hot > cache_size - self.cold_target:
+                        self._run_hand_hot()
+                else:
+                    flags[hand] = TEST
+            elif slots[hand] is not None:
+                break
+            hand += 1
+            if hand == cache_size:
+                hand = 0
+        self.hand_cold = hand + 1 if hand + 1 < cache_size else 0
+
+        evicted = slots[hand]
+        del self.slot_dict[evicted]
+        if f & TEST:
+            self._add_to_test_ring(evicted)
+        return hand
+
+    def _insert(self, req_item, **kwargs):
+        """
+        the given element is not in the cache, now insert it into cache,
+        a cold object is evicted first if the cache is full
+        :param **kwargs:
+        :param req_item:
+        :return: evicted element or None
+        """
+
+        evicted = None
+        if len(self.slot_dict) >= self.cache_size:
+            slot = self._run_hand_cold()
+            evicted = self.slots[slot]
+        elif self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            slot = self.num_of_used
+            self.num_of_used += 1
+
+        self.slots[slot] = req_item
+        self.slot_dict[req_item] = slot
+        if self.test_dict.pop(req_item, None) is not None:
+            # requested again in its test period, a larger cold area would have kept it
+            self.cold_target = min(self.cold_target + 1, self.cache_size - 1)
+            self.hot[slot] = 1
+            self.flags[slot] = 0
+            self.num_of_hot += 1
+        else:
+            self.hot[slot] = 0
+            self.flags[slot] = TEST
+
+        while self.num_of_hot > self.cache_size - self.cold_target:
+            self._run_hand_hot()
+        return evicted
+
+    def evict(self, **kwargs):
+        """
+        evict one cold element from the cache
+        :param **kwargs:
+        :return: id of evicted element
+        """
+
+        assert len(self.slot_dict), "cannot evict from an empty cache"
+        slot = self._run_hand_cold()
+        evicted = self.slots[slot]
+        self.slots[slot] = None
+        self.flags[slot] = 0
+        self.hot[slot] = 0
+        self.free_slots.append(slot)
+        return evicted
+
+    def access(self, req_item, **kwargs):
+        """
+        :param **kwargs:
+        :param req_item: the element in the reference, it can be in the cache, or not
+        :return: True if element in the cache
+        """
+
+        slot = self.slot_dict.get(req_item)
+        if slot is not None:
+            self.flags[slot] |= REF
+            return True
+        else:
+            self._insert(req_item, )
+            return False
+
+    def __len__(self):
+        return len(self.slot_dict)
+
+    def __repr__(self):
+        return "CLOCK-Pro cache, given size: {}, current size: {}, hot: {}, cold target: {}".format(
+            self.cache_size, len(self.slot_dict), self.num_of_hot, self.cold_target)
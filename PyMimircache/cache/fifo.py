@@ -1,4 +1,5 @@
 # coding=utf-8
+import numpy as np
 from PyMimircache.cache.lru import LRU
 
 
@@ -14,6 +15,31 @@ class FIFO(LRU):
         """
         pass
 
+    def access_batch(self, ids, sizes=None, **kwargs):
+        """
+        access the cache with a batch of requests, see Cache.access_batch
+
+        :param ids: a numpy array or a list of item ids
+        :param sizes: not used
+        :param **kwargs:
+        :return: a tuple of a numpy bool array of whether each request is a hit, and the number of evictions
+        """
+
+        hits = bytearray(len(ids))
+        cacheline_dict = self.cacheline_dict
+        popitem = cacheline_dict.popitem
+        cache_size = self.cache_size
+        num_of_evictions = 0
+        for i, req_id in enumerate(ids.tolist() if isinstance(ids, np.ndarray) else ids):
+            if req_id in cacheline_dict:
+                hits[i] = 1
+            else:
+                cacheline_dict[req_id] = True
+                if len(cacheline_dict) > cache_size:
+                    popitem(last=False)
+                    num_of_evictions += 1
+        return np.frombuffer(hits, dtype=np.bool_), num_of_evictions
+
     def __repr__(self):
         return "FIFO cache of size {}, current size: {}, {}".format(
-            self.cache_size, self.cache_linked_list.size, super().__repr__())
+            self.cache_size, len(self.cacheline_dict), super().__repr__())
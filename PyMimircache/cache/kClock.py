@@ -0,0 +1,16 @@
+# coding=utf-8
+from PyMimircache.cache.clock import Clock
+
+
+class KClock(Clock):
+    """
+    k-bit CLOCK, the reference bit of CLOCK is replaced by a saturating counter of num_of_bits bits,
+    which is increased on each hit and decreased when the hand passes
+    """
+
+    def __init__(self, cache_size=1000, num_of_bits=2, **kwargs):
+        super().__init__(cache_size, num_of_bits=num_of_bits, **kwargs)
+
+    def __repr__(self):
+        return "{}-bit CLOCK cache, given size: {}, current size: {}".format(
+            self.num_of_bits, self.cache_size, len(self.slot_dict))
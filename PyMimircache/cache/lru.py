@@ -7,9 +7,9 @@
 
 """
 
+import numpy as np
 from collections import OrderedDict
 from PyMimircache.cache.abstractCache import Cache
-from PyMimircache.cacheReader.requestItem import Req
 
 
 class LRU(Cache):
@@ -34,33 +34,25 @@ class LRU(Cache):
         else:
             return False
 
-    def _update(self, req_item, **kwargs):
+    def _update(self, req_id, **kwargs):
         """ the given element is in the cache,
         now update cache metadata and its content
 
         :param **kwargs:
-        :param req_item:
+        :param req_id:
         :return: None
         """
 
-        req_id = req_item
-        if isinstance(req_item, Req):
-            req_id = req_item.item_id
-
         self.cacheline_dict.move_to_end(req_id)
 
-    def _insert(self, req_item, **kwargs):
+    def _insert(self, req_id, **kwargs):
         """
         the given element is not in the cache, now insert it into cache
         :param **kwargs:
-        :param req_item:
+        :param req_id:
         :return: evicted element or None
         """
 
-        req_id = req_item
-        if isinstance(req_item, Req):
-            req_id = req_item.item_id
-
         self.cacheline_dict[req_id] = True
 
     def evict(self, **kwargs):
@@ -71,36 +63,60 @@ class LRU(Cache):
         :return: id of evicted cacheline
         """
 
-        req_id = self.cacheline_dict.popitem(last=False)
+        req_id, _ = self.cacheline_dict.popitem(last=False)
         return req_id
 
-    def access(self, req_item, **kwargs):
+    def access(self, req_id, **kwargs):
         """
         request access cache, it updates cache metadata,
-        it is the underlying method for both get and put
+        it is the underlying method for both get and put,
+        a Req should be passed through access_req
 
         :param **kwargs:
-        :param req_item: the request from the trace, it can be in the cache, or not
-        :return: None
+        :param req_id: the id of the request from the trace, it can be in the cache, or not
+        :return: True if hit, otherwise False
         """
 
-        req_id = req_item
-        if isinstance(req_item, Req):
-            req_id = req_item.item_id
-
-        if self.has(req_id):
-            self._update(req_item)
+        if req_id in self.cacheline_dict:
+            self._update(req_id)
             return True
         else:
-            self._insert(req_item)
+            self._insert(req_id)
             if len(self.cacheline_dict) > self.cache_size:
                 self.evict()
             return False
 
+    def access_batch(self, ids, sizes=None, **kwargs):
+        """
+        access the cache with a batch of requests, see Cache.access_batch
+
+        :param ids: a numpy array or a list of item ids
+        :param sizes: not used
+        :param **kwargs:
+        :return: a tuple of a numpy bool array of whether each request is a hit, and the number of evictions
+        """
+
+        hits = bytearray(len(ids))
+        cacheline_dict = self.cacheline_dict
+        move_to_end = cacheline_dict.move_to_end
+        popitem = cacheline_dict.popitem
+        cache_size = self.cache_size
+        num_of_evictions = 0
+        for i, req_id in enumerate(ids.tolist() if isinstance(ids, np.ndarray) else ids):
+            if req_id in cacheline_dict:
+                move_to_end(req_id)
+                hits[i] = 1
+            else:
+                cacheline_dict[req_id] = True
+                if len(cacheline_dict) > cache_size:
+                    popitem(last=False)
+                    num_of_evictions += 1
+        return np.frombuffer(hits, dtype=np.bool_), num_of_evictions
+
     def __len__(self):
         return len(self.cacheline_dict)
 
     def __repr__(self):
         return "LRU cache of size: {}, current size: {}, {}".\
-            format(self.cache_size, self.cache_linked_list.size,
+            format(self.cache_size, len(self.cacheline_dict),
                    super().__repr__())
@@ -1,15 +1,28 @@
 # coding=utf-8
 
+"""
+    Belady's optimal replacement algorithm in pure python,
+    the distance to the next request of every request is computed once with numpy (see get_next_access_dist),
+    the cached objects are kept in a dict of object -> time of next request,
+    and the object to evict is the one requested furthest in the future, found with a binary heap (heapq),
+    a hit pushes a new heap entry instead of updating the old one, the outdated entries are skipped
+    when they reach the top (lazy deletion), and the heap is rebuilt when outdated entries dominate it
 
+    an object that is not requested again is not kept in the cache
+
+"""
+
+import heapq
+import numpy as np
 from PyMimircache.cache.abstractCache import Cache
+from PyMimircache.profiler.utilProfiler import get_next_access_dist
 from PyMimircache.const import ALLOW_C_MIMIRCACHE
 if ALLOW_C_MIMIRCACHE:
     import PyMimircache.CMimircache.LRUProfiler as c_LRUProfiler
-    import PyMimircache.CMimircache.Heatmap as c_heatmap
-try:
-    from heapdict import heapdict
-except:
-    print("heapdict is not installed")
+
+
+# the heap is rebuilt when it has more than this many entries per cached object
+_MAX_HEAP_ENTRIES_PER_OBJ = 2
 
 
 class Optimal(Cache):
@@ -18,9 +31,12 @@ class Optimal(Cache):
 
         self.reader = reader
         self.reader.lock.acquire()
-        self.next_access = c_heatmap.get_next_access_dist(self.reader.c_reader)
+        self.next_access = get_next_access_dist(self.reader)
         self.reader.lock.release()
-        self.pq = heapdict()
+        # object -> time of its next request
+        self.next_time_dict = {}
+        # entries of (-time of next request, object), the object is requested furthest in the future on top
+        self.heap = []
         self.ts = 0
 
     def get_reversed_reuse_dist(self):
@@ -32,57 +48,80 @@ class Optimal(Cache):
         :param req_id:
         :return: whether the given element is in the cache
         """
-        if req_id in self.pq:
+        if req_id in self.next_time_dict:
             return True
         else:
             return False
 
+    def _push(self, req_item, next_time):
+        """
+        set the time of next request of an object in the cache
+
+        :param req_item:
+        :param next_time:
+        """
+
+        self.next_time_dict[req_item] = next_time
+        heapq.heappush(self.heap, (-next_time, req_item))
+        if len(self.heap) > _MAX_HEAP_ENTRIES_PER_OBJ * self.cache_size + 1:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        """
+        drop the outdated entries from the heap
+        """
+
+        self.heap = [(-next_time, req_item) for req_item, next_time in self.next_time_dict.items()]
+        heapq.heapify(self.heap)
+
     def _update(self, req_item, **kwargs):
-        """ the given element is in the cache, now update it to new location
+        """ the given element is in the cache, now update the time of its next request
         :param **kwargs:
         :param req_item:
         :return: None
         """
 
         if self.next_access[self.ts] != -1:
-            self.pq[req_item] = -(self.ts + self.next_access[self.ts])
+            self._push(req_item, self.ts + int(self.next_access[self.ts]))
         else:
-            del self.pq[req_item]
+            # its heap entry becomes outdated
+            del self.next_time_dict[req_item]
 
     def _insert(self, req_item, **kwargs):
         """
         the given element is not in the cache, now insert it into cache
         :param **kwargs:
         :param req_item:
-        :return: True on success, False on failure
+        :return: None
         """
-        if self.next_access[self.ts] == -1:
-            pass
-        else:
-            self.pq[req_item] = -self.next_access[self.ts] - self.ts
+        if self.next_access[self.ts] != -1:
+            self._push(req_item, self.ts + int(self.next_access[self.ts]))
 
     def _print_cache_line(self):
-        print("size %d" % len(self.pq))
-        for i in self.pq:
+        print("size %d" % len(self.next_time_dict))
+        for i in self.next_time_dict:
             print(i, end='\t')
         print('')
 
     def evict(self, **kwargs):
         """
-        evict one element from the cache line
+        evict the element requested furthest in the future
         :param **kwargs:
-        :return: True on success, False on failure
+        :return: the evicted element
         """
 
-        element = self.pq.popitem()[0]
-        return element
+        heap, next_time_dict = self.heap, self.next_time_dict
+        while True:
+            neg_next_time, element = heapq.heappop(heap)
+            if next_time_dict.get(element) == -neg_next_time:
+                del next_time_dict[element]
+                return element
 
     def access(self, req_item, **kwargs):
         """
-        :param **kwargs: 
+        :param **kwargs:
         :param req_item: the element in the reference, it can be in the cache, or not,
-                        !!! Attention, for optimal, the element is a tuple of
-                        (timestamp, real_request)
+                        the requests must be accessed in the order of the trace, self.ts is the current time
         :return: True if element in the cache
         """
         if self.has(req_item, ):
@@ -91,11 +130,61 @@ class Optimal(Cache):
             return True
         else:
             self._insert(req_item, )
-            if len(self.pq) > self.cache_size:
+            if len(self.next_time_dict) > self.cache_size:
                 self.evict()
             self.ts += 1
             return False
 
+    def access_batch(self, ids, sizes=None, **kwargs):
+        """
+        access the cache with a batch of requests, see Cache.access_batch,
+        the batch continues from current timestamp
+
+        :param ids: a numpy array or a list of item ids
+        :param sizes: not used
+        :param **kwargs:
+        :return: a tuple of a numpy bool array of whether each request is a hit, and the number of evictions,
+                    objects that are never requested again are not inserted and not counted as evictions
+        """
+
+        n = len(ids)
+        hits = bytearray(n)
+        next_time_dict = self.next_time_dict
+        heap = self.heap
+        heappush, heappop = heapq.heappush, heapq.heappop
+        cache_size = self.cache_size
+        max_heap_size = _MAX_HEAP_ENTRIES_PER_OBJ * cache_size + 1
+        ts = self.ts
+        next_access = self.next_access[ts: ts + n].tolist()
+        num_of_evictions = 0
+        for i, req_id in enumerate(ids.tolist() if isinstance(ids, np.ndarray) else ids):
+            dist = next_access[i]
+            if req_id in next_time_dict:
+                hits[i] = 1
+                if dist == -1:
+                    del next_time_dict[req_id]
+                    continue
+            elif dist == -1:
+                continue
+            next_time = ts + i + dist
+            next_time_dict[req_id] = next_time
+            heappush(heap, (-next_time, req_id))
+            if len(next_time_dict) > cache_size:
+                while True:
+                    neg_next_time, element = heappop(heap)
+                    if next_time_dict.get(element) == -neg_next_time:
+                        del next_time_dict[element]
+                        break
+                num_of_evictions += 1
+            if len(heap) > max_heap_size:
+                self._rebuild_heap()
+                heap = self.heap
+        self.ts = ts + n
+        return np.frombuffer(hits, dtype=np.bool_), num_of_evictions
+
+    def __len__(self):
+        return len(self.next_time_dict)
+
     def __repr__(self):
         return "Optimal Cache, current size: {}".\
             format(self.cache_size, super().__repr__())
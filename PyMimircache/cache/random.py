@@ -5,6 +5,7 @@ any more
 """
 
 import random
+import numpy as np
 from PyMimircache.cache.abstractCache import Cache
 
 
@@ -85,6 +86,40 @@ class Random(Cache):
             self._insert(req_item, )
             return False
 
+    def access_batch(self, ids, sizes=None, **kwargs):
+        """
+        access the cache with a batch of requests, see Cache.access_batch,
+        the victims are drawn from the same random stream as access
+
+        :param ids: a numpy array or a list of item ids
+        :param sizes: not used
+        :param **kwargs:
+        :return: a tuple of a numpy bool array of whether each request is a hit, and the number of evictions
+        """
+
+        hits = bytearray(len(ids))
+        cache_set = self.cache_set
+        cache_line_list = self.cache_line_list
+        randrange = random.randrange
+        cache_size = self.cache_size
+        num_of_evictions = 0
+        for i, req_id in enumerate(ids.tolist() if isinstance(ids, np.ndarray) else ids):
+            if req_id in cache_set:
+                hits[i] = 1
+            elif len(cache_set) >= cache_size:
+                rand_num = randrange(0, len(cache_line_list))
+                cache_set.remove(cache_line_list[rand_num])
+                cache_line_list[rand_num] = req_id
+                cache_set.add(req_id)
+                num_of_evictions += 1
+            else:
+                cache_line_list.append(req_id)
+                cache_set.add(req_id)
+        return np.frombuffer(hits, dtype=np.bool_), num_of_evictions
+
+    def __len__(self):
+        return len(self.cache_set)
+
     def __repr__(self):
         return "Random Replacement, given size: {}, current size: {}".\
             format(self.cache_size, len(self.cache_set), super().__repr__())
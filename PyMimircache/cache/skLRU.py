@@ -0,0 +1,170 @@
+# coding=utf-8
+"""
+    segmented LRU with k segments (SkLRU), SLRU and S4LRU are configurations of it
+
+    segment 0 is the lowest, a new object is inserted at the MRU end of segment 0,
+    a hit in segment i moves the object to the MRU end of segment i + 1 (or of the highest segment),
+    when segment i (i > 0) overflows, its LRU object is moved down to the MRU end of segment i - 1,
+    when segment 0 overflows, its LRU object is evicted
+
+    one dict maps an id to its segment, so a request needs one lookup to find the segment,
+    each segment is an OrderedDict ordered from LRU to MRU
+
+"""
+
+import numpy as np
+from collections import OrderedDict
+from PyMimircache.cache.abstractCache import Cache
+
+
+class SkLRU(Cache):
+    """
+    segmented LRU with a configurable number of segments and segment sizes
+    """
+
+    def __init__(self, cache_size=1000, segment_ratios=(1, 1, 1, 1), **kwargs):
+        """
+        :param cache_size: the max number of objects in the cache
+        :param segment_ratios: the relative sizes of segments from the lowest (where new objects are inserted)
+                                to the highest, the size of segment i (i > 0) is
+                                int(cache_size * segment_ratios[i] / sum(segment_ratios)),
+                                segment 0 takes the rest of the cache
+        """
+
+        super().__init__(cache_size, **kwargs)
+        assert len(segment_ratios) > 0, "at least one segment is needed"
+        assert all(ratio > 0 for ratio in segment_ratios), "segment ratios must be positive"
+        total_ratio = sum(segment_ratios)
+        upper_sizes = [int(cache_size * ratio / total_ratio) for ratio in segment_ratios[1:]]
+        self.segment_sizes = [cache_size - sum(upper_sizes)] + upper_sizes
+        assert all(size > 0 for size in self.segment_sizes), \
+            "cache size {} is too small for segment ratios {}".format(cache_size, segment_ratios)
+        self.num_of_segments = len(self.segment_sizes)
+        self.segments = [OrderedDict() for _ in range(self.num_of_segments)]
+        # id -> segment
+        self.segment_of = {}
+
+    def has(self, req_id, **kwargs):
+        """
+        :param **kwargs:
+        :param req_id:
+        :return: whether the given element is in the cache
+        """
+
+        return req_id in self.segment_of
+
+    def _update(self, req_item, **kwargs):
+        """ the given element is in the cache, now move it to the upper segment,
+        the LRU object of the upper segment is moved down if it overflows
+        :param **kwargs:
+        :param req_item:
+        :return: None
+        """
+
+        seg = self.segment_of[req_item]
+        if seg == self.num_of_segments - 1:
+            self.segments[seg].move_to_end(req_item)
+            return
+
+        del self.segments[seg][req_item]
+        upper = self.segments[seg + 1]
+        upper[req_item] = True
+        self.segment_of[req_item] = seg + 1
+        if len(upper) > self.segment_sizes[seg + 1]:
+            demoted, _ = upper.popitem(last=False)
+            self.segments[seg][demoted] = True
+            self.segment_of[demoted] = seg
+
+    def _insert(self, req_item, **kwargs):
+        """
+        the given element is not in the cache, now insert it into the lowest segment
+        :param **kwargs:
+        :param req_item:
+        :return: evicted element or None
+        """
+
+        self.segments[0][req_item] = True
+        self.segment_of[req_item] = 0
+        if len(self.segments[0]) > self.segment_sizes[0]:
+            return self.evict()
+
+    def evict(self, **kwargs):
+        """
+        evict the least recently used element of the lowest non-empty segment
+        :param **kwargs:
+        :return: id of evicted element
+        """
+
+        for segment in self.segments:
+            if segment:
+                req_id, _ = segment.popitem(last=False)
+                del self.segment_of[req_id]
+                return req_id
+        raise RuntimeError("cannot evict from an empty cache")
+
+    def access(self, req_item, **kwargs):
+        """
+        :param **kwargs:
+        :param req_item: a cache request, it can be in the cache, or not
+        :return: True if element in the cache
+        """
+
+        if req_item in self.segment_of:
+            self._update(req_item, )
+            return True
+        else:
+            self._insert(req_item, )
+            return False
+
+    def access_batch(self, ids, sizes=None, **kwargs):
+        """
+        access the cache with a batch of requests, see Cache.access_batch
+
+        :param ids: a numpy array or a list of item ids
+        :param sizes: not used
+        :param **kwargs:
+        :return: a tuple of a numpy bool array of whether each request is a hit, and the number of evictions
+        """
+
+        hits = bytearray(len(ids))
+        segments, segment_sizes = self.segments, self.segment_sizes
+        segment_of = self.segment_of
+        get_segment = segment_of.get
+        lowest, lowest_size = segments[0], segment_sizes[0]
+        highest = self.num_of_segments - 1
+        num_of_evictions = 0
+        for i, req_id in enumerate(ids.tolist() if isinstance(ids, np.ndarray) else ids):
+            seg = get_segment(req_id)
+            if seg is None:
+                lowest[req_id] = True
+                segment_of[req_id] = 0
+                if len(lowest) > lowest_size:
+                    del segment_of[lowest.popitem(last=False)[0]]
+                    num_of_evictions += 1
+            else:
+                hits[i] = 1
+                if seg == highest:
+                    segments[seg].move_to_end(req_id)
+                    continue
+                # _update inlined
+                del segments[seg][req_id]
+                upper = segments[seg + 1]
+                upper[req_id] = True
+                segment_of[req_id] = seg + 1
+                if len(upper) > segment_sizes[seg + 1]:
+                    demoted, _ = upper.popitem(last=False)
+                    segments[seg][demoted] = True
+                    segment_of[demoted] = seg
+        return np.frombuffer(hits, dtype=np.bool_), num_of_evictions
+
+    def _print_cache_line(self):
+        for seg, segment in enumerate(self.segments):
+            print("segment {}: {}".format(seg, "\t".join(str(i) for i in segment)))
+
+    def __len__(self):
+        return len(self.segment_of)
+
+    def __repr__(self):
+        return "S{}LRU, given size: {}, segment sizes: {}, current segment sizes: {}".format(
+            self.num_of_segments, self.cache_size, self.segment_sizes,
+            [len(segment) for segment in self.segments])
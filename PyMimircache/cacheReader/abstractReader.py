@@ -8,14 +8,27 @@
 
 import abc
 import os
+import numpy as np
 from collections import defaultdict
-from PyMimircache.const import ALLOW_C_MIMIRCACHE
-from multiprocessing import Manager, Lock
+from itertools import islice
+from PyMimircache.const import ALLOW_C_MIMIRCACHE, DEF_BATCH_SIZE
+from PyMimircache.cacheReader.labelTable import LabelTable
+from PyMimircache.cacheReader.compressedFile import detect_compression
+from PyMimircache.cacheReader.offsetIndex import OffsetIndex, DEF_OFFSET_INDEX_STEP
+from PyMimircache.cacheReader.timeIndex import TimeIndex
+from PyMimircache.cacheReader.requestItem import RequestBatch
+from PyMimircache.cacheReader.traceShards import can_shard, count_in_shards
+from PyMimircache.utils.printing import *
+from multiprocessing import Lock
 
 if ALLOW_C_MIMIRCACHE:
     import PyMimircache.CMimircache.CacheReader as c_cacheReader
 
 
+# the fields can be requested in a batch, see AbstractReader.read_batch
+BATCH_FIELDS = ("label", "time", "size", "op")
+
+
 class AbstractReader(metaclass=abc.ABCMeta):
     """
     reader interface
@@ -24,19 +37,22 @@ class AbstractReader(metaclass=abc.ABCMeta):
     __metaclass__ = abc.ABCMeta
 
     def __init__(self, file_loc, data_type='c', block_unit_size=0,
-                 disk_sector_size=0, open_c_reader=False, lock=None):
+                 disk_sector_size=0, open_c_reader=False, lock=None, label_table=None):
         """
         the initialization abstract function for cacheReaderAbstract
         :param file_loc:            location of the file
         :param data_type:           type of data(label), can be "l" for int/long, "c" for string
         :param block_unit_size:     block size for storage system, 0 when disabled
         :param disk_sector_size:    size of disk sector
-        :param open_c_reader:       whether open c reader
+        :param open_c_reader:       whether open c reader, the c reader is opened on first use
+        :param lock:                lock shared by the reader and its copies, created on first use if not given
+        :param label_table:         a LabelTable or True for a new one, when given, the reader returns
+                                    dense integer ids instead of labels, C reader is not affected
         """
 
         self.file_loc = file_loc
         self.trace_file = None
-        self.c_reader = None
+        self._c_reader = None
         self.data_type = data_type
         self.block_unit_size = block_unit_size
         self.disk_sector_size = disk_sector_size
@@ -46,38 +62,97 @@ class AbstractReader(metaclass=abc.ABCMeta):
             assert data_type == 'l', "block size option only support on block request(data type l)"
         assert (os.path.exists(file_loc)), "data file({}) does not exist".format(file_loc)
 
+        # traces compressed with gzip, bz2 or xz (with the extension .gz, .bz2 or .xz)
+        # or in the block-indexed container are decompressed on the fly
+        self.compression = detect_compression(file_loc)
+        if self.compression is not None and self.open_c_reader:
+            if ALLOW_C_MIMIRCACHE:
+                WARNING("C reader does not support compressed trace {}, open_c_reader is disabled".format(file_loc))
+            self.open_c_reader = False
+
         self.support_real_time = False
         self.support_size = False
         self.already_load_rd = False
 
-        self.lock = lock
-        if self.lock is None:
-            self._mp_manager = Manager()
-            self.lock = self._mp_manager.Lock()
+        self._lock = lock
+
+        self.label_table = LabelTable() if label_table is True else label_table
+
+        # text readers set data_begin to the offset of the first request to enable the offset index
+        self.data_begin = None
+        self.offset_index = None
+        # the sparse timestamp index, loaded or built on first use by get_time_index
+        self.time_index = None
 
         self.counter = 0
         self.num_of_req = -1
         self.num_of_uniq_req = -1
 
+    @property
+    def lock(self):
+        """
+        the lock shared by the reader and its copies, it is created on first use,
+        so readers that never need it do not pay for it
+
+        :return: a multiprocessing lock
+        """
+
+        if self._lock is None:
+            self._lock = Lock()
+        return self._lock
+
+    @property
+    def c_reader(self):
+        """
+        the reader in C backend, it is opened on first use if open_c_reader is True
+
+        :return: the c reader, None if not available
+        """
+
+        if self._c_reader is None and self.open_c_reader and ALLOW_C_MIMIRCACHE:
+            self._c_reader = self._setup_c_reader()
+        return self._c_reader
+
+    @c_reader.setter
+    def c_reader(self, c_reader):
+        self._c_reader = c_reader
+
+    def _setup_c_reader(self):
+        """
+        open the reader in C backend, readers supported by C backend override this
+
+        :return: the c reader
+        """
+
+        return None
+
     def reset(self):
         """
         reset the read location back to beginning, similar as rewind in POSIX
         """
         self.counter = 0
         self.trace_file.seek(0, 0)
-        if self.c_reader:
-            c_cacheReader.reset_reader(self.c_reader)
+        if self._c_reader:
+            c_cacheReader.reset_reader(self._c_reader)
 
     def get_num_of_req(self):
         """
         count the number of requests in the trace, fast for binary type trace,
-        for plain/csv type trace, this is slow
+        for plain/csv type trace, this is slow, large plain/csv traces are counted in shards in parallel
         :return: the number of requests in the trace
         """
 
         if self.num_of_req > 0:
             return self.num_of_req
 
+        if self.offset_index is not None:
+            self.num_of_req = self.offset_index.num_of_req
+            return self.num_of_req
+
+        if can_shard(self):
+            self.num_of_req, _ = count_in_shards(self)
+            return self.num_of_req
+
         # clear before counting
         self.num_of_req = 0
         if self.c_reader:
@@ -91,10 +166,15 @@ class AbstractReader(metaclass=abc.ABCMeta):
 
     def get_req_freq_distribution(self):
         """
-        calculate the count for each block/obj
+        calculate the count for each block/obj,
+        large plain/csv traces are counted in shards in parallel
         :return: a dictionary mapping from block/ojb to count
         """
 
+        if can_shard(self):
+            self.num_of_req, d = count_in_shards(self, with_freq=True)
+            return d
+
         d = defaultdict(int)
         for i in self:
             d[i] += 1
@@ -111,6 +191,231 @@ class AbstractReader(metaclass=abc.ABCMeta):
             self.num_of_uniq_req = len(self.get_req_freq_distribution())
         return self.num_of_uniq_req
 
+    def read_batch(self, n, fields=BATCH_FIELDS):
+        """
+        read the next n requests at once and return them as numpy arrays,
+        the generic implementation only provides label by calling read_one_req repeatedly,
+        readers should override it with a faster implementation
+
+        :param n: the max number of requests in the batch, the last batch can be shorter
+        :param fields: the fields to read, can be label, time, size and op,
+                        fields that the trace does not provide are left out
+        :return: a dict mapping from field to a numpy array, None if there is no more request
+        """
+
+        assert n > 0, "batch size must be positive"
+        for field in fields:
+            assert field in BATCH_FIELDS, "unknown field {}, supported fields {}".format(field, BATCH_FIELDS)
+
+        labels = []
+        req = self.read_one_req()
+        while req is not None:
+            labels.append(req)
+            if len(labels) == n:
+                break
+            req = self.read_one_req()
+
+        if len(labels) == 0:
+            return None
+        if "label" not in fields:
+            return {}
+        is_int = self.data_type == 'l' or self.label_table is not None
+        return {"label": np.array(labels, dtype=np.int64 if is_int else object)}
+
+    def iter_batches(self, n=DEF_BATCH_SIZE, fields=BATCH_FIELDS):
+        """
+        a generator of batches from current position to the end of the trace,
+        see read_batch for the content of each batch
+
+        :param n: the max number of requests in each batch
+        :param fields: the fields to read, can be label, time, size and op
+        :return: a dict mapping from field to a numpy array
+        """
+
+        batch = self.read_batch(n, fields)
+        while batch is not None:
+            yield batch
+            batch = self.read_batch(n, fields)
+
+    def iter_request_batches(self, n=DEF_BATCH_SIZE, fields=BATCH_FIELDS):
+        """
+        the same as iter_batches, but each batch is a RequestBatch,
+        which caches and profilers can consume without creating one object per request
+
+        :param n: the max number of requests in each batch
+        :param fields: the fields to read, must contain label
+        :return: a RequestBatch
+        """
+
+        assert "label" in fields, "a RequestBatch needs label"
+        for columns in self.iter_batches(n, fields):
+            yield RequestBatch.from_columns(columns)
+
+    def get_offset_index(self):
+        """
+        return the sparse offset index of a text trace, the index is loaded from <trace>.offsets.npz if it
+        is up to date, otherwise it is built with one pass over the trace and saved for later use
+
+        :return: an OffsetIndex, or None if the reader does not support offset index
+        """
+
+        if self.offset_index is None and self.data_begin is not None:
+            self.offset_index = OffsetIndex.load(self.file_loc, self.data_begin)
+            if self.offset_index is None:
+                self.offset_index = OffsetIndex.build(self.trace_file, self.data_begin)
+                self.offset_index.save(self.file_loc)
+        return self.offset_index
+
+    def get_time_index(self):
+        """
+        return the sparse timestamp index of a trace with real time, the index is loaded from <trace>.times.npz
+        if it is up to date, otherwise it is built with one pass over the trace and saved for later use,
+        the reader is reset if the index is built
+
+        :return: a TimeIndex
+        """
+
+        time_column = getattr(self, "time_column", None)
+        assert time_column and time_column != -1, "the trace does not have real time"
+        if self.time_index is None:
+            self.time_index = TimeIndex.load(self.file_loc, time_column)
+            if self.time_index is None:
+                self.time_index = TimeIndex.build(self)
+                self.time_index.save(self.file_loc)
+        return self.time_index
+
+    def skip_n_req(self, n):
+        """
+        skip N requests from current position,
+        for text traces, a long skip seeks through the offset index instead of reading every line
+
+        :param n: the number of requests to skip
+        """
+
+        offset_index = self.get_offset_index() if n >= DEF_OFFSET_INDEX_STEP else None
+        if offset_index is not None:
+            offset_index.seek(self.trace_file, offset_index.tell_req(self.trace_file) + n)
+        else:
+            for _ in range(n):
+                if self.read_one_req() is None:
+                    break
+
+    def set_read_pos(self, pos):
+        """
+        move to the given request so that the next request read is request pos (beginning from 0),
+        for text traces, this seeks through the offset index
+
+        :param pos: the request number
+        """
+
+        offset_index = self.get_offset_index()
+        if offset_index is not None:
+            offset_index.seek(self.trace_file, pos)
+        else:
+            self.reset()
+            self.skip_n_req(pos)
+
+    def _parse_block(self, block, columns):
+        """
+        parse a block of complete lines of a text trace, used for counting a trace in shards
+
+        :param block: bytes of complete lines
+        :param columns: a dict mapping from field to column
+        :return: a dict mapping from field to a numpy array
+        """
+
+        raise NotImplementedError("{} does not parse blocks".format(self.__class__.__name__))
+
+    def _read_lines(self, n):
+        """
+        read at most n non-empty lines from the text trace file, used by text readers
+
+        :param n: the max number of lines
+        :return: a list of lines in bytes
+        """
+
+        lines = []
+        while len(lines) < n:
+            chunk = list(islice(self.trace_file, n - len(lines)))
+            if not chunk:
+                break
+            lines.extend(line for line in chunk if line.strip())
+        return lines
+
+    def _get_batch_columns(self, fields):
+        """
+        map the requested batch fields to the columns (beginning from 1) of the trace,
+        fields that the trace does not provide are left out
+
+        :param fields: the fields to read, can be label, time, size and op
+        :return: a dict mapping from field to column
+        """
+
+        columns = {}
+        for field in fields:
+            assert field in BATCH_FIELDS, "unknown field {}, supported fields {}".format(field, BATCH_FIELDS)
+            column = getattr(self, "{}_column".format(field), None)
+            if column and column != -1:
+                columns[field] = column
+        return columns
+
+    def _tokens_to_array(self, field, tokens):
+        """
+        convert raw bytes tokens of the given field into a numpy array,
+        labels follow data_type and are rescaled if block_unit_size and disk_sector_size are set,
+        time is float, size is integer, op is kept as string
+
+        :param field: the field of the tokens
+        :param tokens: a list or numpy array of bytes
+        :return: a numpy array
+        """
+
+        if isinstance(tokens, np.ndarray) and tokens.dtype == object and \
+                (field == "op" or (field == "label" and self.data_type != 'l')):
+            # long string fields are decoded one by one, a bytes array would be as wide as the longest one
+            strings = np.array([token.decode().strip() for token in tokens.tolist()], dtype=object)
+            return self._intern_array(strings) if field == "label" else strings
+
+        tokens = np.asarray(tokens, dtype=np.bytes_)
+        if field == "label":
+            if self.data_type == 'l':
+                labels = tokens.astype(np.int64)
+                if self.block_unit_size != 0 and self.disk_sector_size != 0:
+                    labels = labels * self.disk_sector_size // self.block_unit_size
+            else:
+                labels = np.char.strip(np.char.decode(tokens)).astype(object)
+            return self._intern_array(labels)
+        elif field == "time":
+            return tokens.astype(np.float64)
+        elif field == "size":
+            return tokens.astype(np.int64)
+        else:
+            return np.char.strip(np.char.decode(tokens)).astype(object)
+
+    def _intern(self, label):
+        """
+        map the label to its id if the reader has a label table
+
+        :param label: the label of a request or None
+        :return: the id of the label, or the label itself if there is no label table
+        """
+
+        if self.label_table is None or label is None:
+            return label
+        return self.label_table.get_id(label)
+
+    def _intern_array(self, labels):
+        """
+        map an array of labels to their ids if the reader has a label table
+
+        :param labels: a numpy array of labels
+        :return: a numpy array of ids, or the labels themselves if there is no label table
+        """
+
+        if self.label_table is None:
+            return labels
+        return self.label_table.intern_array(labels)
+
     def __iter__(self):
         return self
 
@@ -164,9 +469,9 @@ class AbstractReader(metaclass=abc.ABCMeta):
                 if self.trace_file:
                     self.trace_file.close()
                     self.trace_file = None
-                if self.c_reader and c_cacheReader is not None:
-                    c_cacheReader.close_reader(self.c_reader)
-                    self.c_reader = None
+                if self._c_reader and c_cacheReader is not None:
+                    c_cacheReader.close_reader(self._c_reader)
+                    self._c_reader = None
         except Exception as e:
             # return
             print("Exception during close reader: {}, ccacheReader={}".format(e, c_cacheReader))
@@ -9,21 +9,73 @@
 
 import io
 import os
+import re
 import struct
+import numpy as np
 
 from PyMimircache.const import ALLOW_C_MIMIRCACHE
 
 if ALLOW_C_MIMIRCACHE:
     import PyMimircache.CMimircache.CacheReader as c_cacheReader
-from PyMimircache.cacheReader.abstractReader import AbstractReader
+from PyMimircache.cacheReader.abstractReader import AbstractReader, BATCH_FIELDS
+from PyMimircache.cacheReader.compressedFile import open_trace_file
+
+
+def fmt_to_dtype(fmt):
+    """
+    convert a python struct fmt string into an equivalent numpy structured dtype,
+    the fields are named f1, f2, ... following the column order (beginning from 1) used in init_params,
+    pad bytes (x) do not create a field, offsets are taken from struct so native alignment (@) is respected
+
+    :param fmt: fmt string of binary data, same as python struct
+    :return: a numpy dtype with the same itemsize as struct.calcsize(fmt)
+    """
+
+    byte_order = "@"
+    if fmt and fmt[0] in "@=<>!":
+        byte_order, fmt = fmt[0], fmt[1:]
+    np_byte_order = {"@": "=", "=": "=", "<": "<", ">": ">", "!": ">"}[byte_order]
+
+    names, formats, offsets = [], [], []
+    prefix = byte_order
+    for count, code in re.findall(r"(\d*)([xcbB?hHiIlLqQnNefdspP])", fmt):
+        count = int(count) if count else 1
+        if code == "x":
+            prefix += "{}x".format(count)
+            continue
+        if code in "sp":
+            # a string occupies one column regardless of its length
+            offsets.append(struct.calcsize(prefix + "{}{}".format(count, code)) - count)
+            names.append("f{}".format(len(names) + 1))
+            formats.append("S{}".format(count))
+            prefix += "{}{}".format(count, code)
+            continue
+
+        for _ in range(count):
+            size = struct.calcsize(byte_order + code)
+            offsets.append(struct.calcsize(prefix + code) - size)
+            names.append("f{}".format(len(names) + 1))
+            if code == "c":
+                formats.append("S1")
+            elif code == "?":
+                formats.append("?")
+            elif code in "efd":
+                formats.append("{}f{}".format(np_byte_order, size))
+            else:
+                formats.append("{}{}{}".format(np_byte_order, "i" if code.islower() else "u", size))
+            prefix += code
+
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets,
+                     "itemsize": struct.calcsize(byte_order + fmt)})
 
 
 class BinaryReader(AbstractReader):
     """
     BinaryReader class for reading binary trace
     """
-    all = ["read_one_req", "read_complete_req", "get_num_of_req", "skip_n_req",
-           "lines", "read_time_req", "reset", "copy", "get_params"]
+    all = ["read_one_req", "read_complete_req", "get_num_of_req", "skip_n_req", "set_read_pos",
+           "lines", "read_time_req", "read_batch", "reset", "copy", "get_params",
+           "get_records", "labels", "timestamps", "sizes", "ops"]
 
     def __init__(self, file_loc, init_params, data_type='c',
                  block_unit_size=0, disk_sector_size=0, open_c_reader=True, **kwargs):
@@ -53,11 +105,11 @@ class BinaryReader(AbstractReader):
         :param block_unit_size:     block size for storage system, 0 when disabled
         :param disk_sector_size:    size of disk sector
         :param open_c_reader:       whether open c reader
-        :param kwargs:              not used now
+        :param kwargs:              lock, label_table (see AbstractReader)
         """
 
         super(BinaryReader, self).__init__(file_loc, data_type, block_unit_size, disk_sector_size,
-                                           open_c_reader, kwargs.get("lock", None))
+                                           open_c_reader, kwargs.get("lock", None), kwargs.get("label_table", None))
         assert 'fmt' in init_params, "please provide format string(fmt) in init_params"
         assert "label" in init_params, "please specify the order of label, beginning from 1"
         if block_unit_size != 0:
@@ -69,30 +121,47 @@ class BinaryReader(AbstractReader):
         self.time_column = init_params.get("real_time", )
         self.size_column = init_params.get("size", )
 
-        self.trace_file = open(file_loc, 'rb')
+        self.op_column = init_params.get("op", )
+
+        self.trace_file = open_trace_file(file_loc)
         self.struct_instance = struct.Struct(self.fmt)
         self.record_size = struct.calcsize(self.fmt)
-        self.trace_file_size = os.path.getsize(self.file_loc)
-        assert self.trace_file_size % self.record_size == 0, \
-            "file size ({}) is not multiple of record size ({})".format(self.trace_file_size, self.record_size)
+        # the size of a compressed trace is only known after decompression, so it is found on first use
+        self._trace_file_size = None
+        if self.compression is None:
+            self.get_trace_file_size()
 
         if self.time_column != -1:
             self.support_real_time = True
         if self.size_column != -1:
             self.support_size = True
 
-        if ALLOW_C_MIMIRCACHE and open_c_reader:
-            # the data type here is not real data type, it will auto correct in C
-            self.cReader = c_cacheReader.setup_reader(file_loc, 'b', data_type=self.data_type,
-                                                                 block_unit_size=block_unit_size,
-                                                                 disk_sector_size=disk_sector_size,
-                                                                 init_params=init_params)
-        self.get_num_of_req()
+        # the memory-mapped structured view of the whole trace, created on first columnar access
+        self.records = None
+
+    def _setup_c_reader(self):
+        # the data type here is not real data type, it will auto correct in C
+        return c_cacheReader.setup_reader(self.file_loc, 'b', data_type=self.data_type,
+                                          block_unit_size=self.block_unit_size,
+                                          disk_sector_size=self.disk_sector_size,
+                                          init_params=self.init_params)
+
+    def get_trace_file_size(self):
+        """
+        the size of the (uncompressed) trace in bytes
 
-        # this might cause problem on Windows and it does give any performance gain
-        # self.mm = mmap.mmap(self.trace_file.fileno(), 0, mmap.MAP_SHARED, mmap.PROT_READ)
-        # self.trace_file_original = self.trace_file
-        # self.trace_file = self.mm
+        :return: the size of the trace
+        """
+
+        if self._trace_file_size is None:
+            if self.compression is None:
+                self._trace_file_size = os.path.getsize(self.file_loc)
+            else:
+                with open_trace_file(self.file_loc) as trace_file:
+                    self._trace_file_size = trace_file.seek(0, io.SEEK_END)
+            assert self._trace_file_size % self.record_size == 0, \
+                "file size ({}) is not multiple of record size ({})".format(self._trace_file_size, self.record_size)
+        return self._trace_file_size
 
     def get_num_of_req(self):
         """
@@ -104,7 +173,7 @@ class BinaryReader(AbstractReader):
         if self.num_of_req > 0:
             return self.num_of_req
 
-        self.num_of_req = self.trace_file_size // self.record_size
+        self.num_of_req = self.get_trace_file_size() // self.record_size
         return self.num_of_req
 
     def read_one_req(self):
@@ -121,9 +190,9 @@ class BinaryReader(AbstractReader):
             if self.data_type == 'l':
                 if ret and self.block_unit_size != 0 and self.disk_sector_size != 0:
                     ret = int(ret) * self.disk_sector_size // self.block_unit_size
-                return ret
+                return self._intern(ret)
             else:
-                return ret
+                return self._intern(ret)
         else:
             return None
 
@@ -177,15 +246,46 @@ class BinaryReader(AbstractReader):
                 if self.data_type == 'l':
                     if self.block_unit_size != 0 and self.disk_sector_size != 0:
                         obj = int(obj) * self.disk_sector_size // self.block_unit_size
-                    return time, obj
+                    return time, self._intern(obj)
                 else:
-                    return time, obj
+                    return time, self._intern(obj)
             except Exception as e:
                 print("ERROR binaryReader reading data: {}, current line: {}".format(e, ret))
 
         else:
             return None
 
+    def read_batch(self, n, fields=BATCH_FIELDS):
+        """
+        read the next n requests at once by slicing the memory-mapped trace,
+        the arrays are zero-copy views except for rescaled labels,
+        for a compressed trace, the next n records are decompressed into a new array
+
+        :param n: the max number of requests in the batch, the last batch can be shorter
+        :param fields: the fields to read, can be label, time, size and op,
+                        fields that are not specified in init_params are left out
+        :return: a dict mapping from field to a numpy array, None if there is no more request
+        """
+
+        assert n > 0, "batch size must be positive"
+        columns = self._get_batch_columns(fields)
+        if self.compression is None:
+            begin = self.trace_file.tell() // self.record_size
+            records = self.get_records()[begin: begin + n]
+            self.trace_file.seek(len(records) * self.record_size, io.SEEK_CUR)
+        else:
+            data = self.trace_file.read(n * self.record_size)
+            records = np.frombuffer(data, dtype=fmt_to_dtype(self.fmt), count=len(data) // self.record_size)
+        if len(records) == 0:
+            return None
+
+        batch = {field: records["f{}".format(column)] for field, column in columns.items()}
+        if "label" in batch:
+            if self.block_unit_size != 0 and self.disk_sector_size != 0:
+                batch["label"] = batch["label"].astype(np.int64) * self.disk_sector_size // self.block_unit_size
+            batch["label"] = self._intern_array(batch["label"])
+        return batch
+
     def skip_n_req(self, n):
         """
         skip N requests from current position
@@ -194,6 +294,14 @@ class BinaryReader(AbstractReader):
         """
         self.trace_file.seek(struct.calcsize(self.fmt) * n, io.SEEK_CUR)
 
+    def set_read_pos(self, pos):
+        """
+        move to the given request so that the next request read is request pos (beginning from 0)
+
+        :param pos: the request number
+        """
+        self.trace_file.seek(self.record_size * pos, io.SEEK_SET)
+
     def copy(self, open_c_reader=False):
         """
         reader a deep copy of current reader with everything reset to initial state,
@@ -205,7 +313,7 @@ class BinaryReader(AbstractReader):
 
         return BinaryReader(self.file_loc, self.init_params, data_type=self.data_type,
                             block_unit_size=self.block_unit_size, disk_sector_size=self.disk_sector_size,
-                            open_c_reader=open_c_reader, lock=self.lock)
+                            open_c_reader=open_c_reader, lock=self.lock, label_table=self.label_table)
 
     def get_params(self):
         """
@@ -220,16 +328,91 @@ class BinaryReader(AbstractReader):
             "block_unit_size": self.block_unit_size,
             "disk_sector_size": self.disk_sector_size,
             "open_c_reader": self.open_c_reader,
-            "lock": self.lock
+            "label_table": self.label_table
         }
 
-    def read_one_element_mmap(self):
+    def get_records(self):
+        """
+        map the whole trace into memory and return it as a numpy structured array,
+        the dtype is built from fmt, column i of the trace is field "fi" (beginning from 1),
+        no data is copied, the pages are loaded by the OS on demand,
+        a compressed trace cannot be mapped, so it is decompressed into memory as a whole
+
+        :return: a read-only numpy structured array of all requests
+        """
+
+        if self.records is None:
+            if self.get_trace_file_size() == 0:
+                self.records = np.zeros(0, dtype=fmt_to_dtype(self.fmt))
+            elif self.compression is not None:
+                with open_trace_file(self.file_loc) as ifile:
+                    self.records = np.frombuffer(ifile.read(), dtype=fmt_to_dtype(self.fmt))
+            else:
+                self.records = np.memmap(self.file_loc, dtype=fmt_to_dtype(self.fmt), mode="r")
+        return self.records
+
+    def _get_column(self, column):
+        """
+        return the given column (beginning from 1) as a view of the memory-mapped trace
+
+        :param column: the column number
+        :return: a numpy array view, no data is copied
+        """
+
+        return self.get_records()["f{}".format(column)]
+
+    def labels(self):
+        """
+        the label column of the whole trace as a numpy array,
+        this is a zero-copy view unless block_unit_size and disk_sector_size are set,
+        in which case labels have to be rescaled into a new array,
+        labels are not interned even if the reader has a label table, use read_batch for ids
+
+        :return: a numpy array of labels
+        """
+
+        labels = self._get_column(self.label_column)
+        if self.block_unit_size != 0 and self.disk_sector_size != 0:
+            labels = labels.astype(np.int64) * self.disk_sector_size // self.block_unit_size
+        return labels
+
+    def timestamps(self):
+        """
+        the real time column of the whole trace as a zero-copy numpy array view
+
+        :return: a numpy array of timestamps
+        """
+
+        assert self.time_column, "you need to provide time in order to use this function"
+        return self._get_column(self.time_column)
+
+    def sizes(self):
+        """
+        the size column of the whole trace as a zero-copy numpy array view
+
+        :return: a numpy array of request sizes
+        """
+
+        assert self.size_column, "you need to provide size in order to use this function"
+        return self._get_column(self.size_column)
+
+    def ops(self):
+        """
+        the op column of the whole trace as a zero-copy numpy array view
+
+        :return: a numpy array of operations
+        """
+
+        assert self.op_column, "you need to provide op in order to use this function"
+        return self._get_column(self.op_column)
+
+    def close(self):
         """
-        wip
-        :return:
+        close reader, the memory-mapped view is released once no column view refers to it
         """
 
-        pass
+        self.records = None
+        super().close()
 
     def __next__(self):
         super().__next__()
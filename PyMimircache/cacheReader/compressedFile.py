@@ -0,0 +1,495 @@
+# coding=utf-8
+
+"""
+this module provides transparent decompression for traces compressed with gzip, bz2 or xz,
+and a block-indexed compressed container that supports random access
+
+the container is detected from its 8-byte magic, a trace compressed with gzip, bz2 or xz must have
+the extension of its format (.gz, .bz2 or .xz) as well as its magic, the 2 or 3 bytes magic of these formats
+can also be the first bytes of an uncompressed binary trace
+
+all the file objects here are read-only binary files supporting read, readline, iteration,
+seek and tell on the uncompressed data, so readers can use them in place of open(file_loc, "rb"),
+the recently decompressed data is kept in a window, so short backward seeks (such as the ones
+in CsvReader.read_batch) do not need to decompress again, seeking back beyond the window
+restarts decompression from the beginning of the stream (or of the block in the container)
+
+the block-indexed container splits the trace into blocks aligned to lines (or records for binary traces),
+each block is compressed independently and an index of the blocks is stored at the end of the file,
+so any region can be decompressed without touching the rest of the file
+
+    container layout:
+        BLOCK_MAGIC | block 1 | block 2 | ... | index (json) | index offset (uint64) | BLOCK_MAGIC
+
+"""
+
+import io
+import bz2
+import gzip
+import json
+import lzma
+import struct
+import bisect
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+BLOCK_MAGIC = b"PYMCBLK1"
+DEF_CHUNK_SIZE = 1 << 20
+# the number of chunks kept for backward seek, the window must be larger than CSV_CHUNK_SIZE
+DEF_NUM_OF_CHUNKS = 8
+DEF_BLOCK_SIZE = 1 << 22
+
+STREAM_MAGIC = {"gzip": b"\x1f\x8b", "bz2": b"BZh", "xz": b"\xfd7zXZ\x00"}
+STREAM_SUFFIX = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+STREAM_OPENER = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+CODEC = {"gzip": (gzip.compress, gzip.decompress),
+         "bz2": (bz2.compress, bz2.decompress),
+         "xz": (lzma.compress, lzma.decompress)}
+
+
+def detect_compression(file_loc):
+    """
+    detect the compression of a file, the block-indexed container is detected from its magic bytes,
+    a stream compressed file needs both the extension and the magic bytes of its format
+
+    :param file_loc: location of the file
+    :return: "gzip", "bz2", "xz", "block" for the block-indexed container, or None if not compressed
+    """
+
+    with open(file_loc, "rb") as ifile:
+        head = ifile.read(len(BLOCK_MAGIC))
+    if head == BLOCK_MAGIC:
+        return "block"
+    for compression, magic in STREAM_MAGIC.items():
+        if file_loc.lower().endswith(STREAM_SUFFIX[compression]) and head.startswith(magic):
+            return compression
+    return None
+
+
+def open_trace_file(file_loc):
+    """
+    open a trace for reading in binary mode, compressed traces are decompressed on the fly
+
+    :param file_loc: location of the trace
+    :return: a binary file object
+    """
+
+    compression = detect_compression(file_loc)
+    if compression is None:
+        return open(file_loc, "rb")
+    elif compression == "block":
+        return BlockCompressedFile(file_loc)
+    else:
+        return StreamCompressedFile(file_loc, compression)
+
+
+class _ChunkedFile(io.RawIOBase):
+    """
+    the base class of the decompressed files, it serves reads from a window of decompressed chunks,
+    subclasses provide the chunks through _restart and _next_chunk
+    """
+
+    def __init__(self, file_loc, num_of_chunks=DEF_NUM_OF_CHUNKS):
+        super().__init__()
+        self.file_loc = file_loc
+        self.name = file_loc
+        self.num_of_chunks = num_of_chunks
+        # decompressed chunks in the window, each is a tuple of (begin offset, data)
+        self._chunks = deque()
+        # the offset where the next chunk from _next_chunk begins
+        self._next_begin = 0
+        self._pos = 0
+        # the chunk that contains the current position
+        self._cur, self._cur_begin, self._cur_end = b"", 0, 0
+
+    def _restart(self, pos):
+        """
+        prepare for decompressing the data at pos, the subsequent _next_chunk calls
+        return the chunks beginning from the returned offset
+
+        :param pos: the offset in the uncompressed data
+        :return: the offset where the next chunk begins, which must not be larger than pos
+        """
+
+        raise NotImplementedError
+
+    def _next_chunk(self):
+        """
+        :return: the next decompressed chunk, b"" at the end of file
+        """
+
+        raise NotImplementedError
+
+    def _skip_to(self, pos):
+        """
+        :param pos: an offset after the window
+        :return: whether it is faster to restart at pos than to decompress until pos
+        """
+
+        return False
+
+    def get_size(self):
+        """
+        :return: the size of uncompressed data
+        """
+
+        raise NotImplementedError
+
+    def _locate(self):
+        """
+        make the chunk containing current position the current chunk
+
+        :return: False at the end of file, otherwise True
+        """
+
+        pos = self._pos
+        if self._cur_begin <= pos < self._cur_end:
+            return True
+        if self._chunks and self._chunks[0][0] <= pos < self._next_begin:
+            for begin, chunk in self._chunks:
+                if begin <= pos < begin + len(chunk):
+                    self._cur, self._cur_begin, self._cur_end = chunk, begin, begin + len(chunk)
+                    return True
+
+        if not self._chunks or pos < self._chunks[0][0] or self._skip_to(pos):
+            self._chunks.clear()
+            self._next_begin = self._restart(pos)
+        while self._next_begin <= pos:
+            chunk = self._next_chunk()
+            if not chunk:
+                return False
+            self._chunks.append((self._next_begin, chunk))
+            self._next_begin += len(chunk)
+            if len(self._chunks) > self.num_of_chunks:
+                self._chunks.popleft()
+        if not self._chunks or pos < self._chunks[-1][0]:
+            # only possible when pos is before the region of a BlockCompressedFile
+            return False
+        self._cur, self._cur_begin = self._chunks[-1][1], self._chunks[-1][0]
+        self._cur_end = self._next_begin
+        return True
+
+    def read(self, size=-1):
+        """
+        :param size: the max number of bytes to read, -1 for reading until the end of file
+        :return: the bytes read
+        """
+
+        parts = []
+        remaining = size if size is not None and size >= 0 else float("inf")
+        while remaining > 0 and self._locate():
+            offset = self._pos - self._cur_begin
+            part = self._cur[offset: offset + remaining] if remaining < self._cur_end - self._pos \
+                else self._cur[offset:]
+            parts.append(part)
+            self._pos += len(part)
+            remaining -= len(part)
+        return b"".join(parts)
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readline(self, size=-1):
+        """
+        :param size: not used, kept for compatibility with io
+        :return: the next line including the line ending, b"" at the end of file
+        """
+
+        parts = []
+        while self._locate():
+            offset = self._pos - self._cur_begin
+            end = self._cur.find(b"\n", offset)
+            if end != -1:
+                parts.append(self._cur[offset: end + 1])
+                self._pos += end + 1 - offset
+                break
+            parts.append(self._cur[offset:])
+            self._pos = self._cur_end
+        return b"".join(parts)
+
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """
+        change the position in the uncompressed data, no data is decompressed until next read
+
+        :param offset: the offset relative to whence
+        :param whence: io.SEEK_SET, io.SEEK_CUR or io.SEEK_END
+        :return: the new position
+        """
+
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.get_size() + offset
+        else:
+            raise ValueError("invalid whence ({})".format(whence))
+        assert self._pos >= 0, "negative seek position {}".format(self._pos)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        self._chunks.clear()
+        self._cur = b""
+        self._cur_begin = self._cur_end = 0
+        super().close()
+
+
+class StreamCompressedFile(_ChunkedFile):
+    """
+    a seekable file of the uncompressed data of a gzip, bz2 or xz file,
+    the data is decompressed sequentially, seeking back beyond the window restarts decompression
+    """
+
+    def __init__(self, file_loc, compression=None, chunk_size=DEF_CHUNK_SIZE, num_of_chunks=DEF_NUM_OF_CHUNKS):
+        """
+        :param file_loc: location of the compressed file
+        :param compression: gzip, bz2 or xz, detected from the file if not given
+        :param chunk_size: the number of bytes decompressed at a time
+        :param num_of_chunks: the number of recent chunks kept for backward seek
+        """
+
+        super().__init__(file_loc, num_of_chunks)
+        self.compression = compression if compression else detect_compression(file_loc)
+        assert self.compression in STREAM_OPENER, "unknown compression {}".format(self.compression)
+        self.chunk_size = chunk_size
+        self._stream = None
+        self._size = None
+
+    def _restart(self, pos):
+        if self._stream is not None:
+            self._stream.close()
+        self._stream = STREAM_OPENER[self.compression](self.file_loc, "rb")
+        return 0
+
+    def _next_chunk(self):
+        chunk = self._stream.read(self.chunk_size)
+        if not chunk and self._size is None:
+            self._size = self._next_begin
+        return chunk
+
+    def get_size(self):
+        """
+        the size of uncompressed data, the whole stream is decompressed the first time
+        unless the end of file has been reached before
+
+        :return: the size of uncompressed data
+        """
+
+        if self._size is None:
+            size = 0
+            with STREAM_OPENER[self.compression](self.file_loc, "rb") as stream:
+                chunk = stream.read(self.chunk_size)
+                while chunk:
+                    size += len(chunk)
+                    chunk = stream.read(self.chunk_size)
+            self._size = size
+        return self._size
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        super().close()
+
+
+class BlockCompressedFile(_ChunkedFile):
+    """
+    a seekable file of the uncompressed data of a block-indexed container,
+    seeking only decompresses the block that contains the new position,
+    the blocks can be limited to a region so that several processes can each work on a different region,
+    the file begins at the beginning of the region and data outside the region reads as end of file,
+    with readahead, the next block is decompressed in a background thread while current block is read
+    """
+
+    def __init__(self, file_loc, region=None, readahead=True, num_of_chunks=2):
+        """
+        :param file_loc: location of the container
+        :param region: a tuple of (first block, last block + 1) to limit the file to these blocks,
+                        offsets are still the offsets in the whole uncompressed data
+        :param readahead: whether decompress the next block in background
+        :param num_of_chunks: the number of recent blocks kept for backward seek
+        """
+
+        super().__init__(file_loc, num_of_chunks)
+        self.index = load_block_index(file_loc)
+        self.decompress = CODEC[self.index["codec"]][1]
+        self.blocks = self.index["blocks"]
+        self.region = region if region is not None else (0, len(self.blocks))
+        assert 0 <= self.region[0] <= self.region[1] <= len(self.blocks), "invalid region {}".format(region)
+        self._block_begins = [block[0] for block in self.blocks]
+
+        self._ifile = open(file_loc, "rb")
+        self._ifile_lock = threading.Lock()
+        self._next_block = self.region[0]
+        self._executor = ThreadPoolExecutor(max_workers=1) if readahead else None
+        self._prefetched = {}
+        self._pos = self.get_region_range()[0]
+
+    def _load_block(self, block_id):
+        """
+        read and decompress one block, decompression releases GIL so it can run in a thread
+
+        :param block_id: the index of the block
+        :return: the decompressed block
+        """
+
+        _, compressed_begin, compressed_size, _ = self.blocks[block_id]
+        with self._ifile_lock:
+            self._ifile.seek(compressed_begin)
+            compressed = self._ifile.read(compressed_size)
+        return self.decompress(compressed)
+
+    def _block_of(self, pos):
+        return bisect.bisect_right(self._block_begins, pos) - 1
+
+    def _skip_to(self, pos):
+        return self._block_of(pos) > self._next_block
+
+    def _restart(self, pos):
+        block_id = self._block_of(pos)
+        self._next_block = min(max(block_id, self.region[0]), self.region[1])
+        if self._next_block < len(self.blocks):
+            return self.blocks[self._next_block][0]
+        return self.get_size()
+
+    def _next_chunk(self):
+        block_id = self._next_block
+        if block_id >= self.region[1]:
+            return b""
+        self._next_block += 1
+        future = self._prefetched.pop(block_id, None)
+        if self._executor is not None:
+            self._prefetched.clear()
+            if self._next_block < self.region[1]:
+                self._prefetched[self._next_block] = self._executor.submit(self._load_block, self._next_block)
+        return future.result() if future is not None else self._load_block(block_id)
+
+    def get_size(self):
+        """
+        :return: the size of uncompressed data of the whole trace
+        """
+
+        return self.index["uncompressed_size"]
+
+    def get_region_range(self):
+        """
+        :return: a tuple of the begin and end offsets of the region in the uncompressed data
+        """
+
+        begin = self.blocks[self.region[0]][0] if self.region[0] < len(self.blocks) else self.get_size()
+        end = self.blocks[self.region[1]][0] if self.region[1] < len(self.blocks) else self.get_size()
+        return begin, end
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._prefetched.clear()
+        self._ifile.close()
+        super().close()
+
+
+def load_block_index(file_loc):
+    """
+    load the index of a block-indexed container
+
+    :param file_loc: location of the container
+    :return: a dict of codec, block_size, record_size, uncompressed_size and blocks,
+            each block is a list of [uncompressed begin, compressed begin, compressed size, number of lines]
+    """
+
+    with open(file_loc, "rb") as ifile:
+        assert ifile.read(len(BLOCK_MAGIC)) == BLOCK_MAGIC, "{} is not a block compressed trace".format(file_loc)
+        ifile.seek(-len(BLOCK_MAGIC) - 8, io.SEEK_END)
+        index_begin = struct.unpack("<Q", ifile.read(8))[0]
+        index_end = ifile.tell() - 8
+        assert ifile.read(len(BLOCK_MAGIC)) == BLOCK_MAGIC, "the index of {} is damaged".format(file_loc)
+        ifile.seek(index_begin)
+        return json.loads(ifile.read(index_end - index_begin).decode())
+
+
+def split_regions(file_loc, num_of_regions):
+    """
+    split the blocks of a block-indexed container into regions of similar number of lines
+
+    :param file_loc: location of the container
+    :param num_of_regions: the number of regions
+    :return: a list of (first block, last block + 1)
+    """
+
+    blocks = load_block_index(file_loc)["blocks"]
+    num_of_regions = max(1, min(num_of_regions, len(blocks)))
+    total_lines = sum(block[3] for block in blocks)
+    regions, begin, lines = [], 0, 0
+    for block_id, block in enumerate(blocks):
+        lines += block[3]
+        if lines * num_of_regions >= total_lines * (len(regions) + 1) and len(regions) < num_of_regions - 1:
+            regions.append((begin, block_id + 1))
+            begin = block_id + 1
+    regions.append((begin, len(blocks)))
+    return regions
+
+
+def compress_trace(file_loc, out_path, codec="gzip", block_size=DEF_BLOCK_SIZE, record_size=0):
+    """
+    compress a trace into a block-indexed container, the trace itself can be compressed,
+    blocks end at line endings for text traces and at record boundaries for binary traces
+
+    :param file_loc: location of the trace
+    :param out_path: location of the container
+    :param codec: gzip, bz2 or xz
+    :param block_size: the approximate size of uncompressed data in each block
+    :param record_size: the size of one record for binary traces (struct.calcsize(fmt)), 0 for text traces
+    :return: the index of the container
+    """
+
+    assert codec in CODEC, "unknown codec {}, supported codecs are {}".format(codec, list(CODEC.keys()))
+    compress = CODEC[codec][0]
+    if record_size:
+        block_size = max(block_size // record_size, 1) * record_size
+
+    blocks = []
+    uncompressed_begin = 0
+    with open_trace_file(file_loc) as ifile, open(out_path, "wb") as ofile:
+        ofile.write(BLOCK_MAGIC)
+        data = ifile.read(block_size)
+        while data:
+            if not record_size and not data.endswith(b"\n"):
+                data += ifile.readline()
+            compressed = compress(data)
+            num_of_lines = len(data) // record_size if record_size else \
+                data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+            blocks.append([uncompressed_begin, ofile.tell(), len(compressed), num_of_lines])
+            ofile.write(compressed)
+            uncompressed_begin += len(data)
+            data = ifile.read(block_size)
+
+        index = {"codec": codec, "block_size": block_size, "record_size": record_size,
+                 "uncompressed_size": uncompressed_begin, "blocks": blocks}
+        index_begin = ofile.tell()
+        ofile.write(json.dumps(index).encode())
+        ofile.write(struct.pack("<Q", index_begin))
+        ofile.write(BLOCK_MAGIC)
+    return index
@@ -6,20 +6,82 @@
 
 """
 import string
+import numpy as np
 from PyMimircache.const import ALLOW_C_MIMIRCACHE
 from PyMimircache.utils.printing import *
 
 if ALLOW_C_MIMIRCACHE:
     import PyMimircache.CMimircache.CacheReader as c_cacheReader
-from PyMimircache.cacheReader.abstractReader import AbstractReader
+from PyMimircache.cacheReader.compressedFile import open_trace_file
+from PyMimircache.cacheReader.offsetIndex import find_lines
+from PyMimircache.cacheReader.abstractReader import AbstractReader, BATCH_FIELDS
+
+
+# the max number of bytes read from the trace at once by read_batch
+CSV_CHUNK_SIZE = 1 << 22
+# columns wider than this (such as urls) are sliced line by line instead of copied into a dense matrix
+MAX_DENSE_FIELD_WIDTH = 64
+
+
+def split_csv_block(block, delimiter, columns):
+    """
+    split a block of complete csv lines and extract the given columns,
+    all the work is done with numpy on the whole block, there is no python loop over lines,
+    blank lines are skipped, the delimiter must be a single byte and fields cannot be quoted
+
+    :param block: bytes of complete lines
+    :param delimiter: the delimiter in bytes
+    :param columns: a list of columns (beginning from 1) to extract
+    :return: a tuple of (the offset of each line in the block, a dict mapping from column to
+                a numpy bytes array of the fields in that column, or a numpy object array of bytes
+                if the column is wider than MAX_DENSE_FIELD_WIDTH)
+    """
+
+    buf = np.frombuffer(block, dtype=np.uint8)
+    line_begins, line_ends = find_lines(buf)
+
+    delimiters = np.flatnonzero(buf == delimiter[0])
+    first_delimiter = np.searchsorted(delimiters, line_begins)
+    num_of_delimiters = np.searchsorted(delimiters, line_ends) - first_delimiter
+
+    tokens = {}
+    for column in columns:
+        if len(line_begins) and num_of_delimiters.min() < column - 1:
+            bad_line = int(np.argmax(num_of_delimiters < column - 1))
+            raise RuntimeError("csv line has no column {}: {}".format(
+                column, block[line_begins[bad_line]: line_ends[bad_line]]))
+
+        if column == 1:
+            begins = line_begins
+        else:
+            begins = delimiters[first_delimiter + column - 2] + 1
+        if len(delimiters):
+            next_delimiters = delimiters[np.minimum(first_delimiter + column - 1, len(delimiters) - 1)]
+            ends = np.where(num_of_delimiters >= column, next_delimiters, line_ends)
+        else:
+            ends = line_ends
+
+        width = max(int((ends - begins).max()) if len(begins) else 1, 1)
+        if width > MAX_DENSE_FIELD_WIDTH:
+            # the matrix would need n_lines * width entries for a few long fields
+            tokens[column] = np.array([block[begin: end] for begin, end in zip(begins.tolist(), ends.tolist())],
+                                      dtype=object)
+            continue
+
+        # copy the fields into a fixed width matrix, which is then viewed as a bytes array
+        ind = begins[:, None] + np.arange(width)
+        field_matrix = np.where(ind < ends[:, None], buf[np.minimum(ind, len(buf) - 1)], 0).astype(np.uint8)
+        tokens[column] = field_matrix.view("S{}".format(width)).ravel()
+
+    return line_begins, tokens
 
 
 class CsvReader(AbstractReader):
     """
     CsvReader class
     """
-    all = ["read_one_req", "read_complete_req", "lines_dict",
-           "lines", "read_time_req", "reset", "copy", "get_params"]
+    all = ["read_one_req", "read_complete_req", "read_batch", "lines_dict",
+           "lines", "read_time_req", "skip_n_req", "set_read_pos", "reset", "copy", "get_params"]
 
     def __init__(self, file_loc,
                  data_type='c',
@@ -35,20 +97,21 @@ class CsvReader(AbstractReader):
         :param block_unit_size:     block size for storage system, 0 when disabled
         :param disk_sector_size:    size of disk sector
         :param open_c_reader:       bool for whether open reader in C backend
-        :param kwargs:              not used now
+        :param kwargs:              lock, label_table (see AbstractReader)
         """
 
         super(CsvReader, self).__init__(file_loc, data_type, block_unit_size, disk_sector_size,
-                                        open_c_reader, kwargs.get("lock", None))
+                                        open_c_reader, kwargs.get("lock", None), kwargs.get("label_table", None))
         assert init_params is not None, "please provide init_param for csvReader"
         assert "label" in init_params, "please provide label for csv reader"
 
-        self.trace_file = open(file_loc, 'rb')
+        self.trace_file = open_trace_file(file_loc)
         # self.trace_file = open(file_loc, 'r', encoding='utf-8', errors='ignore')
         self.init_params = init_params
         self.label_column = init_params['label']
         self.time_column = init_params.get("real_time", )
         self.size_column = init_params.get("size", )
+        self.op_column = init_params.get("op", )
 
         if self.time_column != -1:
             self.support_real_time = True
@@ -63,18 +126,21 @@ class CsvReader(AbstractReader):
         self.delimiter = init_params.get('delimiter', ",")
         if "delimiter" not in init_params:
             INFO("open {} using default delimiter \",\" for CsvReader".format(file_loc))
+        # estimated bytes per line, updated by read_batch to decide how much to read at once
+        self.line_size_hint = 64
 
 
         if self.header_bool:
             self.headers = [i.strip(string.whitespace) for i in
                             self.trace_file.readline().decode().split(self.delimiter)]
             # self.trace_file.readline()
+        self.data_begin = self.trace_file.tell()
 
-        if ALLOW_C_MIMIRCACHE and open_c_reader:
-            self.c_reader = c_cacheReader.setup_reader(file_loc, 'c', data_type=data_type,
-                                                                 block_unit_size=block_unit_size,
-                                                                 disk_sector_size=disk_sector_size,
-                                                                 init_params=init_params)
+    def _setup_c_reader(self):
+        return c_cacheReader.setup_reader(self.file_loc, 'c', data_type=self.data_type,
+                                          block_unit_size=self.block_unit_size,
+                                          disk_sector_size=self.disk_sector_size,
+                                          init_params=self.init_params)
 
     def read_one_req(self):
         """
@@ -92,7 +158,7 @@ class CsvReader(AbstractReader):
                 ret = int(ret)
                 if self.block_unit_size != 0 and self.disk_sector_size != 0:
                     ret = ret * self.disk_sector_size // self.block_unit_size
-            return ret
+            return self._intern(ret)
         else:
             return None
 
@@ -174,13 +240,97 @@ class CsvReader(AbstractReader):
                     if self.block_unit_size != 0 and self.disk_sector_size != 0:
                         lbn = lbn * self.disk_sector_size // self.block_unit_size
 
-                return time, lbn
+                return time, self._intern(lbn)
             except Exception as e:
                 print("ERROR csvReader reading data: {}, current line: {}".format(e, line))
 
         else:
             return None
 
+    def read_batch(self, n, fields=BATCH_FIELDS):
+        """
+        read the next n requests at once, the trace is read in large blocks and
+        only the columns of the requested fields are parsed (see split_csv_block),
+        label follows data_type, time is float, size is integer and op is string
+
+        :param n: the max number of requests in the batch, the last batch can be shorter
+        :param fields: the fields to read, can be label, time, size and op,
+                        fields that are not specified in init_params are left out
+        :return: a dict mapping from field to a numpy array, None if there is no more request
+        """
+
+        assert n > 0, "batch size must be positive"
+        columns = self._get_batch_columns(fields)
+        delimiter = self.delimiter.encode()
+        if len(delimiter) != 1:
+            return self._read_batch_by_line(n, columns)
+
+        column_list = sorted(set(columns.values()))
+        blocks_tokens = []
+        num_of_lines = 0
+        while num_of_lines < n:
+            block_begin = self.trace_file.tell()
+            block = self.trace_file.read(min(CSV_CHUNK_SIZE, (n - num_of_lines) * self.line_size_hint))
+            if not block:
+                break
+            if not block.endswith(b"\n"):
+                block += self.trace_file.readline()
+
+            line_begins, tokens = split_csv_block(block, delimiter, column_list)
+            if len(line_begins) == 0:
+                continue
+            self.line_size_hint = len(block) // len(line_begins) + 1
+
+            if num_of_lines + len(line_begins) > n:
+                # give back the lines that are not in this batch
+                n_lines_kept = n - num_of_lines
+                self.trace_file.seek(block_begin + int(line_begins[n_lines_kept]))
+                line_begins = line_begins[:n_lines_kept]
+                tokens = {column: column_tokens[:n_lines_kept] for column, column_tokens in tokens.items()}
+            blocks_tokens.append(tokens)
+            num_of_lines += len(line_begins)
+
+        if num_of_lines == 0:
+            return None
+        return {field: self._tokens_to_array(field, np.concatenate([tokens[column] for tokens in blocks_tokens]))
+                for field, column in columns.items()}
+
+    def _parse_block(self, block, columns):
+        """
+        parse a block of complete lines
+
+        :param block: bytes of complete lines
+        :param columns: a dict mapping from field to column
+        :return: a dict mapping from field to a numpy array
+        """
+
+        delimiter = self.delimiter.encode()
+        if len(delimiter) != 1:
+            line_splits = [line.split(delimiter) for line in block.split(b"\n") if line.strip()]
+            return {field: self._tokens_to_array(field, [line_split[column - 1] for line_split in line_splits])
+                    for field, column in columns.items()}
+
+        _, tokens = split_csv_block(block, delimiter, sorted(set(columns.values())))
+        return {field: self._tokens_to_array(field, tokens[column]) for field, column in columns.items()}
+
+    def _read_batch_by_line(self, n, columns):
+        """
+        read_batch for multi-character delimiters, which splits the trace line by line
+
+        :param n: the max number of requests in the batch
+        :param columns: a dict mapping from field to column
+        :return: a dict mapping from field to a numpy array, None if there is no more request
+        """
+
+        lines = self._read_lines(n)
+        if len(lines) == 0:
+            return None
+
+        delimiter = self.delimiter.encode()
+        line_splits = [line.split(delimiter) for line in lines]
+        return {field: self._tokens_to_array(field, [line_split[column - 1] for line_split in line_splits])
+                for field, column in columns.items()}
+
     def reset(self):
         """
         reset reader to initial state
@@ -199,8 +349,12 @@ class CsvReader(AbstractReader):
         :return: a copied reader
         """
 
-        return CsvReader(self.file_loc, self.data_type, self.init_params,
-                         self.block_unit_size, self.disk_sector_size, open_c_reader, lock=self.lock)
+        reader = CsvReader(self.file_loc, self.data_type, self.init_params,
+                           self.block_unit_size, self.disk_sector_size, open_c_reader,
+                           lock=self.lock, label_table=self.label_table)
+        reader.offset_index = self.offset_index
+        reader.time_index = self.time_index
+        return reader
 
 
     def get_params(self):
@@ -216,7 +370,7 @@ class CsvReader(AbstractReader):
             "block_unit_size": self.block_unit_size,
             "disk_sector_size": self.disk_sector_size,
             "open_c_reader": self.open_c_reader,
-            "lock": self.lock
+            "label_table": self.label_table
         }
 
     def __next__(self):  # Python 3
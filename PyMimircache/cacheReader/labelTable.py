@@ -0,0 +1,122 @@
+# coding=utf-8
+
+"""
+this module provides the label table for label interning,
+which maps labels (usually strings) to dense integer ids beginning from 1,
+when a reader is opened with a label table, it emits ids instead of the original labels,
+so caches store and hash small integers instead of strings,
+and the ids can be used directly as array index downstream
+
+the table can be shared by several readers and persisted as a numpy file,
+in which the label of id i is at index i-1
+
+"""
+
+import os
+import numpy as np
+
+
+class LabelTable:
+    """
+    a table of label -> dense integer id, ids are assigned in the order of first appearance
+    """
+
+    all = ["get_id", "intern_array", "get_label", "get_labels", "save", "load"]
+
+    def __init__(self, labels=None):
+        """
+        :param labels: a list of labels that are already assigned ids, the label of id i is at index i-1
+        """
+
+        self.label_to_id = {}
+        self.labels = []
+        if labels is not None:
+            for label in labels:
+                self.get_id(label)
+
+    def get_id(self, label):
+        """
+        return the id of the label, a new id is assigned if the label has not been seen
+
+        :param label: the original label
+        :return: the id of the label
+        """
+
+        label_id = self.label_to_id.get(label)
+        if label_id is None:
+            self.labels.append(label)
+            label_id = self.label_to_id[label] = len(self.labels)
+        return label_id
+
+    def intern_array(self, labels):
+        """
+        map an array of labels to their ids, only the unique labels in the array are looked up
+
+        :param labels: a numpy array of labels
+        :return: a numpy int64 array of ids
+        """
+
+        uniq_labels, first_ind, inverse = np.unique(labels, return_index=True, return_inverse=True)
+        uniq_labels = uniq_labels.tolist()
+        ids = np.empty(len(uniq_labels), dtype=np.int64)
+        # assign new ids in the order of first appearance so that the ids do not depend on batching
+        for i in np.argsort(first_ind, kind="stable").tolist():
+            ids[i] = self.get_id(uniq_labels[i])
+        return ids[inverse.ravel()]
+
+    def get_label(self, label_id):
+        """
+        :param label_id: the id of a label
+        :return: the original label
+        """
+
+        return self.labels[label_id - 1]
+
+    def get_labels(self, label_ids):
+        """
+        map an array of ids back to their original labels
+
+        :param label_ids: a numpy array of ids
+        :return: a numpy array of labels
+        """
+
+        return self.to_array()[np.asarray(label_ids, dtype=np.int64) - 1]
+
+    def to_array(self):
+        """
+        :return: all labels ordered by id as a numpy array, int64 if all labels are integers
+        """
+
+        if all(isinstance(label, int) for label in self.labels):
+            return np.array(self.labels, dtype=np.int64)
+        return np.array(self.labels, dtype=np.str_)
+
+    def save(self, file_loc):
+        """
+        save the table as a numpy file
+
+        :param file_loc: location of the file, should end with .npy
+        """
+
+        np.save(file_loc, self.to_array())
+
+    @classmethod
+    def load(cls, file_loc):
+        """
+        load a table saved by save
+
+        :param file_loc: location of the file
+        :return: a LabelTable
+        """
+
+        assert os.path.exists(file_loc), "label table file({}) does not exist".format(file_loc)
+        return cls(np.load(file_loc).tolist())
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self.label_to_id
+
+    def __repr__(self):
+        return "LabelTable of {} labels".format(len(self.labels))
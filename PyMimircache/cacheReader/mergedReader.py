@@ -0,0 +1,281 @@
+# coding=utf-8
+
+"""
+this module provides the reader that merges several traces by timestamp,
+it is used for simulating a cache shared by several tenants without writing a merged trace
+
+the traces are merged lazily in batches, each source is read in batches and the requests of all sources
+before the smallest last timestamp of the buffered batches are merged with a stable sort,
+this gives the same order as merging one request at a time with a heap of (timestamp, source),
+requests of the same source keep their order, if a trace is not sorted by time,
+its requests are merged by the running max of its timestamps
+
+"""
+
+import numpy as np
+
+from PyMimircache.cacheReader.abstractReader import AbstractReader, BATCH_FIELDS
+from PyMimircache.const import DEF_BATCH_SIZE
+
+
+# the number of requests read from each source at once
+DEF_MERGE_BUFFER_SIZE = 8192
+
+
+class MergedReader(AbstractReader):
+    """
+    a reader that merges the requests of several readers with real time by timestamp
+    """
+
+    all = ["read_one_req", "read_time_req", "read_batch", "get_num_of_req",
+           "reset", "copy", "get_params"]
+
+    def __init__(self, readers=None, namespace=False, buffer_size=DEF_MERGE_BUFFER_SIZE,
+                 reader_classes=None, reader_params_list=None, **kwargs):
+        """
+        :param readers: a list of readers with real time
+        :param namespace: whether prefix each label with the index of its source as "index:label",
+                            so that the same label from different sources is a different object
+        :param buffer_size: the number of requests read from each source at once
+        :param reader_classes: the classes of the readers, used with reader_params_list if readers is None
+        :param reader_params_list: the parameters of the readers
+        :param kwargs: not used, merging is done in python
+        """
+
+        if readers is None:
+            assert reader_classes is not None and reader_params_list is not None, \
+                "please provide readers or reader_classes and reader_params_list"
+            readers = [reader_class(**reader_params)
+                       for reader_class, reader_params in zip(reader_classes, reader_params_list)]
+        assert len(readers) > 0, "please provide at least one reader"
+        for reader in readers:
+            assert isinstance(reader, AbstractReader), "you provided an invalid cacheReader: {}".format(reader)
+            time_column = getattr(reader, "time_column", None)
+            assert time_column and time_column != -1, "trace {} does not have real time".format(reader.file_loc)
+        assert buffer_size > 0, "buffer size must be positive"
+
+        super(MergedReader, self).__init__(readers[0].file_loc, "c" if namespace else readers[0].data_type)
+        self.readers = readers
+        self.namespace = namespace
+        self.buffer_size = buffer_size
+        self.support_real_time = True
+        self.support_size = all(reader.support_size for reader in readers)
+        self._init_merge()
+
+    def _init_merge(self):
+        """
+        clear the merge state
+        """
+
+        # the buffered requests of each source, None if the source is exhausted
+        self._buffers = [{} for _ in self.readers]
+        self._buffer_fields = None
+        # the fields provided by every source, decided by the first batch of each source,
+        # all sources are read before the first merge, so the fields of merged batches do not change
+        self._merged_fields = None
+        # the running max timestamp of each source
+        self._max_times = [-np.inf] * len(self.readers)
+        # merged requests not returned yet
+        self._pending = None
+        self._buffer = []
+        self._buffer_pos = 0
+
+    def _fill(self, ind, fields):
+        """
+        read the next batch of a source if its buffer is empty
+
+        :param ind: the index of the source
+        :param fields: the fields to read
+        """
+
+        buffer = self._buffers[ind]
+        if buffer is None or len(buffer.get("time", ())) > 0:
+            return
+        batch = self.readers[ind].read_batch(self.buffer_size, fields)
+        if batch is None:
+            self._buffers[ind] = None
+            return
+        # the merge key, the running max keeps the order of requests in the source
+        batch["key"] = np.maximum.accumulate(np.maximum(batch["time"].astype(np.float64), self._max_times[ind]))
+        self._max_times[ind] = batch["key"][-1]
+        if self.namespace and "label" in batch:
+            batch["label"] = np.char.add("{}:".format(ind), batch["label"].astype(np.str_)).astype(object)
+        batch["source"] = np.full(len(batch["time"]), ind, dtype=np.int32)
+        if self._merged_fields is None:
+            self._merged_fields = set(batch)
+        else:
+            self._merged_fields &= set(batch)
+        self._buffers[ind] = batch
+
+    def _merge_step(self, fields):
+        """
+        merge the buffered requests that no future request of any source can precede
+
+        :param fields: the fields to read
+        :return: a dict mapping from field to a numpy array, None if all sources are exhausted
+        """
+
+        for ind in range(len(self.readers)):
+            self._fill(ind, fields)
+        live = [ind for ind, buffer in enumerate(self._buffers) if buffer is not None]
+        if not live:
+            return None
+
+        # the next request of a source has a key at least the last buffered key of the source,
+        # and on equal keys, requests of a smaller source index come first
+        horizon = min(self._buffers[ind]["key"][-1] for ind in live)
+        first_horizon_source = min(ind for ind in live if self._buffers[ind]["key"][-1] == horizon)
+        parts = []
+        for ind in live:
+            buffer = self._buffers[ind]
+            end = int(np.searchsorted(buffer["key"], horizon, side="right" if ind <= first_horizon_source else "left"))
+            if end == 0:
+                continue
+            parts.append({field: buffer[field][:end] for field in self._merged_fields})
+            self._buffers[ind] = {field: column[end:] for field, column in buffer.items()}
+
+        merged = {field: np.concatenate([part[field] for part in parts]) for field in self._merged_fields}
+        order = np.argsort(merged.pop("key"), kind="stable")
+        return {field: column[order] for field, column in merged.items()}
+
+    def read_batch(self, n, fields=BATCH_FIELDS):
+        """
+        read the next n merged requests, see AbstractReader.read_batch,
+        the batch also contains source, the index of the source of each request,
+        a field is left out if any source does not provide it
+
+        :param n: the max number of requests in the batch, the last batch can be shorter
+        :param fields: the fields to read, can be label, time, size and op
+        :return: a dict mapping from field to a numpy array, None if there is no more request
+        """
+
+        assert n > 0, "batch size must be positive"
+        reader_fields = tuple(fields) if "time" in fields else tuple(fields) + ("time", )
+        if self._buffer_fields is None:
+            self._buffer_fields = reader_fields
+        assert self._buffer_fields == reader_fields, "please read with the same fields or reset the reader first"
+
+        parts = [self._pending] if self._pending is not None else []
+        num_of_req = len(self._pending["time"]) if self._pending is not None else 0
+        self._pending = None
+        while num_of_req < n:
+            merged = self._merge_step(reader_fields)
+            if merged is None:
+                break
+            parts.append(merged)
+            num_of_req += len(merged["time"])
+        if num_of_req == 0:
+            return None
+
+        common_fields = set.intersection(*(set(part) for part in parts))
+        batch = {field: np.concatenate([part[field] for part in parts]) for field in common_fields}
+        if num_of_req > n:
+            self._pending = {field: column[n:] for field, column in batch.items()}
+            batch = {field: column[:n] for field, column in batch.items()}
+        if "time" not in fields:
+            del batch["time"]
+        return batch
+
+    def _fill_buffer(self):
+        """
+        read the next batch of (time, label) for read_one_req and read_time_req
+        :return: False if there is no more request
+        """
+
+        if self._buffer_pos < len(self._buffer):
+            return True
+        batch = self.read_batch(DEF_BATCH_SIZE, ("label", "time"))
+        if batch is None:
+            return False
+        self._buffer = list(zip(batch["time"].tolist(), batch["label"].tolist()))
+        self._buffer_pos = 0
+        return True
+
+    def read_one_req(self):
+        """
+        read one merged request
+        :return: the label of the request, None if there is no more request
+        """
+
+        if not self._fill_buffer():
+            return None
+        self._buffer_pos += 1
+        return self._buffer[self._buffer_pos - 1][1]
+
+    def read_time_req(self):
+        """
+        read one merged request with its time
+        :return: a tuple of (time, request label), None if there is no more request
+        """
+
+        if not self._fill_buffer():
+            return None
+        self._buffer_pos += 1
+        return self._buffer[self._buffer_pos - 1]
+
+    def get_num_of_req(self):
+        """
+        :return: the total number of requests of all sources
+        """
+
+        if self.num_of_req <= 0:
+            self.num_of_req = sum(reader.get_num_of_req() for reader in self.readers)
+        return self.num_of_req
+
+    def reset(self):
+        """
+        reset all sources back to the beginning
+        """
+
+        self.counter = 0
+        for reader in self.readers:
+            reader.reset()
+        self._init_merge()
+
+    def copy(self, open_c_reader=False):
+        """
+        reader a deep copy of current reader with everything reset to initial state,
+        the returned reader should not interfere with current reader
+
+        :param open_c_reader: not used, merging is done in python
+        :return: a copied reader
+        """
+
+        return MergedReader([reader.copy() for reader in self.readers], self.namespace, self.buffer_size)
+
+    def get_params(self):
+        """
+        return all the parameters for this reader instance in a dictionary
+        :return: a dictionary containing all parameters
+        """
+
+        return {
+            "reader_classes": [reader.__class__ for reader in self.readers],
+            "reader_params_list": [reader.get_params() for reader in self.readers],
+            "namespace": self.namespace,
+            "buffer_size": self.buffer_size
+        }
+
+    def close(self):
+        """
+        close all sources
+        """
+
+        for reader in getattr(self, "readers", []):
+            reader.close()
+        self.readers = []
+
+    def __del__(self):
+        # the sources may still be used elsewhere, they are closed when they are collected
+        pass
+
+    def __next__(self):  # Python 3
+        super().__next__()
+        element = self.read_one_req()
+        if element is not None:
+            return element
+        else:
+            raise StopIteration
+
+    def __repr__(self):
+        return "MergedReader of {} traces: {}".format(len(self.readers), [reader.file_loc for reader in self.readers])
@@ -0,0 +1,199 @@
+# coding=utf-8
+
+"""
+this module provides a sparse offset index for text traces (plain and csv),
+the index records the byte offset of every step-th request, so that a reader can move to any request
+by seeking to the closest indexed request and reading at most step - 1 lines,
+instead of reading every line from the beginning of the trace
+
+the index is built with one vectorized pass over the trace and saved next to the trace as
+<trace>.offsets.npz, it is reused as long as the size and modification time of the trace do not change
+
+"""
+
+import io
+import os
+import numpy as np
+
+from PyMimircache.utils.printing import *
+
+
+OFFSET_INDEX_SUFFIX = ".offsets.npz"
+DEF_OFFSET_INDEX_STEP = 1024
+# the number of bytes scanned at once when building the index
+OFFSET_INDEX_BLOCK_SIZE = 1 << 24
+
+
+def find_lines(buf):
+    """
+    find the non-blank lines in a block of complete lines
+
+    :param buf: a numpy uint8 array of the block
+    :return: a tuple of numpy arrays (begin offset of each line, end offset of each line without newline)
+    """
+
+    newlines = np.flatnonzero(buf == ord("\n"))
+    line_begins = np.concatenate(([0], newlines + 1))
+    line_ends = np.concatenate((newlines, [len(buf)]))
+
+    # a line is blank if all its characters are whitespace (\t\n\v\f\r and space)
+    spaces = np.flatnonzero((buf == 32) | ((buf >= 9) & (buf <= 13)))
+    if len(spaces) == len(newlines):
+        # newlines are the only whitespace, only empty lines are blank
+        non_blank = line_ends > line_begins
+    else:
+        num_of_spaces = np.searchsorted(spaces, line_ends) - np.searchsorted(spaces, line_begins)
+        non_blank = line_ends - line_begins > num_of_spaces
+    return line_begins[non_blank], line_ends[non_blank]
+
+
+def _skip_lines(trace_file, n):
+    """
+    skip n non-blank lines from current position
+
+    :param trace_file: the trace file opened in binary mode
+    :param n: the number of non-blank lines to skip
+    :return: the number of lines skipped, smaller than n at the end of file
+    """
+
+    skipped = 0
+    while skipped < n:
+        line = trace_file.readline()
+        if not line:
+            break
+        if line.strip():
+            skipped += 1
+    return skipped
+
+
+class OffsetIndex:
+    """
+    a sparse index from request number (beginning from 0) to byte offset in a text trace
+    """
+
+    all = ["build", "load", "save", "seek", "tell_req"]
+
+    def __init__(self, offsets, num_of_req, data_begin=0, step=DEF_OFFSET_INDEX_STEP):
+        """
+        :param offsets: a numpy array, the byte offset of request i * step is at index i
+        :param num_of_req: the number of requests in the trace
+        :param data_begin: the offset where requests begin, such as the end of csv header
+        :param step: the number of requests between two indexed requests
+        """
+
+        self.offsets = offsets
+        self.num_of_req = num_of_req
+        self.data_begin = data_begin
+        self.step = step
+
+    @classmethod
+    def build(cls, trace_file, data_begin=0, step=DEF_OFFSET_INDEX_STEP):
+        """
+        scan the trace and build the index, the position of trace_file is restored afterwards
+
+        :param trace_file: the trace file opened in binary mode
+        :param data_begin: the offset where requests begin
+        :param step: the number of requests between two indexed requests
+        :return: an OffsetIndex
+        """
+
+        assert step > 0, "step must be positive"
+        pos = trace_file.tell()
+        trace_file.seek(data_begin, io.SEEK_SET)
+        offsets = []
+        num_of_req = 0
+        block_begin = data_begin
+        block = trace_file.read(OFFSET_INDEX_BLOCK_SIZE)
+        while block:
+            if not block.endswith(b"\n"):
+                block += trace_file.readline()
+            line_begins, _ = find_lines(np.frombuffer(block, dtype=np.uint8))
+            offsets.append(line_begins[(-num_of_req) % step::step] + block_begin)
+            num_of_req += len(line_begins)
+            block_begin += len(block)
+            block = trace_file.read(OFFSET_INDEX_BLOCK_SIZE)
+        trace_file.seek(pos, io.SEEK_SET)
+
+        offsets = np.concatenate(offsets).astype(np.int64) if offsets else np.zeros(0, dtype=np.int64)
+        return cls(offsets, num_of_req, data_begin, step)
+
+    @classmethod
+    def load(cls, trace_loc, data_begin=0, step=DEF_OFFSET_INDEX_STEP):
+        """
+        load the index saved next to the trace
+
+        :param trace_loc: location of the trace
+        :param data_begin: the offset where requests begin
+        :param step: the number of requests between two indexed requests
+        :return: an OffsetIndex, or None if there is no index or the index is out of date
+        """
+
+        index_loc = trace_loc + OFFSET_INDEX_SUFFIX
+        if not os.path.exists(index_loc):
+            return None
+        stat = os.stat(trace_loc)
+        with np.load(index_loc) as index_file:
+            saved_step, num_of_req, saved_data_begin, size, mtime_ns = index_file["meta"].tolist()
+            if (saved_step, saved_data_begin, size, mtime_ns) != (step, data_begin, stat.st_size, stat.st_mtime_ns):
+                return None
+            return cls(index_file["offsets"], num_of_req, data_begin, step)
+
+    def save(self, trace_loc):
+        """
+        save the index next to the trace, a read-only location is skipped with a warning
+
+        :param trace_loc: location of the trace
+        :return: True if saved, otherwise False
+        """
+
+        stat = os.stat(trace_loc)
+        meta = np.array([self.step, self.num_of_req, self.data_begin, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+        try:
+            with open(trace_loc + OFFSET_INDEX_SUFFIX, "wb") as ofile:
+                np.savez(ofile, offsets=self.offsets, meta=meta)
+        except OSError as e:
+            WARNING("cannot save offset index for {}: {}".format(trace_loc, e))
+            return False
+        return True
+
+    def seek(self, trace_file, req_pos):
+        """
+        move trace_file to the beginning of the given request
+
+        :param trace_file: the trace file opened in binary mode
+        :param req_pos: the request number, beginning from 0
+        """
+
+        assert req_pos >= 0, "request position must not be negative"
+        if req_pos >= self.num_of_req:
+            trace_file.seek(0, io.SEEK_END)
+            return
+        trace_file.seek(int(self.offsets[req_pos // self.step]), io.SEEK_SET)
+        _skip_lines(trace_file, req_pos % self.step)
+
+    def tell_req(self, trace_file):
+        """
+        find the request number of the current position of trace_file,
+        which must be at the beginning of a line
+
+        :param trace_file: the trace file opened in binary mode
+        :return: the number of requests before current position
+        """
+
+        pos = trace_file.tell()
+        ind = int(np.searchsorted(self.offsets, pos, side="right")) - 1
+        if ind < 0:
+            return 0
+        trace_file.seek(int(self.offsets[ind]), io.SEEK_SET)
+        req_pos = ind * self.step
+        while trace_file.tell() < pos:
+            line = trace_file.readline()
+            if not line:
+                break
+            if line.strip():
+                req_pos += 1
+        trace_file.seek(pos, io.SEEK_SET)
+        return req_pos
+
+    def __repr__(self):
+        return "OffsetIndex of {} requests, step {}".format(self.num_of_req, self.step)
@@ -6,7 +6,8 @@
 
 """
 
-from PyMimircache.cacheReader.abstractReader import AbstractReader
+from PyMimircache.cacheReader.compressedFile import open_trace_file
+from PyMimircache.cacheReader.abstractReader import AbstractReader, BATCH_FIELDS
 from PyMimircache.const import ALLOW_C_MIMIRCACHE
 
 if ALLOW_C_MIMIRCACHE:
@@ -18,20 +19,25 @@ class PlainReader(AbstractReader):
     PlainReader class
 
     """
-    all = ["read_one_req", "copy", "get_params"]
+    all = ["read_one_req", "read_batch", "skip_n_req", "set_read_pos", "copy", "get_params"]
 
     def __init__(self, file_loc, data_type='c', open_c_reader=True, **kwargs):
         """
         :param file_loc:            location of the file
         :param data_type:           type of data, can be "l" for int/long, "c" for string
         :param open_c_reader:       bool for whether open reader in C backend
-        :param kwargs:              not used now
+        :param kwargs:              lock, label_table (see AbstractReader)
         """
 
-        super(PlainReader, self).__init__(file_loc, data_type, open_c_reader=open_c_reader, lock=kwargs.get("lock"))
-        self.trace_file = open(file_loc, 'rb')
-        if ALLOW_C_MIMIRCACHE and open_c_reader:
-            self.c_reader = c_cacheReader.setup_reader(file_loc, 'p', data_type=data_type, block_unit_size=0)
+        super(PlainReader, self).__init__(file_loc, data_type, open_c_reader=open_c_reader,
+                                          lock=kwargs.get("lock"), label_table=kwargs.get("label_table"))
+        self.trace_file = open_trace_file(file_loc)
+        # a plain text trace has only one column, which is the label
+        self.label_column = 1
+        self.data_begin = 0
+
+    def _setup_c_reader(self):
+        return c_cacheReader.setup_reader(self.file_loc, 'p', data_type=self.data_type, block_unit_size=0)
 
     def read_one_req(self):
         """
@@ -45,10 +51,44 @@ class PlainReader(AbstractReader):
             line = self.trace_file.readline().decode()
 
         if line and len(line.strip()):
-            return line.strip()
+            ret = line.strip()
+            if self.data_type == 'l':
+                ret = int(ret)
+            return self._intern(ret)
         else:
             return None
 
+    def read_batch(self, n, fields=BATCH_FIELDS):
+        """
+        read the next n requests at once, plain text trace only provides label
+
+        :param n: the max number of requests in the batch, the last batch can be shorter
+        :param fields: the fields to read, only label is available in plain text trace
+        :return: a dict mapping from field to a numpy array, None if there is no more request
+        """
+
+        assert n > 0, "batch size must be positive"
+        columns = self._get_batch_columns(fields)
+        lines = self._read_lines(n)
+        if len(lines) == 0:
+            return None
+        if "label" not in columns:
+            return {}
+        return {"label": self._tokens_to_array("label", lines)}
+
+    def _parse_block(self, block, columns):
+        """
+        parse a block of complete lines, each non-blank line is a label
+
+        :param block: bytes of complete lines
+        :param columns: a dict mapping from field to column, only label is available
+        :return: a dict mapping from field to a numpy array
+        """
+
+        if "label" not in columns:
+            return {}
+        return {"label": self._tokens_to_array("label", [line for line in block.split(b"\n") if line.strip()])}
+
     def copy(self, open_c_reader=False):
         """
         reader a deep copy of current reader with everything reset to initial state,
@@ -58,7 +98,10 @@ class PlainReader(AbstractReader):
         :return: a copied reader
         """
 
-        return PlainReader(self.file_loc, data_type=self.data_type, open_c_reader=open_c_reader, lock=self.lock)
+        reader = PlainReader(self.file_loc, data_type=self.data_type, open_c_reader=open_c_reader,
+                             lock=self.lock, label_table=self.label_table)
+        reader.offset_index = self.offset_index
+        return reader
 
     def get_params(self):
         """
@@ -69,13 +112,14 @@ class PlainReader(AbstractReader):
         return {
             "file_loc": self.file_loc,
             "data_type": self.data_type,
-            "open_c_reader": self.open_c_reader
+            "open_c_reader": self.open_c_reader,
+            "label_table": self.label_table
         }
 
     def __next__(self):  # Python 3
         super().__next__()
-        element = self.trace_file.readline().strip()
-        if element:
+        element = self.read_one_req()
+        if element is not None:
             return element
         else:
             raise StopIteration
@@ -0,0 +1,311 @@
+# coding=utf-8
+
+"""
+this module provides a reader that reads and decodes batches of another reader on a background thread,
+the batches are kept in a bounded buffer, so reading the trace overlaps with consuming the requests,
+for example simulating a cache in python
+
+the reader also counts how long the consumer waits for the buffer (the run is bound by reading the trace)
+and how long the background thread waits for free space in the buffer (the run is bound by the consumer),
+see get_stats
+
+"""
+
+import time
+import queue
+import threading
+import numpy as np
+
+from PyMimircache.const import DEF_BATCH_SIZE
+from PyMimircache.cacheReader.abstractReader import AbstractReader, BATCH_FIELDS
+
+
+# the number of batches buffered by default
+DEF_PREFETCH_DEPTH = 4
+# how often (in seconds) a blocked background thread checks whether it is stopped
+_STOP_CHECK_INTERVAL = 0.1
+
+
+class PrefetchReader(AbstractReader):
+    """
+    a reader that prefetches the batches of another reader on a background thread
+    """
+
+    all = ["read_one_req", "read_batch", "get_stats", "get_num_of_req",
+           "reset", "copy", "get_params"]
+
+    def __init__(self, reader=None, batch_size=DEF_BATCH_SIZE, depth=DEF_PREFETCH_DEPTH, fields=BATCH_FIELDS,
+                 reader_class=None, reader_params=None, **kwargs):
+        """
+        :param reader: the reader to prefetch from
+        :param batch_size: the number of requests in each prefetched batch
+        :param depth: the max number of batches in the buffer
+        :param fields: the fields to prefetch, read_batch can only read these fields
+        :param reader_class: the class of the wrapped reader, used with reader_params if reader is None
+        :param reader_params: the parameters of the wrapped reader
+        :param kwargs: not used, prefetching is done in python
+        """
+
+        if reader is None:
+            assert reader_class is not None, "please provide a reader or reader_class and reader_params"
+            reader = reader_class(**reader_params)
+        assert isinstance(reader, AbstractReader), "you provided an invalid cacheReader: {}".format(reader)
+        assert batch_size > 0, "batch size must be positive"
+        assert depth > 0, "depth must be positive"
+        for field in fields:
+            assert field in BATCH_FIELDS, "unknown field {}, supported fields {}".format(field, BATCH_FIELDS)
+
+        super(PrefetchReader, self).__init__(reader.file_loc, reader.data_type, reader.block_unit_size,
+                                             reader.disk_sector_size, lock=reader._lock)
+        self.reader = reader
+        self.batch_size = batch_size
+        self.depth = depth
+        self.fields = tuple(fields)
+        self.support_real_time = reader.support_real_time
+        self.support_size = reader.support_size
+
+        self._thread = None
+        self._init_prefetch()
+
+    def _init_prefetch(self):
+        """
+        clear the buffer and the counters, the background thread is started on first read
+        """
+
+        self._queue = queue.Queue(maxsize=self.depth)
+        self._stop_event = threading.Event()
+        self._end_of_trace = False
+        # prefetched requests not returned yet
+        self._pending = None
+        self._pending_len = 0
+        self._buffer = []
+        self._buffer_pos = 0
+
+        self.num_of_batches = 0
+        self.read_time = 0
+        self.producer_stall_time = 0
+        self.consumer_stall_time = 0
+        self._sum_of_buffer_depth = 0
+        self.max_buffer_depth = 0
+
+    def _prefetch(self):
+        """
+        the background thread, it reads batches from the wrapped reader into the buffer until the end of trace,
+        the end of trace is marked by None, an exception is passed to the consumer through the buffer
+        """
+
+        try:
+            while not self._stop_event.is_set():
+                t = time.perf_counter()
+                batch = self.reader.read_batch(self.batch_size, self.fields)
+                self.read_time += time.perf_counter() - t
+                self._put(batch)
+                if batch is None:
+                    break
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        """
+        put an item into the buffer, wait while the buffer is full unless the reader is stopped
+
+        :param item: a batch, None or an exception
+        """
+
+        try:
+            self._queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        t = time.perf_counter()
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=_STOP_CHECK_INTERVAL)
+                break
+            except queue.Full:
+                pass
+        self.producer_stall_time += time.perf_counter() - t
+
+    def _get(self):
+        """
+        get the next prefetched batch, wait while the buffer is empty
+
+        :return: a batch, None if there is no more request
+        """
+
+        if self._end_of_trace:
+            return None
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._prefetch, name="PrefetchReader", daemon=True)
+            self._thread.start()
+
+        depth = self._queue.qsize()
+        self._sum_of_buffer_depth += depth
+        self.max_buffer_depth = max(self.max_buffer_depth, depth)
+        try:
+            item = self._queue.get_nowait()
+        except queue.Empty:
+            t = time.perf_counter()
+            item = self._queue.get()
+            self.consumer_stall_time += time.perf_counter() - t
+
+        if isinstance(item, Exception):
+            self._end_of_trace = True
+            raise item
+        if item is None:
+            self._end_of_trace = True
+        else:
+            self.num_of_batches += 1
+        return item
+
+    def get_stats(self):
+        """
+        the counters of prefetching, if consumer_stall_time is large compared with the run time,
+        the run is bound by reading the trace, if producer_stall_time is large, it is bound by the consumer
+
+        :return: a dictionary of
+                    num_of_batches:         the number of batches read
+                    read_time:              seconds spent reading batches from the wrapped reader
+                    consumer_stall_time:    seconds the consumer waited for an empty buffer
+                    producer_stall_time:    seconds the background thread waited for a full buffer
+                    avg_buffer_depth:       the average number of batches in the buffer when the consumer reads
+                    max_buffer_depth:       the max number of batches in the buffer when the consumer reads
+        """
+
+        num_of_gets = self.num_of_batches + int(self._end_of_trace)
+        return {
+            "num_of_batches": self.num_of_batches,
+            "read_time": self.read_time,
+            "consumer_stall_time": self.consumer_stall_time,
+            "producer_stall_time": self.producer_stall_time,
+            "avg_buffer_depth": self._sum_of_buffer_depth / num_of_gets if num_of_gets else 0,
+            "max_buffer_depth": self.max_buffer_depth
+        }
+
+    def read_batch(self, n, fields=BATCH_FIELDS):
+        """
+        read the next n requests, see AbstractReader.read_batch
+
+        :param n: the max number of requests in the batch, the last batch can be shorter
+        :param fields: the fields to read, fields that are not prefetched are left out
+        :return: a dict mapping from field to a numpy array, None if there is no more request
+        """
+
+        assert n > 0, "batch size must be positive"
+        parts = [self._pending] if self._pending is not None else []
+        num_of_req = self._pending_len
+        self._pending, self._pending_len = None, 0
+        while num_of_req < n:
+            batch = self._get()
+            if batch is None:
+                break
+            if batch:
+                parts.append(batch)
+                num_of_req += len(next(iter(batch.values())))
+        if num_of_req == 0:
+            return None
+
+        kept_fields = [field for field in fields if all(field in part for part in parts)]
+        if len(parts) == 1 and num_of_req <= n:
+            return {field: parts[0][field] for field in kept_fields}
+        columns = {field: np.concatenate([part[field] for part in parts]) for field in parts[0]}
+        if num_of_req > n:
+            self._pending = {field: column[n:] for field, column in columns.items()}
+            self._pending_len = num_of_req - n
+        return {field: columns[field][:n] for field in kept_fields}
+
+    def read_one_req(self):
+        """
+        read one request
+        :return: the label of the request, None if there is no more request
+        """
+
+        if self._buffer_pos >= len(self._buffer):
+            batch = self.read_batch(DEF_BATCH_SIZE, ("label", ))
+            if batch is None:
+                return None
+            assert "label" in batch, "label is not prefetched"
+            self._buffer = batch["label"].tolist()
+            self._buffer_pos = 0
+        self._buffer_pos += 1
+        return self._buffer[self._buffer_pos - 1]
+
+    def get_num_of_req(self):
+        """
+        :return: the number of requests of the wrapped reader
+        """
+
+        if self.num_of_req <= 0:
+            self.num_of_req = self.reader.get_num_of_req()
+        return self.num_of_req
+
+    def _stop(self):
+        """
+        stop the background thread
+        """
+
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        """
+        stop prefetching, reset the wrapped reader and clear the buffer and the counters
+        """
+
+        self._stop()
+        self.counter = 0
+        self.reader.reset()
+        self._init_prefetch()
+
+    def copy(self, open_c_reader=False):
+        """
+        reader a deep copy of current reader with everything reset to initial state,
+        the returned reader should not interfere with current reader
+
+        :param open_c_reader: whether open c reader for the wrapped reader
+        :return: a copied reader
+        """
+
+        return PrefetchReader(self.reader.copy(open_c_reader), self.batch_size, self.depth, self.fields)
+
+    def get_params(self):
+        """
+        return all the parameters for this reader instance in a dictionary
+        :return: a dictionary containing all parameters
+        """
+
+        return {
+            "reader_class": self.reader.__class__,
+            "reader_params": self.reader.get_params(),
+            "batch_size": self.batch_size,
+            "depth": self.depth,
+            "fields": self.fields
+        }
+
+    def close(self):
+        """
+        stop prefetching and close the wrapped reader
+        """
+
+        if getattr(self, "reader", None) is not None:
+            self._stop()
+            self.reader.close()
+            self.reader = None
+
+    def __del__(self):
+        # the wrapped reader may still be used elsewhere, only the background thread is stopped
+        if getattr(self, "_thread", None) is not None:
+            self._stop()
+
+    def __next__(self):  # Python 3
+        super().__next__()
+        element = self.read_one_req()
+        if element is not None:
+            return element
+        else:
+            raise StopIteration
+
+    def __repr__(self):
+        return "PrefetchReader of {}, {} batches of {} requests".format(self.reader, self.depth, self.batch_size)
@@ -1,35 +1,127 @@
 # coding=utf-8
 
 """
-this module contains the Req class, which describes a request
+this module contains the request representations,
+Req describes a single request, RequestBatch describes a batch of requests as a struct of numpy arrays,
+so size/op-aware simulations can go through a trace without creating one python object per request
 
 """
 
+import numpy as np
 
 
 class Req:
-    def __init__(self, item_id, size=1, op=None, cost=-1, **kwargs):
-        self._item_id = item_id
-        self._size = size
-        self._op = op
-        self._cost = cost
+    """
+    a single request, slotted so that it has no per-instance __dict__
+    """
 
-    @property
-    def item_id(self):
-        return self._item_id
+    __slots__ = ("item_id", "size", "op", "cost", "timestamp")
 
-    @property
-    def size(self):
-        return self._size
+    def __init__(self, item_id, size=1, op=None, cost=-1, timestamp=None, **kwargs):
+        self.item_id = item_id
+        self.size = size
+        self.op = op
+        self.cost = cost
+        self.timestamp = timestamp
 
-    @property
-    def op(self):
-        return self._op
+    def __repr__(self):
+        return "Req(item_id={}, size={}, op={}, cost={}, timestamp={})".format(
+            self.item_id, self.size, self.op, self.cost, self.timestamp)
 
-    @property
-    def cost(self):
-        return self._cost
 
+class RequestBatch:
+    """
+    a batch of requests as a struct of arrays, request i is (ids[i], sizes[i], ops[i], costs[i], timestamps[i]),
+    ids is always present, the other fields are None if the trace does not provide them
+    """
 
+    __slots__ = ("ids", "sizes", "ops", "costs", "timestamps")
+    all = ["from_columns", "from_reqs", "get_sizes", "get_req"]
 
+    # the field of reader batch (see AbstractReader.read_batch) of each attribute
+    COLUMN_FIELDS = {"ids": "label", "sizes": "size", "ops": "op", "timestamps": "time"}
 
+    def __init__(self, ids, sizes=None, ops=None, costs=None, timestamps=None):
+        """
+        :param ids: a numpy array of item ids (labels)
+        :param sizes: a numpy array of sizes or None
+        :param ops: a numpy array of operations or None
+        :param costs: a numpy array of costs or None
+        :param timestamps: a numpy array of timestamps or None
+        """
+
+        self.ids = np.asarray(ids)
+        self.sizes = sizes
+        self.ops = ops
+        self.costs = costs
+        self.timestamps = timestamps
+        for attr in RequestBatch.__slots__[1:]:
+            assert getattr(self, attr) is None or len(getattr(self, attr)) == len(self.ids), \
+                "{} has {} requests, but ids has {}".format(attr, len(getattr(self, attr)), len(self.ids))
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        create a batch from a batch of a reader
+
+        :param columns: a dict mapping from field to a numpy array, returned by reader.read_batch
+        :return: a RequestBatch, None if columns is None
+        """
+
+        if columns is None:
+            return None
+        assert "label" in columns, "the batch must contain label"
+        return cls(**{attr: columns.get(field) for attr, field in cls.COLUMN_FIELDS.items()})
+
+    @classmethod
+    def from_reqs(cls, reqs):
+        """
+        create a batch from a list of Req
+
+        :param reqs: a list of Req
+        :return: a RequestBatch
+        """
+
+        return cls(np.array([req.item_id for req in reqs]),
+                   np.array([req.size for req in reqs], dtype=np.int64),
+                   np.array([req.op for req in reqs], dtype=object),
+                   np.array([req.cost for req in reqs]),
+                   np.array([req.timestamp for req in reqs]))
+
+    def get_sizes(self):
+        """
+        :return: the sizes of requests, 1 for each request if the trace does not provide size
+        """
+
+        if self.sizes is None:
+            return np.ones(len(self.ids), dtype=np.int64)
+        return self.sizes
+
+    def get_req(self, i):
+        """
+        :param i: the index of the request in the batch
+        :return: the request as a Req
+        """
+
+        fields = [getattr(self, attr)[i] if getattr(self, attr) is not None else default
+                  for attr, default in zip(RequestBatch.__slots__, (None, 1, None, -1, None))]
+        # convert numpy scalars to python objects, so that the Req is the same as one created from python values
+        return Req(*(field.item() if isinstance(field, np.generic) else field for field in fields))
+
+    def __getitem__(self, key):
+        """
+        :param key: an integer index, or a slice or mask of the batch
+        :return: a Req for integer index, otherwise a RequestBatch
+        """
+
+        if isinstance(key, (int, np.integer)):
+            return self.get_req(key)
+        return RequestBatch(*(getattr(self, attr)[key] if getattr(self, attr) is not None else None
+                              for attr in RequestBatch.__slots__))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return "RequestBatch of {} requests, fields {}".format(
+            len(self.ids), [attr for attr in RequestBatch.__slots__ if getattr(self, attr) is not None])
@@ -0,0 +1,282 @@
+# coding=utf-8
+
+"""
+this module provides the reader for spatial sampling (SHARDS),
+it wraps another reader and only keeps the requests whose label hash is not larger than a threshold,
+so all requests of a sampled object are kept and the reuse distances on the sampled trace
+are the reuse distances on the original trace scaled by the sample rate
+
+two modes are supported
+    fixed rate:     the threshold is fixed, the number of sampled objects grows with the trace
+    fixed size:     at most sample_size objects are sampled, when a new object exceeds the size,
+                    the object with the largest hash is dropped and the threshold is lowered to below its hash,
+                    so the sample rate adapts to the number of objects in the trace
+
+besides the fields of the wrapped reader, each batch contains
+    hash:           the hash of the label
+    threshold:      the threshold when the request was sampled, the sample rate is (threshold + 1) / 2^64
+
+see Waldspurger et al., Efficient MRC Construction with SHARDS, FAST 15
+
+"""
+
+import heapq
+import numpy as np
+
+from PyMimircache.const import DEF_BATCH_SIZE
+from PyMimircache.cacheReader.abstractReader import AbstractReader, BATCH_FIELDS
+from PyMimircache.utils.sketch import hash_labels, U64_MASK
+
+
+def rate_to_threshold(sample_rate):
+    """
+    :param sample_rate: the fraction of objects sampled, in (0, 1]
+    :return: the max hash of sampled objects
+    """
+
+    assert 0 < sample_rate <= 1, "sample rate must be in (0, 1]"
+    return min(max(int(sample_rate * (1 << 64)) - 1, 0), U64_MASK)
+
+
+def threshold_to_rate(threshold):
+    """
+    :param threshold: the max hash of sampled objects
+    :return: the fraction of objects sampled
+    """
+
+    return (int(threshold) + 1) / (1 << 64)
+
+
+class SamplingReader(AbstractReader):
+    """
+    a reader that samples the objects of another reader by the hash of their labels
+    """
+
+    all = ["read_one_req", "read_batch", "get_sample_rate", "get_num_of_scanned_req",
+           "reset", "copy", "get_params"]
+
+    def __init__(self, reader=None, sample_rate=0.01, sample_size=None, seed=0,
+                 reader_class=None, reader_params=None):
+        """
+        :param reader: the reader to sample from
+        :param sample_rate: the sample rate of fixed rate mode, or the initial sample rate of fixed size mode
+        :param sample_size: the max number of sampled objects, enables fixed size mode if given
+        :param seed: the seed of the hash function
+        :param reader_class: the class of the reader to sample from, used with reader_params if reader is None
+        :param reader_params: the parameters of the reader to sample from
+        """
+
+        if reader is None:
+            assert reader_class is not None, "please provide a reader or reader_class and reader_params"
+            reader = reader_class(**reader_params)
+        assert isinstance(reader, AbstractReader), "you provided an invalid cacheReader: {}".format(reader)
+        assert sample_size is None or sample_size > 0, "sample size must be positive"
+
+        super(SamplingReader, self).__init__(reader.file_loc, reader.data_type, reader.block_unit_size,
+                                             reader.disk_sector_size, lock=reader._lock)
+        self.reader = reader
+        self.sample_rate = sample_rate
+        self.sample_size = sample_size
+        self.seed = seed
+        self.support_real_time = reader.support_real_time
+        self.support_size = reader.support_size
+        self._init_sample()
+
+    def _init_sample(self):
+        """
+        clear the sampling state
+        """
+
+        self.threshold = rate_to_threshold(self.sample_rate)
+        # the number of requests read from the wrapped reader
+        self.num_of_scanned_req = 0
+        # the hashes of the sampled objects and a max heap (of negated hashes) of them, fixed size mode only
+        self._sampled_hashes = set()
+        self._hash_heap = []
+        # sampled requests read from the wrapped reader but not returned yet
+        self._pending = None
+        self._buffer = []
+        self._buffer_pos = 0
+
+    def get_sample_rate(self):
+        """
+        :return: current sample rate
+        """
+
+        return threshold_to_rate(self.threshold)
+
+    def get_num_of_scanned_req(self):
+        """
+        :return: the number of requests read from the wrapped reader,
+                    including requests not sampled and requests read ahead
+        """
+
+        return self.num_of_scanned_req
+
+    def _sample_fixed_size(self, hashes):
+        """
+        admit the requests that pass current threshold one by one,
+        the threshold is lowered when the number of sampled objects exceeds sample_size
+
+        :param hashes: a numpy uint64 array of hashes that pass current threshold
+        :return: a tuple of (indexes of sampled requests, threshold when each request is sampled)
+        """
+
+        sampled_hashes, hash_heap = self._sampled_hashes, self._hash_heap
+        indexes, thresholds = [], []
+        for i, h in enumerate(hashes.tolist()):
+            if h > self.threshold:
+                continue
+            if h not in sampled_hashes:
+                sampled_hashes.add(h)
+                heapq.heappush(hash_heap, -h)
+                if len(sampled_hashes) > self.sample_size:
+                    max_hash = -heapq.heappop(hash_heap)
+                    sampled_hashes.remove(max_hash)
+                    self.threshold = max_hash - 1
+                    if h > self.threshold:
+                        continue
+            indexes.append(i)
+            thresholds.append(self.threshold)
+        return np.array(indexes, dtype=np.int64), np.array(thresholds, dtype=np.uint64)
+
+    def _sample(self, columns):
+        """
+        sample a batch of the wrapped reader
+
+        :param columns: a batch of the wrapped reader
+        :return: the sampled batch with hash and threshold
+        """
+
+        hashes = hash_labels(columns["label"], self.seed)
+        selected = np.flatnonzero(hashes <= np.uint64(self.threshold))
+        if self.sample_size is None:
+            thresholds = np.full(len(selected), self.threshold, dtype=np.uint64)
+        else:
+            indexes, thresholds = self._sample_fixed_size(hashes[selected])
+            selected = selected[indexes]
+        sampled = {field: column[selected] for field, column in columns.items()}
+        sampled["hash"] = hashes[selected]
+        sampled["threshold"] = thresholds
+        return sampled
+
+    def read_batch(self, n, fields=BATCH_FIELDS):
+        """
+        read the next n sampled requests, see AbstractReader.read_batch,
+        the batch also contains hash and threshold of each request
+
+        :param n: the max number of requests in the batch, the last batch can be shorter
+        :param fields: the fields to read from the wrapped reader
+        :return: a dict mapping from field to a numpy array, None if there is no more request
+        """
+
+        assert n > 0, "batch size must be positive"
+        reader_fields = tuple(fields) if "label" in fields else ("label", ) + tuple(fields)
+        parts = [self._pending] if self._pending is not None else []
+        num_of_sampled = len(self._pending["label"]) if self._pending is not None else 0
+        self._pending = None
+        while num_of_sampled < n:
+            columns = self.reader.read_batch(max(n, DEF_BATCH_SIZE), reader_fields)
+            if columns is None:
+                break
+            self.num_of_scanned_req += len(columns["label"])
+            sampled = self._sample(columns)
+            num_of_sampled += len(sampled["label"])
+            parts.append(sampled)
+
+        if num_of_sampled == 0:
+            return None
+        batch = {field: np.concatenate([part[field] for part in parts]) for field in parts[0]}
+        if num_of_sampled > n:
+            self._pending = {field: column[n:] for field, column in batch.items()}
+            batch = {field: column[:n] for field, column in batch.items()}
+        if "label" not in fields:
+            del batch["label"]
+        return batch
+
+    def read_one_req(self):
+        """
+        read one sampled request
+        :return: the label of the request, None if there is no more request
+        """
+
+        if self._buffer_pos >= len(self._buffer):
+            batch = self.read_batch(DEF_BATCH_SIZE, ("label", ))
+            if batch is None:
+                return None
+            self._buffer = batch["label"].tolist()
+            self._buffer_pos = 0
+        self._buffer_pos += 1
+        return self._buffer[self._buffer_pos - 1]
+
+    def get_num_of_req(self):
+        """
+        count the number of sampled requests, the sampling state is reset afterwards
+        :return: the number of sampled requests
+        """
+
+        if self.num_of_req <= 0:
+            self.reset()
+            self.num_of_req = sum(len(batch["label"]) for batch in self.iter_batches(fields=("label", )))
+            self.reset()
+        return self.num_of_req
+
+    def reset(self):
+        """
+        reset the read location and the sampling state, so that the same requests are sampled again
+        """
+
+        self.counter = 0
+        self.reader.reset()
+        self._init_sample()
+
+    def copy(self, open_c_reader=False):
+        """
+        reader a deep copy of current reader with everything reset to initial state,
+        the returned reader should not interfere with current reader
+
+        :param open_c_reader: not used, sampling is done in python
+        :return: a copied reader
+        """
+
+        return SamplingReader(self.reader.copy(), self.sample_rate, self.sample_size, self.seed)
+
+    def get_params(self):
+        """
+        return all the parameters for this reader instance in a dictionary
+        :return: a dictionary containing all parameters
+        """
+
+        return {
+            "reader_class": self.reader.__class__,
+            "reader_params": self.reader.get_params(),
+            "sample_rate": self.sample_rate,
+            "sample_size": self.sample_size,
+            "seed": self.seed
+        }
+
+    def close(self):
+        """
+        close the wrapped reader
+        """
+
+        if getattr(self, "reader", None) is not None:
+            self.reader.close()
+            self.reader = None
+
+    def __del__(self):
+        # the wrapped reader may still be used elsewhere, it is closed when it is collected
+        pass
+
+    def __next__(self):  # Python 3
+        super().__next__()
+        element = self.read_one_req()
+        if element is not None:
+            return element
+        else:
+            raise StopIteration
+
+    def __repr__(self):
+        if self.sample_size is None:
+            return "SamplingReader of {} at rate {}".format(self.reader, self.sample_rate)
+        return "SamplingReader of {} with at most {} objects".format(self.reader, self.sample_size)
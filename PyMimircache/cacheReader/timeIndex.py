@@ -0,0 +1,147 @@
+# coding=utf-8
+
+"""
+this module provides a sparse timestamp index for traces with real time (binary, vscsi and csv),
+for every step-th request, the index records the max timestamp of all requests before it,
+so the first request at or after a given time can be found by a binary search in the index,
+a seek to the indexed request and reading at most about step requests,
+instead of reading every request from the beginning of the trace
+
+the max timestamp is used instead of the timestamp, so the search is also correct
+when timestamps are not sorted, it is only faster when they are
+
+the index is built with one pass over the trace in batches and saved next to the trace as
+<trace>.times.npz, it is reused as long as the size and modification time of the trace
+and the time column do not change
+
+"""
+
+import os
+import numpy as np
+
+from PyMimircache.utils.printing import *
+
+
+TIME_INDEX_SUFFIX = ".times.npz"
+DEF_TIME_INDEX_STEP = 1024
+
+
+class TimeIndex:
+    """
+    a sparse index from timestamp to request number (beginning from 0)
+    """
+
+    all = ["build", "load", "save", "locate"]
+
+    def __init__(self, max_times, num_of_req, time_column, step=DEF_TIME_INDEX_STEP):
+        """
+        :param max_times: a numpy float64 array, the max timestamp of requests before request i * step is at index i,
+                            -inf at index 0
+        :param num_of_req: the number of requests in the trace
+        :param time_column: the time column of the trace
+        :param step: the number of requests between two indexed requests
+        """
+
+        self.max_times = max_times
+        self.num_of_req = num_of_req
+        self.time_column = time_column
+        self.step = step
+
+    @classmethod
+    def build(cls, reader, step=DEF_TIME_INDEX_STEP):
+        """
+        read the timestamps of the trace and build the index, the reader is reset afterwards
+
+        :param reader: a reader of a trace with real time
+        :param step: the number of requests between two indexed requests
+        :return: a TimeIndex
+        """
+
+        assert step > 0, "step must be positive"
+        reader.reset()
+        max_times = [np.array([-np.inf])]
+        num_of_req = 0
+        running_max = -np.inf
+        for batch in reader.iter_batches(fields=("time", )):
+            assert "time" in batch, "the trace does not have real time"
+            cummax = np.maximum.accumulate(np.maximum(batch["time"].astype(np.float64), running_max))
+            # the max before request k * step is the cumulative max at request k * step - 1
+            max_times.append(cummax[(-num_of_req - 1) % step::step])
+            num_of_req += len(cummax)
+            running_max = cummax[-1]
+        reader.reset()
+
+        max_times = np.concatenate(max_times)
+        # the last entry may be the max of all requests, which does not begin any indexed request
+        max_times = max_times[:(num_of_req - 1) // step + 1] if num_of_req else max_times[:1]
+        return cls(max_times, num_of_req, reader.time_column, step)
+
+    @classmethod
+    def load(cls, trace_loc, time_column, step=DEF_TIME_INDEX_STEP):
+        """
+        load the index saved next to the trace
+
+        :param trace_loc: location of the trace
+        :param time_column: the time column of the trace
+        :param step: the number of requests between two indexed requests
+        :return: a TimeIndex, or None if there is no index or the index is out of date
+        """
+
+        index_loc = trace_loc + TIME_INDEX_SUFFIX
+        if not os.path.exists(index_loc):
+            return None
+        stat = os.stat(trace_loc)
+        with np.load(index_loc) as index_file:
+            saved_step, num_of_req, saved_time_column, size, mtime_ns = index_file["meta"].tolist()
+            if (saved_step, saved_time_column, size, mtime_ns) != (step, time_column, stat.st_size, stat.st_mtime_ns):
+                return None
+            return cls(index_file["max_times"], num_of_req, time_column, step)
+
+    def save(self, trace_loc):
+        """
+        save the index next to the trace, a read-only location is skipped with a warning
+
+        :param trace_loc: location of the trace
+        :return: True if saved, otherwise False
+        """
+
+        stat = os.stat(trace_loc)
+        meta = np.array([self.step, self.num_of_req, self.time_column, stat.st_size, stat.st_mtime_ns],
+                        dtype=np.int64)
+        try:
+            with open(trace_loc + TIME_INDEX_SUFFIX, "wb") as ofile:
+                np.savez(ofile, max_times=self.max_times, meta=meta)
+        except OSError as e:
+            WARNING("cannot save time index for {}: {}".format(trace_loc, e))
+            return False
+        return True
+
+    def locate(self, reader, ts, begin=0, inclusive=True):
+        """
+        find the first request from request begin whose timestamp is at least (or larger than) ts,
+        the reader is left at the found request, so the next request read is the found request
+
+        :param reader: the reader of the trace
+        :param ts: the timestamp
+        :param begin: the request number to search from
+        :param inclusive: True for the first timestamp >= ts, False for the first timestamp > ts
+        :return: a tuple of (request number, timestamp of the request),
+                    (number of requests, None) if there is no such request
+        """
+
+        ind = int(np.searchsorted(self.max_times, ts, side="left" if inclusive else "right")) - 1
+        pos = max(ind * self.step, begin)
+        reader.set_read_pos(pos)
+        batch = reader.read_batch(self.step, ("time", ))
+        while batch is not None:
+            times = batch["time"]
+            found = np.flatnonzero(times >= ts if inclusive else times > ts)
+            if len(found):
+                reader.set_read_pos(pos + int(found[0]))
+                return pos + int(found[0]), times[found[0]].item()
+            pos += len(times)
+            batch = reader.read_batch(self.step, ("time", ))
+        return pos, None
+
+    def __repr__(self):
+        return "TimeIndex of {} requests, step {}".format(self.num_of_req, self.step)
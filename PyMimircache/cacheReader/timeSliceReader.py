@@ -0,0 +1,242 @@
+# coding=utf-8
+
+"""
+this module provides the reader of a time window of a trace,
+it wraps a reader of a trace with real time (binary, vscsi or csv),
+seeks to the first request at or after start_ts through the timestamp index (see timeIndex)
+and stops at the first request at or after end_ts,
+so a window of a large trace can be analyzed without cutting the trace or reading it from the beginning
+
+"""
+
+import numpy as np
+
+from PyMimircache.const import DEF_BATCH_SIZE
+from PyMimircache.cacheReader.abstractReader import AbstractReader, BATCH_FIELDS
+from PyMimircache.cacheReader.timeIndex import TimeIndex
+
+
+class TimeSliceReader(AbstractReader):
+    """
+    a reader of the requests in [start_ts, end_ts) of another reader
+    """
+
+    all = ["read_one_req", "read_time_req", "read_batch", "get_begin_pos", "get_time_index",
+           "reset", "copy", "get_params"]
+
+    def __init__(self, reader=None, start_ts=None, end_ts=None, reader_class=None, reader_params=None):
+        """
+        :param reader: the reader of a trace with real time
+        :param start_ts: the window begins at the first request whose timestamp >= start_ts,
+                            None for the beginning of the trace
+        :param end_ts: the window ends before the first request after the beginning whose timestamp >= end_ts,
+                            None for the end of the trace
+        :param reader_class: the class of the wrapped reader, used with reader_params if reader is None
+        :param reader_params: the parameters of the wrapped reader
+        """
+
+        if reader is None:
+            assert reader_class is not None, "please provide a reader or reader_class and reader_params"
+            reader = reader_class(**reader_params)
+        assert isinstance(reader, AbstractReader), "you provided an invalid cacheReader: {}".format(reader)
+        time_column = getattr(reader, "time_column", None)
+        assert time_column and time_column != -1, "the trace does not have real time"
+        assert start_ts is None or end_ts is None or start_ts <= end_ts, \
+            "start_ts {} is after end_ts {}".format(start_ts, end_ts)
+
+        super(TimeSliceReader, self).__init__(reader.file_loc, reader.data_type, reader.block_unit_size,
+                                              reader.disk_sector_size, lock=reader._lock)
+        self.reader = reader
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.time_column = time_column
+        self.support_real_time = True
+        self.support_size = reader.support_size
+
+        # the request number of the first request in the window, found on first read
+        self.begin_pos = None
+        self._init_read()
+
+    def _init_read(self):
+        """
+        clear the read state, the wrapped reader is moved to the beginning of the window on first read
+        """
+
+        self.end_of_window = False
+        self._positioned = False
+        self._buffer = []
+        self._buffer_pos = 0
+
+    def get_begin_pos(self):
+        """
+        :return: the request number of the first request in the window in the wrapped trace
+        """
+
+        if self.begin_pos is None:
+            if self.start_ts is None:
+                self.begin_pos = 0
+            else:
+                self.begin_pos, _ = self.reader.get_time_index().locate(self.reader, self.start_ts)
+        return self.begin_pos
+
+    def get_time_index(self):
+        """
+        the timestamp index of the window, it is built in memory and not saved,
+        because it would replace the index of the whole trace
+
+        :return: a TimeIndex
+        """
+
+        if self.time_index is None:
+            self.time_index = TimeIndex.build(self)
+        return self.time_index
+
+    def read_batch(self, n, fields=BATCH_FIELDS):
+        """
+        read the next n requests in the window, see AbstractReader.read_batch
+
+        :param n: the max number of requests in the batch, the last batch can be shorter
+        :param fields: the fields to read, can be label, time, size and op
+        :return: a dict mapping from field to a numpy array, None if there is no more request in the window
+        """
+
+        assert n > 0, "batch size must be positive"
+        if self.end_of_window:
+            return None
+        if not self._positioned:
+            self.reader.set_read_pos(self.get_begin_pos())
+            self._positioned = True
+
+        reader_fields = tuple(fields) if "time" in fields else tuple(fields) + ("time", )
+        batch = self.reader.read_batch(n, reader_fields)
+        if batch is None:
+            self.end_of_window = True
+            return None
+        if self.end_ts is not None:
+            ended = np.flatnonzero(batch["time"] >= self.end_ts)
+            if len(ended):
+                self.end_of_window = True
+                batch = {field: column[:ended[0]] for field, column in batch.items()}
+                if ended[0] == 0:
+                    return None
+        if "time" not in fields:
+            del batch["time"]
+        return batch
+
+    def _fill_buffer(self):
+        """
+        read the next batch of (time, label) for read_one_req and read_time_req
+        :return: False if there is no more request in the window
+        """
+
+        if self._buffer_pos < len(self._buffer):
+            return True
+        batch = self.read_batch(DEF_BATCH_SIZE, ("label", "time"))
+        if batch is None:
+            return False
+        self._buffer = list(zip(batch["time"].tolist(), batch["label"].tolist()))
+        self._buffer_pos = 0
+        return True
+
+    def read_one_req(self):
+        """
+        read one request in the window
+        :return: the label of the request, None if there is no more request in the window
+        """
+
+        if not self._fill_buffer():
+            return None
+        self._buffer_pos += 1
+        return self._buffer[self._buffer_pos - 1][1]
+
+    def read_time_req(self):
+        """
+        read one request in the window with its time
+        :return: a tuple of (time, request label), None if there is no more request in the window
+        """
+
+        if not self._fill_buffer():
+            return None
+        self._buffer_pos += 1
+        return self._buffer[self._buffer_pos - 1]
+
+    def get_num_of_req(self):
+        """
+        count the number of requests in the window, the reader is reset afterwards
+        :return: the number of requests in the window
+        """
+
+        if self.num_of_req <= 0:
+            self.reset()
+            self.num_of_req = sum(len(batch["time"]) for batch in self.iter_batches(fields=("time", )))
+            self.reset()
+        return self.num_of_req
+
+    def set_read_pos(self, pos):
+        """
+        move to the given request in the window so that the next request read is request pos (beginning from 0)
+
+        :param pos: the request number in the window
+        """
+
+        self._init_read()
+        self.reader.set_read_pos(self.get_begin_pos() + pos)
+        self._positioned = True
+
+    def reset(self):
+        """
+        reset the read location back to the beginning of the window
+        """
+
+        self.counter = 0
+        self._init_read()
+
+    def copy(self, open_c_reader=False):
+        """
+        reader a deep copy of current reader with everything reset to initial state,
+        the returned reader should not interfere with current reader
+
+        :param open_c_reader: whether open c reader for the wrapped reader
+        :return: a copied reader
+        """
+
+        reader = TimeSliceReader(self.reader.copy(open_c_reader), self.start_ts, self.end_ts)
+        reader.begin_pos = self.begin_pos
+        return reader
+
+    def get_params(self):
+        """
+        return all the parameters for this reader instance in a dictionary
+        :return: a dictionary containing all parameters
+        """
+
+        return {
+            "reader_class": self.reader.__class__,
+            "reader_params": self.reader.get_params(),
+            "start_ts": self.start_ts,
+            "end_ts": self.end_ts
+        }
+
+    def close(self):
+        """
+        close the wrapped reader
+        """
+
+        if getattr(self, "reader", None) is not None:
+            self.reader.close()
+            self.reader = None
+
+    def __del__(self):
+        # the wrapped reader may still be used elsewhere, it is closed when it is collected
+        pass
+
+    def __next__(self):  # Python 3
+        super().__next__()
+        element = self.read_one_req()
+        if element is not None:
+            return element
+        else:
+            raise StopIteration
+
+    def __repr__(self):
+        return "TimeSliceReader of {} in [{}, {})".format(self.reader, self.start_ts, self.end_ts)
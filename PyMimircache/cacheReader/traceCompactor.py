@@ -0,0 +1,217 @@
+# coding=utf-8
+
+"""
+this module converts a trace opened by any reader into a compact binary trace,
+in which every field is a fixed-width number and labels are remapped to dense ids,
+the compacted trace can be opened by BinaryReader, so both C backend and the memory-mapped
+columnar access work on it, re-parsing text traces for every experiment is avoided
+
+the compacted trace comes with two sidecar files
+    <trace>.meta.json:    num_of_req, num_of_uniq_req, time span and the init_params for BinaryReader
+    <trace>.labels.npy:   the label dictionary, the label of id i is at index i-1
+
+"""
+
+import os
+import json
+import numpy as np
+
+from PyMimircache.const import DEF_BATCH_SIZE
+from PyMimircache.cacheReader.binaryReader import BinaryReader, fmt_to_dtype
+from PyMimircache.cacheReader.labelTable import LabelTable
+from PyMimircache.utils.printing import *
+
+
+META_SUFFIX = ".meta.json"
+LABELS_SUFFIX = ".labels.npy"
+
+# the fmt of op ids, label fmt is chosen by the user, time and size fmt are chosen from the data
+OP_FMT = "B"
+TIME_FMTS = ("q", "d")
+SIZE_FMTS = ("I", "Q", "q")
+
+
+def _is_integral(values):
+    """
+    :param values: a numpy array
+    :return: whether all values are integers
+    """
+
+    values = np.asarray(values)
+    if values.dtype.kind in "iub":
+        return True
+    return bool(np.all(np.mod(values.astype(np.float64), 1) == 0))
+
+
+def _fits(values, fmt):
+    """
+    check whether the values can be stored with the given fmt without changing them
+
+    :param values: a numpy array
+    :param fmt: one of q, d, I, Q
+    :return: True if the values fit
+    """
+
+    values = np.asarray(values)
+    if fmt == "d" or len(values) == 0:
+        return True
+    if not _is_integral(values):
+        return False
+    info = np.iinfo(fmt_to_dtype("<" + fmt)["f1"])
+    if values.dtype.kind == "f":
+        # compare in float, the float of the max of a 64-bit type rounds up, so it is excluded
+        return bool(values.min() >= info.min and values.max() < float(info.max) + 1)
+    return bool(int(values.min()) >= info.min and int(values.max()) <= info.max)
+
+
+def _choose_fmt(values, fmts):
+    """
+    :param values: a numpy array
+    :param fmts: the candidate fmts from the narrowest
+    :return: the first fmt that fits the values
+    """
+
+    for fmt in fmts:
+        if _fits(values, fmt):
+            return fmt
+    raise RuntimeError("values in [{}, {}] cannot be stored with any of {}".format(
+        np.min(values), np.max(values), fmts))
+
+
+def compact_trace(reader, out_path, label_fmt="I", batch_size=DEF_BATCH_SIZE, time_fmt=None, size_fmt=None):
+    """
+    stream the trace of the given reader (from the beginning) into a compact binary trace,
+    label is remapped to dense ids beginning from 1, op is remapped to ids as well,
+    time is stored as a 64-bit integer, or a 64-bit float if it has fractions,
+    size is stored as a 32-bit integer, or a 64-bit integer if it is too large or negative,
+    the fmt of time and size are chosen from the first batch unless given,
+    a later value that does not fit raises a RuntimeError instead of being changed,
+    only the fields provided by the reader are stored
+
+    :param reader: any reader
+    :param out_path: the location of the compacted trace, sidecar files are written next to it
+    :param label_fmt: the fmt of label ids, "I" for 32-bit or "Q" for 64-bit ids
+    :param batch_size: the number of requests converted at once
+    :param time_fmt: the fmt of time, "q" for 64-bit integer or "d" for 64-bit float, None to choose from data
+    :param size_fmt: the fmt of size, "I", "Q" or "q", None to choose from data
+    :return: a dict of the metadata saved in the sidecar
+    """
+
+    assert label_fmt in ("I", "Q"), "label_fmt can only be I (32-bit) or Q (64-bit)"
+    assert time_fmt in (None, ) + TIME_FMTS, "time_fmt can only be one of {}".format(TIME_FMTS)
+    assert size_fmt in (None, ) + SIZE_FMTS, "size_fmt can only be one of {}".format(SIZE_FMTS)
+    max_label_id = np.iinfo(np.uint32 if label_fmt == "I" else np.uint64).max
+
+    reader.reset()
+    batch = reader.read_batch(batch_size)
+    assert batch is not None, "trace {} is empty".format(reader.file_loc)
+    fields = ["label"] + [field for field in ("time", "size", "op") if field in batch]
+    field_fmt = {"op": OP_FMT}
+    if "time" in batch:
+        field_fmt["time"] = time_fmt or _choose_fmt(batch["time"], TIME_FMTS)
+    if "size" in batch:
+        field_fmt["size"] = size_fmt or _choose_fmt(batch["size"], SIZE_FMTS)
+    fmt = "<" + label_fmt + "".join(field_fmt[field] for field in fields[1:])
+    dtype = fmt_to_dtype(fmt)
+
+    label_table = LabelTable()
+    op_table = LabelTable()
+    num_of_req = 0
+    first_ts, last_ts = None, None
+    with open(out_path, "wb") as ofile:
+        while batch is not None:
+            records = np.zeros(len(batch["label"]), dtype=dtype)
+            records["f1"] = label_table.intern_array(batch["label"])
+            if len(label_table) > max_label_id:
+                raise RuntimeError("too many unique labels for label_fmt {}, please use Q".format(label_fmt))
+
+            for column, field in enumerate(fields[1:], 2):
+                if field == "op":
+                    records["f{}".format(column)] = op_table.intern_array(batch["op"])
+                    assert len(op_table) <= 255, "too many different ops to be stored in one byte"
+                    continue
+                if not _fits(batch[field], field_fmt[field]):
+                    raise RuntimeError("{} at request {} cannot be stored with fmt {}, please give {}_fmt".format(
+                        field, num_of_req, field_fmt[field], field))
+                records["f{}".format(column)] = batch[field]
+                if field == "time":
+                    if first_ts is None:
+                        first_ts = records["f{}".format(column)][0].item()
+                    last_ts = records["f{}".format(column)][-1].item()
+
+            records.tofile(ofile)
+            num_of_req += len(records)
+            batch = reader.read_batch(batch_size)
+    reader.reset()
+
+    label_table.save(out_path + LABELS_SUFFIX)
+
+    init_params = {"label": 1, "fmt": fmt}
+    for column, field in enumerate(fields[1:], 2):
+        init_params["real_time" if field == "time" else field] = column
+    meta = {"num_of_req": num_of_req,
+            "num_of_uniq_req": len(label_table),
+            "time_span": last_ts - first_ts if first_ts is not None else 0,
+            "data_type": reader.data_type,
+            "init_params": init_params,
+            "ops": [op if isinstance(op, str) else int(op) for op in op_table.labels],
+            "source": reader.file_loc}
+    with open(out_path + META_SUFFIX, "w") as ofile:
+        json.dump(meta, ofile, indent=2)
+
+    INFO("compacted {} requests ({} uniq) from {} into {}".format(
+        num_of_req, len(label_table), reader.file_loc, out_path))
+    return meta
+
+
+def load_compacted_meta(file_loc):
+    """
+    load the metadata of a compacted trace
+
+    :param file_loc: the location of the compacted trace
+    :return: a dict of metadata
+    """
+
+    assert os.path.exists(file_loc + META_SUFFIX), "{} is not a compacted trace".format(file_loc)
+    with open(file_loc + META_SUFFIX) as ifile:
+        return json.load(ifile)
+
+
+def load_label_dict(file_loc):
+    """
+    load the label dictionary of a compacted trace
+
+    :param file_loc: the location of the compacted trace
+    :return: a numpy array, the original label of id i is at index i-1
+    """
+
+    return np.load(file_loc + LABELS_SUFFIX)
+
+
+def load_label_table(file_loc):
+    """
+    load the label dictionary of a compacted trace as a LabelTable,
+    which can be passed to other readers so that they emit the same ids
+
+    :param file_loc: the location of the compacted trace
+    :return: a LabelTable
+    """
+
+    return LabelTable.load(file_loc + LABELS_SUFFIX)
+
+
+def open_compacted_trace(file_loc, **kwargs):
+    """
+    open a compacted trace with BinaryReader, the number of requests and unique requests
+    are taken from the sidecar so they do not need to be counted again
+
+    :param file_loc: the location of the compacted trace
+    :param kwargs: passed to BinaryReader, such as open_c_reader
+    :return: a BinaryReader
+    """
+
+    meta = load_compacted_meta(file_loc)
+    reader = BinaryReader(file_loc, init_params=meta["init_params"], data_type='l', **kwargs)
+    reader.num_of_req = meta["num_of_req"]
+    reader.num_of_uniq_req = meta["num_of_uniq_req"]
+    return reader
@@ -0,0 +1,272 @@
+# coding=utf-8
+
+"""
+this module provides synthetic workload generators for benchmarking and testing,
+each label generator draws the labels of the next n requests at once with numpy,
+and keeps its position between calls, so a trace is generated in chunks with bounded memory
+
+    ZipfGenerator:              independent requests to num_of_obj objects, object i (from 0) is requested
+                                with probability proportional to 1 / (i + 1)^alpha
+    ScanGenerator:              a sequential scan over new objects, no object is requested twice
+    LoopGenerator:              a sequential loop over loop_size objects
+    ShiftingGenerator:          uniform requests to a working set that moves by shift_size objects
+                                every shift_interval requests
+    MixtureGenerator:           each request comes from one of several generators chosen by weight
+
+generate_trace streams the generated requests into a binary trace through TraceWriter,
+optionally with Poisson arrival timestamps, log-normal sizes and a write ratio
+
+"""
+
+import numpy as np
+
+from PyMimircache.cacheReader.traceWriter import TraceWriter
+from PyMimircache.utils.printing import *
+
+
+# the number of requests generated and written at once
+DEF_GENERATE_CHUNK_SIZE = 1 << 22
+
+# the binary format of generated traces, label, time (in microseconds), size and op (0 for read, 1 for write)
+DEF_GENERATED_TRACE_INIT_PARAMS = {"label": 1, "real_time": 2, "size": 3, "op": 4, "fmt": "<QqIB"}
+
+
+def _log1p_ratio(x):
+    """
+    log(1 + x) / x, which is 1 at x = 0
+    """
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.log1p(x) / x
+    return np.where(np.abs(x) > 1e-8, ratio, 1 - x / 2)
+
+
+def _expm1_ratio(x):
+    """
+    (exp(x) - 1) / x, which is 1 at x = 0
+    """
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.expm1(x) / x
+    return np.where(np.abs(x) > 1e-8, ratio, 1 + x / 2)
+
+
+class ZipfGenerator:
+    """
+    labels following a Zipf distribution over a fixed number of objects,
+    ranks are sampled with rejection-inversion (Hormann and Derflinger, 1996),
+    which takes constant time and memory regardless of the number of objects
+    """
+
+    def __init__(self, num_of_obj, alpha=1.0, start=1):
+        """
+        :param num_of_obj: the number of objects
+        :param alpha: the skewness, 0 for uniform, larger is more skewed
+        :param start: the label of the most popular object, object i has label start + i
+        """
+
+        assert num_of_obj > 0, "the number of objects must be positive"
+        assert alpha >= 0, "alpha must not be negative"
+        self.num_of_obj = num_of_obj
+        self.alpha = alpha
+        self.start = start
+        self._integral_x1 = self._h_integral(1.5) - 1
+        self._integral_n = self._h_integral(num_of_obj + 0.5)
+        self._squeeze = 2 - self._h_integral_inverse(self._h_integral(2.5) - self._h(2))
+
+    def _h(self, x):
+        # the unnormalized probability of rank x (beginning from 1)
+        return np.exp(-self.alpha * np.log(x))
+
+    def _h_integral(self, x):
+        # the integral of _h from 1 to x
+        log_x = np.log(x)
+        return _expm1_ratio((1 - self.alpha) * log_x) * log_x
+
+    def _h_integral_inverse(self, x):
+        t = np.maximum(x * (1 - self.alpha), -1)
+        return np.exp(_log1p_ratio(t) * x)
+
+    def __call__(self, n, rng):
+        """
+        :param n: the number of requests
+        :param rng: a numpy random Generator
+        :return: a numpy int64 array of labels
+        """
+
+        if self.alpha == 0:
+            return rng.integers(0, self.num_of_obj, n) + self.start
+        ranks = np.empty(n, dtype=np.int64)
+        todo = np.arange(n)
+        while len(todo):
+            u = self._integral_n + rng.random(len(todo)) * (self._integral_x1 - self._integral_n)
+            x = self._h_integral_inverse(u)
+            k = np.clip(np.floor(x + 0.5), 1, self.num_of_obj)
+            accepted = (k - x <= self._squeeze) | (u >= self._h_integral(k + 0.5) - self._h(k))
+            ranks[todo[accepted]] = k[accepted]
+            todo = todo[~accepted]
+        return ranks + (self.start - 1)
+
+
+class ScanGenerator:
+    """
+    labels of a sequential scan, each label is new
+    """
+
+    def __init__(self, start=1):
+        """
+        :param start: the label of the first request
+        """
+
+        self.next_label = start
+
+    def __call__(self, n, rng):
+        labels = np.arange(self.next_label, self.next_label + n, dtype=np.int64)
+        self.next_label += n
+        return labels
+
+
+class LoopGenerator:
+    """
+    labels of a sequential loop over a fixed number of objects
+    """
+
+    def __init__(self, loop_size, start=1):
+        """
+        :param loop_size: the number of objects in the loop
+        :param start: the label of the first object in the loop
+        """
+
+        assert loop_size > 0, "loop size must be positive"
+        self.loop_size = loop_size
+        self.start = start
+        self.pos = 0
+
+    def __call__(self, n, rng):
+        labels = (np.arange(self.pos, self.pos + n, dtype=np.int64) % self.loop_size) + self.start
+        self.pos = (self.pos + n) % self.loop_size
+        return labels
+
+
+class ShiftingGenerator:
+    """
+    uniform labels in a working set that shifts over time
+    """
+
+    def __init__(self, working_set_size, shift_interval, shift_size=None, start=1):
+        """
+        :param working_set_size: the number of objects in the working set
+        :param shift_interval: the number of requests between two shifts
+        :param shift_size: the number of objects replaced in each shift, the whole working set by default
+        :param start: the label of the first object of the first working set
+        """
+
+        assert working_set_size > 0 and shift_interval > 0, "working set size and shift interval must be positive"
+        self.working_set_size = working_set_size
+        self.shift_interval = shift_interval
+        self.shift_size = working_set_size if shift_size is None else shift_size
+        self.start = start
+        self.pos = 0
+
+    def __call__(self, n, rng):
+        base = (np.arange(self.pos, self.pos + n, dtype=np.int64) // self.shift_interval) * self.shift_size
+        self.pos += n
+        return base + rng.integers(0, self.working_set_size, n) + self.start
+
+
+class MixtureGenerator:
+    """
+    labels from several generators, each request chooses a generator by weight
+    """
+
+    def __init__(self, generators, weights=None):
+        """
+        :param generators: a list of label generators, use different start to keep their objects apart
+        :param weights: the weight of each generator, equal by default
+        """
+
+        assert len(generators) > 0, "please provide at least one generator"
+        weights = np.ones(len(generators)) if weights is None else np.asarray(weights, dtype=np.float64)
+        assert len(weights) == len(generators) and np.all(weights >= 0) and np.sum(weights) > 0, \
+            "please provide one non-negative weight for each generator"
+        self.generators = generators
+        self.weights = weights / np.sum(weights)
+
+    def __call__(self, n, rng):
+        choices = rng.choice(len(self.generators), size=n, p=self.weights)
+        labels = np.empty(n, dtype=np.int64)
+        for ind, generator in enumerate(self.generators):
+            selected = np.flatnonzero(choices == ind)
+            if len(selected):
+                labels[selected] = generator(len(selected), rng)
+        return labels
+
+
+def generate_batches(num_of_req, label_generator, arrival_rate=None, size_median=None, size_sigma=1.0,
+                     write_ratio=None, seed=0, chunk_size=DEF_GENERATE_CHUNK_SIZE):
+    """
+    a generator of batches of synthetic requests, in the same format as AbstractReader.read_batch
+
+    :param num_of_req: the number of requests
+    :param label_generator: a label generator, such as ZipfGenerator
+    :param arrival_rate: the mean number of requests per second of Poisson arrivals,
+                            time is in microseconds from 0, None for no time
+    :param size_median: the median size of log-normal request sizes, None for no size
+    :param size_sigma: the standard deviation of the log of request sizes
+    :param write_ratio: the fraction of writes, op is 1 for write and 0 for read, None for no op
+    :param seed: the seed of the random number generator, the same seed and chunk_size give the same requests
+    :param chunk_size: the number of requests in each batch
+    :return: a dict mapping from field to a numpy array
+    """
+
+    assert arrival_rate is None or arrival_rate > 0, "arrival rate must be positive"
+    assert write_ratio is None or 0 <= write_ratio <= 1, "write ratio must be in [0, 1]"
+    rng = np.random.default_rng(seed)
+    last_time = 0.0
+    for begin in range(0, num_of_req, chunk_size):
+        n = min(chunk_size, num_of_req - begin)
+        batch = {"label": label_generator(n, rng)}
+        if arrival_rate is not None:
+            times = np.cumsum(rng.exponential(1e6 / arrival_rate, n)) + last_time
+            last_time = times[-1]
+            batch["time"] = times.astype(np.int64)
+        if size_median is not None:
+            batch["size"] = np.maximum(rng.lognormal(np.log(size_median), size_sigma, n), 1).astype(np.int64)
+        if write_ratio is not None:
+            batch["op"] = (rng.random(n) < write_ratio).astype(np.int64)
+        yield batch
+
+
+def generate_trace(file_loc, num_of_req, label_generator, arrival_rate=1e5, size_median=4096, size_sigma=1.0,
+                   write_ratio=0.3, seed=0, init_params=None, chunk_size=DEF_GENERATE_CHUNK_SIZE):
+    """
+    generate a synthetic binary trace, see generate_batches for the parameters of the requests,
+    a field is only written if it is in init_params
+
+    :param file_loc: location of the trace
+    :param num_of_req: the number of requests
+    :param label_generator: a label generator, such as ZipfGenerator
+    :param arrival_rate: the mean number of requests per second
+    :param size_median: the median request size
+    :param size_sigma: the standard deviation of the log of request sizes
+    :param write_ratio: the fraction of writes
+    :param seed: the seed of the random number generator
+    :param init_params: the init_params of the trace for BinaryReader, DEF_GENERATED_TRACE_INIT_PARAMS by default
+    :param chunk_size: the number of requests generated and written at once
+    :return: the init_params for opening the trace with BinaryReader
+    """
+
+    if init_params is None:
+        init_params = DEF_GENERATED_TRACE_INIT_PARAMS
+    has_column = lambda name: init_params.get(name, -1) not in (-1, None)
+    batches = generate_batches(num_of_req, label_generator,
+                               arrival_rate=arrival_rate if has_column("real_time") else None,
+                               size_median=size_median if has_column("size") else None,
+                               size_sigma=size_sigma,
+                               write_ratio=write_ratio if has_column("op") else None,
+                               seed=seed, chunk_size=chunk_size)
+    with TraceWriter(file_loc, init_params, buffer_size=chunk_size) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+    INFO("generated {} requests into {}".format(num_of_req, file_loc))
+    return init_params
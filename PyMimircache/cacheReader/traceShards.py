@@ -0,0 +1,164 @@
+# coding=utf-8
+
+"""
+this module counts requests of a text trace (plain or csv) in parallel,
+the trace is split into shards at line boundaries, each shard is parsed and counted in a worker process,
+then the counts and the frequency tables of the shards are merged
+
+sharding needs random access, so it works on uncompressed traces and the block-indexed container,
+traces compressed with gzip, bz2 or xz are counted sequentially
+
+"""
+
+import io
+import math
+import numpy as np
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from PyMimircache.const import DEF_NUM_THREADS
+from PyMimircache.cacheReader.compressedFile import open_trace_file, load_block_index
+
+
+# a shard has at least this number of bytes, smaller traces are counted in one process
+DEF_SHARD_SIZE = 1 << 26
+# the number of bytes parsed at once in a shard
+SHARD_CHUNK_SIZE = 1 << 22
+
+
+def can_shard(reader, shard_size=DEF_SHARD_SIZE):
+    """
+    check whether the trace of the reader can be and is worth being counted in shards,
+    readers with a label table are not sharded, because ids must be assigned in trace order
+
+    :param reader: a reader
+    :param shard_size: the min number of bytes in a shard
+    :return: True if the trace can be split into more than one shard
+    """
+
+    if reader.data_begin is None or reader.label_table is not None or reader.compression not in (None, "block"):
+        return False
+    with open_trace_file(reader.file_loc) as trace_file:
+        return trace_file.seek(0, io.SEEK_END) - reader.data_begin >= 2 * shard_size
+
+
+def split_shards(reader, num_of_shards):
+    """
+    split the trace into shards of similar size, each shard begins at the beginning of a line,
+    shards of the block-indexed container are aligned to blocks
+
+    :param reader: a reader of a text trace
+    :param num_of_shards: the max number of shards
+    :return: a list of (begin offset, end offset)
+    """
+
+    with open_trace_file(reader.file_loc) as trace_file:
+        trace_size = trace_file.seek(0, io.SEEK_END)
+        if reader.compression == "block":
+            candidates = [block[0] for block in load_block_index(reader.file_loc)["blocks"]]
+        else:
+            candidates = None
+
+        boundaries = [reader.data_begin]
+        for i in range(1, num_of_shards):
+            offset = reader.data_begin + (trace_size - reader.data_begin) * i // num_of_shards
+            if candidates is not None:
+                offset = min(candidates, key=lambda begin: abs(begin - offset))
+            else:
+                trace_file.seek(offset - 1, io.SEEK_SET)
+                trace_file.readline()
+                offset = trace_file.tell()
+            if boundaries[-1] < offset < trace_size:
+                boundaries.append(offset)
+        boundaries.append(trace_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _count_shard(reader_class, reader_params, begin, end, with_freq):
+    """
+    the worker counting one shard
+
+    :param reader_class: the __class__ attribute of reader, used to create local reader instance
+    :param reader_params: parameters for creating local reader instance
+    :param begin: the begin offset of the shard
+    :param end: the end offset of the shard
+    :param with_freq: whether build the frequency table of labels
+    :return: a tuple of (number of requests, unique labels, counts of unique labels),
+                the labels and counts are None if with_freq is False
+    """
+
+    reader = reader_class(**reader_params)
+    columns = {"label": reader.label_column}
+    trace_file = reader.trace_file
+    trace_file.seek(begin, io.SEEK_SET)
+
+    num_of_req = 0
+    labels = []
+    while trace_file.tell() < end:
+        block = trace_file.read(min(SHARD_CHUNK_SIZE, end - trace_file.tell()))
+        if not block:
+            break
+        if not block.endswith(b"\n") and trace_file.tell() < end:
+            block += trace_file.readline()
+        block_labels = reader._parse_block(block, columns)["label"]
+        num_of_req += len(block_labels)
+        if with_freq and len(block_labels):
+            uniq_labels, counts = np.unique(block_labels, return_counts=True)
+            labels.append((uniq_labels, counts))
+            if len(labels) > 8:
+                labels = [_merge_counts(labels)]
+    reader.close()
+
+    if not with_freq:
+        return num_of_req, None, None
+    if not labels:
+        return num_of_req, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return (num_of_req, ) + _merge_counts(labels)
+
+
+def _merge_counts(label_counts):
+    """
+    merge frequency tables
+
+    :param label_counts: a list of (unique labels, counts)
+    :return: a tuple of (unique labels, counts)
+    """
+
+    uniq_labels, inverse = np.unique(np.concatenate([labels for labels, _ in label_counts]), return_inverse=True)
+    counts = np.zeros(len(uniq_labels), dtype=np.int64)
+    np.add.at(counts, inverse.ravel(), np.concatenate([counts for _, counts in label_counts]))
+    return uniq_labels, counts
+
+
+def count_in_shards(reader, with_freq=False, num_of_threads=DEF_NUM_THREADS, shard_size=DEF_SHARD_SIZE):
+    """
+    count the number of requests and optionally the frequency of each label of a text trace in parallel,
+    the position of the reader is not changed
+
+    :param reader: a reader of a text trace
+    :param with_freq: whether build the frequency table of labels
+    :param num_of_threads: the number of worker processes
+    :param shard_size: the min number of bytes in a shard
+    :return: a tuple of (number of requests, a dict mapping from label to count or None)
+    """
+
+    with open_trace_file(reader.file_loc) as trace_file:
+        trace_size = trace_file.seek(0, io.SEEK_END)
+    # more shards than workers to balance the load
+    num_of_shards = max(1, min(4 * num_of_threads, math.ceil((trace_size - reader.data_begin) / shard_size)))
+    shards = split_shards(reader, num_of_shards)
+
+    reader_params = reader.get_params()
+    reader_params["open_c_reader"] = False
+    reader_params["label_table"] = None
+
+    with ProcessPoolExecutor(max_workers=min(num_of_threads, len(shards))) as ppe:
+        results = list(ppe.map(_count_shard, [reader.__class__] * len(shards), [reader_params] * len(shards),
+                               [begin for begin, _ in shards], [end for _, end in shards],
+                               [with_freq] * len(shards)))
+
+    num_of_req = sum(result[0] for result in results)
+    if not with_freq:
+        return num_of_req, None
+    uniq_labels, counts = _merge_counts([(labels, counts) for _, labels, counts in results])
+    return num_of_req, defaultdict(int, zip(uniq_labels.tolist(), counts.tolist()))
@@ -2,23 +2,50 @@
 
 
 """
-this module provides the stat of the trace
+this module provides the stat of the trace,
+the exact stat keeps the frequency of every object in memory,
+the approximate stat is calculated in one pass with sketches in bounded memory (see PyMimircache.utils.sketch)
 """
 
+import heapq
+import numpy as np
 from pprint import pformat
 from collections import defaultdict
 from PyMimircache.utils.printing import *
+from PyMimircache.utils.sketch import hash_labels, z_score, HyperLogLog, CountMinSketch, \
+    HeavyHitters, FrequencySample
 
 
+# the min width of the Count-Min sketch used for popular objects (5 rows of 16384 counters take 640 KB),
+# a narrower sketch meets the error bound, but collisions can push unpopular objects into the top N
+MIN_COUNT_MIN_WIDTH = 1 << 14
+
 class TraceStat:
     """
     this class provides stat calculation for a given trace
     """
-    def __init__(self, reader, top_N_popular=8, keep_access_freq_list=False):
+    def __init__(self, reader, top_N_popular=8, keep_access_freq_list=False,
+                 approximate=False, error=0.01, confidence=0.99):
+        """
+        :param reader: the reader of the trace
+        :param top_N_popular: the number of most popular objects reported
+        :param keep_access_freq_list: whether keep the list of (obj, freq) of all objects, exact stat only
+        :param approximate: whether calculate approximate stat in bounded memory
+        :param error: the target relative error of approximate stat,
+                        the error of top N frequencies is relative to the number of requests
+        :param confidence: the probability that the error of approximate stat is within the reported bounds
+        """
+
+        assert not (approximate and keep_access_freq_list), "access freq list is not available in approximate stat"
         self.reader = reader
         self.top_N_popular = top_N_popular
         self.keep_access_freq_list = keep_access_freq_list
         self.access_freq_list = None
+        self.approximate = approximate
+        self.error = error
+        self.confidence = confidence
+        # the error bound of each approximate stat, empty for exact stat
+        self.error_bounds = {}
         # stat data representation:
         #       0:  not initialized,
         #       -1: error while obtaining data
@@ -35,7 +62,10 @@ class TraceStat:
         # self.freq_median = 0
         # self.freq_mode = 0
 
-        self._calculate()
+        if self.approximate:
+            self._calculate_approximate()
+        else:
+            self._calculate()
 
 
     def _calculate(self):
@@ -70,17 +100,76 @@ class TraceStat:
 
         self.cold_miss_ratio = self.num_of_uniq_obj/ (float) (self.num_of_requests)
 
-        # l is a list of (obj, freq) in descending order
-        l = sorted(d.items(), key=lambda x: x[1], reverse=True)
         if self.keep_access_freq_list:
+            # l is a list of (obj, freq) in descending order
+            l = sorted(d.items(), key=lambda x: x[1], reverse=True)
             self.access_freq_list = l
+            self.top_N_popular_obj = l[:self.top_N_popular]
+        else:
+            self.top_N_popular_obj = heapq.nlargest(self.top_N_popular, d.items(), key=lambda x: x[1])
+        self.num_of_obj_with_freq_1 = sum(1 for v in d.values() if v == 1)
+        self.freq_mean = self.num_of_requests / (float) (self.num_of_uniq_obj)
 
-        self.top_N_popular_obj = l[:self.top_N_popular]
-        for i in range(len(l)-1, -1, -1):
-            if l[i][1] == 1:
-                self.num_of_obj_with_freq_1 += 1
-            else:
-                break
+    def _calculate_approximate(self):
+        """
+        calculate the stat in one pass over batches of requests with bounded memory,
+        the number of requests and time span are exact,
+        the number of unique objects is estimated by HyperLogLog,
+        the popular objects and their frequencies by Count-Min sketch with a candidate set,
+        the number of objects accessed only once by a fixed-size hash-based sample of the objects
+        :return:
+        """
+
+        z = z_score(self.confidence)
+        hll = HyperLogLog.from_error(self.error, self.confidence)
+        cms = CountMinSketch.from_error(self.error, self.confidence)
+        if cms.width < MIN_COUNT_MIN_WIDTH:
+            cms = CountMinSketch(MIN_COUNT_MIN_WIDTH, cms.depth)
+        heavy_hitters = HeavyHitters(self.top_N_popular, cms)
+        sample = FrequencySample(int(np.ceil(0.25 * (z / self.error) ** 2)))
+
+        fields = ("label", "time") if self.reader.support_real_time else ("label", )
+        first_time_stamp, last_time_stamp = None, None
+        self.reader.reset()
+        for batch in self.reader.iter_batches(fields=fields):
+            labels, counts = np.unique(batch["label"], return_counts=True)
+            hashes = hash_labels(labels)
+            hll.add(hashes)
+            cms.add(hashes, counts)
+            heavy_hitters.update(labels, hashes, counts)
+            sample.update(hashes, counts)
+            self.num_of_requests += len(batch["label"])
+            if "time" in batch:
+                if first_time_stamp is None:
+                    first_time_stamp = batch["time"][0]
+                last_time_stamp = batch["time"][-1]
+        self.reader.reset()
+        assert self.num_of_requests > 0, "failed to read requests from reader"
+        if first_time_stamp is not None:
+            self.time_span = last_time_stamp - first_time_stamp
+
+        # all objects are in the sample if the trace has few objects, then the sample is exact
+        if sample.is_exact():
+            self.num_of_uniq_obj = len(sample)
+            self.num_of_obj_with_freq_1 = sample.get_num_of_obj_with_freq(1)
+            self.error_bounds["num_of_uniq_obj"] = 0
+            self.error_bounds["num_of_obj_with_freq_1"] = 0
+        else:
+            self.num_of_uniq_obj = int(round(hll.cardinality()))
+            uniq_obj_bound = z * hll.standard_error() * self.num_of_uniq_obj
+            ratio_freq_1 = sample.get_num_of_obj_with_freq(1) / len(sample)
+            self.num_of_obj_with_freq_1 = int(round(ratio_freq_1 * self.num_of_uniq_obj))
+            self.error_bounds["num_of_uniq_obj"] = float(uniq_obj_bound)
+            self.error_bounds["num_of_obj_with_freq_1"] = \
+                float(z * np.sqrt(ratio_freq_1 * (1 - ratio_freq_1) / len(sample)) * self.num_of_uniq_obj +
+                      ratio_freq_1 * uniq_obj_bound)
+
+        # Count-Min never underestimates, so the bound is one-sided
+        self.top_N_popular_obj = heavy_hitters.get_top()
+        self.error_bounds["top_N_popular_obj"] = float(cms.error_bound())
+        self.error_bounds["confidence"] = self.confidence
+
+        self.cold_miss_ratio = self.num_of_uniq_obj / (float) (self.num_of_requests)
         self.freq_mean = self.num_of_requests / (float) (self.num_of_uniq_obj)
 
 
@@ -107,6 +196,9 @@ class TraceStat:
                                                 self.num_of_obj_with_freq_1,
                                                 self.freq_mean,
                                                 "time span: {}".format(self.time_span) if self.time_span else "")
+        if self.approximate:
+            s += "\napproximate stat, error bounds at confidence {}: {}".format(
+                self.confidence, pformat({k: v for k, v in self.error_bounds.items() if k != "confidence"}))
 
         if return_format == "str":
             return s
@@ -0,0 +1,149 @@
+# coding=utf-8
+
+"""
+this module provides a buffered writer of binary traces that can be opened by BinaryReader,
+the records are described by the same init_params (fmt and the columns of label, real_time, size and op),
+requests can be written one by one or in batches of numpy arrays, they are collected in a numpy
+structured buffer and written to the file when the buffer is full,
+columns in fmt that are not label, real_time, size or op are written as 0
+
+"""
+
+import numpy as np
+
+from PyMimircache.const import DEF_BATCH_SIZE
+from PyMimircache.cacheReader.binaryReader import BinaryReader, fmt_to_dtype
+
+
+# the column name of each field in init_params
+FIELD_COLUMN_NAMES = {"label": "label", "time": "real_time", "size": "size", "op": "op"}
+
+
+class TraceWriter:
+    """
+    a buffered writer of binary traces
+    """
+
+    all = ["write", "write_batch", "flush", "close", "get_reader"]
+
+    def __init__(self, file_loc, init_params, buffer_size=DEF_BATCH_SIZE):
+        """
+        :param file_loc: location of the trace, an existing file is overwritten
+        :param init_params: the same init_params as BinaryReader, fmt and label are required
+        :param buffer_size: the number of requests buffered before writing to the file
+        """
+
+        assert "fmt" in init_params, "please provide format string(fmt) in init_params"
+        assert "label" in init_params, "please specify the order of label, beginning from 1"
+        assert buffer_size > 0, "buffer size must be positive"
+
+        self.file_loc = file_loc
+        self.init_params = init_params
+        self.dtype = fmt_to_dtype(init_params["fmt"])
+        # field -> the name of its column in the structured dtype
+        self.columns = {}
+        for field, name in FIELD_COLUMN_NAMES.items():
+            column = init_params.get(name, -1)
+            if column is not None and column != -1:
+                assert 1 <= column <= len(self.dtype.names), \
+                    "column {} of {} is out of range of fmt {}".format(column, name, init_params["fmt"])
+                self.columns[field] = "f{}".format(column)
+
+        self.buffer = np.zeros(buffer_size, dtype=self.dtype)
+        self.buffer_pos = 0
+        self.num_of_req = 0
+        self.trace_file = open(file_loc, "wb")
+
+    def write(self, label, time=None, size=None, op=None):
+        """
+        write one request
+
+        :param label: the label of the request
+        :param time: the real time of the request, required if real_time is in init_params
+        :param size: the size of the request, required if size is in init_params
+        :param op: the operation of the request, required if op is in init_params
+        """
+
+        record = self.buffer[self.buffer_pos]
+        for field, value in (("label", label), ("time", time), ("size", size), ("op", op)):
+            if field in self.columns:
+                assert value is not None, "please provide {} of the request".format(field)
+                record[self.columns[field]] = value
+        self.buffer_pos += 1
+        self.num_of_req += 1
+        if self.buffer_pos == len(self.buffer):
+            self.flush()
+
+    def write_batch(self, batch):
+        """
+        write a batch of requests, it has the same format as the batch of AbstractReader.read_batch
+
+        :param batch: a dict mapping from field (label, time, size and op) to a numpy array or a list,
+                        every field in init_params is required
+        """
+
+        n = len(batch["label"])
+        for field in self.columns:
+            assert field in batch, "please provide {} of the requests".format(field)
+            assert len(batch[field]) == n, "{} has {} requests, but label has {}".format(field, len(batch[field]), n)
+
+        if n > len(self.buffer) - self.buffer_pos:
+            self.flush()
+        if n >= len(self.buffer):
+            # a large batch is written directly
+            records = np.zeros(n, dtype=self.dtype)
+            for field, name in self.columns.items():
+                records[name] = batch[field]
+            records.tofile(self.trace_file)
+        else:
+            records = self.buffer[self.buffer_pos: self.buffer_pos + n]
+            for field, name in self.columns.items():
+                records[name] = batch[field]
+            self.buffer_pos += n
+        self.num_of_req += n
+
+    def flush(self):
+        """
+        write the buffered requests to the file
+        """
+
+        if self.buffer_pos:
+            self.buffer[:self.buffer_pos].tofile(self.trace_file)
+            self.buffer_pos = 0
+        self.trace_file.flush()
+
+    def close(self):
+        """
+        write the buffered requests and close the file
+        """
+
+        if self.trace_file is not None:
+            self.flush()
+            self.trace_file.close()
+            self.trace_file = None
+
+    def get_reader(self, **kwargs):
+        """
+        close the writer and open the trace
+
+        :param kwargs: passed to BinaryReader, such as data_type and open_c_reader
+        :return: a BinaryReader
+        """
+
+        self.close()
+        if "data_type" not in kwargs:
+            kwargs["data_type"] = "c" if self.dtype[self.columns["label"]].kind == "S" else "l"
+        return BinaryReader(self.file_loc, init_params=self.init_params, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, "trace_file", None) is not None:
+            self.close()
+
+    def __repr__(self):
+        return "TraceWriter of trace {}, {} requests written".format(self.file_loc, self.num_of_req)
@@ -6,6 +6,8 @@
 
 """
 
+import numpy as np
+
 from PyMimircache.cacheReader.binaryReader import BinaryReader
 from PyMimircache.const import ALLOW_C_MIMIRCACHE
 
@@ -13,13 +15,19 @@ if ALLOW_C_MIMIRCACHE:
     import PyMimircache.CMimircache.CacheReader as c_cacheReader
 
 
+# SCSI command codes of read and write, READ(6/10/12/16) and WRITE(6/10/12/16)
+SCSI_READ_OPS = (0x08, 0x28, 0xA8, 0x88)
+SCSI_WRITE_OPS = (0x0A, 0x2A, 0xAA, 0x8A)
+
+
 class VscsiReader(BinaryReader):
     """
     VscsiReader for vscsi trace
      
     """
     all = ["read_one_req", "read_time_req", "read_complete_req",
-           "get_average_size", "get_timestamp_list",
+           "get_timestamp_list", "get_size_list", "get_op_list",
+           "get_average_size", "get_size_percentile", "get_read_write_ratio", "get_inter_arrival_distribution",
            "reset", "copy", "get_params"]
 
     def __init__(self, file_loc, vscsi_type=1,
@@ -47,7 +55,34 @@ class VscsiReader(BinaryReader):
                                           block_unit_size=block_unit_size,
                                           disk_sector_size=512,
                                           open_c_reader=open_c_reader,
-                                          lock=kwargs.get("lock", None))
+                                          lock=kwargs.get("lock", None),
+                                          label_table=kwargs.get("label_table", None))
+        # the results of the helpers computed on whole columns
+        self._column_stats = {}
+
+    def get_timestamp_list(self):
+        """
+        get the timestamps of all requests, the array is a view of the memory-mapped trace
+        :return: a numpy array of timestamps corresponding to requests
+        """
+
+        return self.timestamps()
+
+    def get_size_list(self):
+        """
+        get the sizes (in bytes) of all requests, the array is a view of the memory-mapped trace
+        :return: a numpy array of sizes corresponding to requests
+        """
+
+        return self.sizes()
+
+    def get_op_list(self):
+        """
+        get the SCSI command codes of all requests, the array is a view of the memory-mapped trace
+        :return: a numpy array of ops corresponding to requests
+        """
+
+        return self.ops()
 
     def get_average_size(self):
         """
@@ -55,29 +90,59 @@ class VscsiReader(BinaryReader):
         :return: a float of average size of all requests
         """
 
-        sizes = 0
-        counter = 0
+        if "average_size" not in self._column_stats:
+            sizes = self.sizes()
+            self._column_stats["average_size"] = float(np.mean(sizes, dtype=np.float64)) if len(sizes) else 0.0
+        return self._column_stats["average_size"]
 
-        t = self.read_complete_req()
-        while t:
-            sizes += t[2]
-            counter += 1
-            t = self.read_complete_req()
-        self.reset()
-        return sizes / counter
+    def get_size_percentile(self, percentile):
+        """
+        the percentile of request sizes, the sorted sizes are kept after the first call,
+        so different percentiles do not sort the sizes again
 
-    def get_timestamp_list(self):
+        :param percentile: a percentile in [0, 100], or a list of them
+        :return: the size at the percentile, or a numpy array of sizes for a list of percentiles
         """
-        get a list of timestamps
-        :return: a list of timestamps corresponding to requests
+
+        if "sorted_sizes" not in self._column_stats:
+            self._column_stats["sorted_sizes"] = np.sort(self.sizes())
+        sorted_sizes = self._column_stats["sorted_sizes"]
+        assert len(sorted_sizes), "the trace is empty"
+        percentile = np.asarray(percentile, dtype=np.float64)
+        assert np.all((percentile >= 0) & (percentile <= 100)), "percentile must be in [0, 100]"
+        # the same as np.percentile with method lower, without sorting again
+        return sorted_sizes[np.floor(percentile / 100 * (len(sorted_sizes) - 1)).astype(np.int64)]
+
+    def get_read_write_ratio(self):
+        """
+        the read/write mix of the trace by SCSI command code
+
+        :return: a dictionary of read, write and other, the fraction of requests of each kind
+        """
+
+        if "read_write_ratio" not in self._column_stats:
+            ops, counts = np.unique(self.ops(), return_counts=True)
+            total = max(int(np.sum(counts)), 1)
+            num_of_read = int(np.sum(counts[np.isin(ops, SCSI_READ_OPS)]))
+            num_of_write = int(np.sum(counts[np.isin(ops, SCSI_WRITE_OPS)]))
+            self._column_stats["read_write_ratio"] = {
+                "read": num_of_read / total,
+                "write": num_of_write / total,
+                "other": (total - num_of_read - num_of_write) / total if len(counts) else 0.0
+            }
+        return dict(self._column_stats["read_write_ratio"])
+
+    def get_inter_arrival_distribution(self):
+        """
+        the distribution of the time between two consecutive requests
+
+        :return: a tuple of (sorted distinct inter-arrival times, number of occurrences of each)
         """
 
-        ts_list = []
-        r = c_cacheReader.read_time_req(self.c_reader)
-        while r:
-            ts_list.append(r[0])
-            r = c_cacheReader.read_time_req(self.c_reader)
-        return ts_list
+        if "inter_arrival" not in self._column_stats:
+            times = self.timestamps().astype(np.int64)
+            self._column_stats["inter_arrival"] = np.unique(np.diff(times), return_counts=True)
+        return self._column_stats["inter_arrival"]
 
     def copy(self, open_c_reader=False):
         """
@@ -88,7 +153,8 @@ class VscsiReader(BinaryReader):
         :return: a copied reader
         """
 
-        return VscsiReader(self.file_loc, self.vscsi_type, self.block_unit_size, open_c_reader, self.lock)
+        return VscsiReader(self.file_loc, self.vscsi_type, self.block_unit_size, open_c_reader,
+                           lock=self.lock, label_table=self.label_table)
 
     def get_params(self):
         """
@@ -101,7 +167,7 @@ class VscsiReader(BinaryReader):
             "vscsi_type": self.vscsi_type,
             "block_unit_size": self.block_unit_size,
             "open_c_reader": self.open_c_reader,
-            "lock": self.lock
+            "label_table": self.label_table
         }
 
     def __repr__(self):
@@ -16,6 +16,11 @@ ALLOW_C_MIMIRCACHE = True
 INTERNAL_USE = True
 DEF_NUM_BIN_PROF = 100
 DEF_NUM_THREADS = os.cpu_count()
+DEF_BATCH_SIZE = 65536
+# the persistent cache of reuse distance, next access distance and break points, see utils.derivedDataCache
+DEF_DERIVED_DATA_DIR = os.environ.get("PYMIMIRCACHE_DERIVED_DATA_DIR",
+                                      os.path.join(os.path.expanduser("~"), ".cache", "PyMimircache", "derived"))
+DEF_DERIVED_DATA_MAX_SIZE = int(os.environ.get("PYMIMIRCACHE_DERIVED_DATA_MAX_SIZE", 8 * 1024 ** 3))
 
 # try to import cMimircache
 failed_components = []
@@ -51,6 +56,7 @@ if len(failed_components):
 
 
 from PyMimircache.cache.arc import ARC
+from PyMimircache.cache.car import CAR
 from PyMimircache.cache.fifo import FIFO
 from PyMimircache.cache.lru import LRU
 from PyMimircache.cache.mru import MRU
@@ -58,7 +64,12 @@ from PyMimircache.cache.optimal import Optimal
 from PyMimircache.cache.random import Random
 from PyMimircache.cache.s4lru import S4LRU
 from PyMimircache.cache.slru import SLRU
+from PyMimircache.cache.skLRU import SkLRU
 from PyMimircache.cache.clock import Clock
+from PyMimircache.cache.kClock import KClock
+from PyMimircache.cache.clockPro import ClockPro
+from PyMimircache.cache.arrayLRU import ArrayLRU
+from PyMimircache.cache.arrayFIFO import ArrayFIFO
 
 try:
     from PyMimircache.cache.INTERNAL.ASig import ASig
@@ -94,11 +105,14 @@ C_AVAIL_CACHEREADER = [PlainReader, VscsiReader, CsvReader, BinaryReader]
 
 CACHE_NAME_CONVRETER = {"optimal": "Optimal", "opt": "Optimal",
                         "rr": "Random", "random": "Random",
-                        "lru": "LRU", "mru": "MRU", "fifo": "FIFO", "clock": "Clock", "arc": "ARC",
+                        "lru": "LRU", "mru": "MRU", "fifo": "FIFO", "clock": "Clock", "arc": "ARC", "car": "CAR",
                         "lfu": "LFU", "lfu_fast": "LFUFast", "lfufast": "LFUFast",
 
                         "lru_k": "LRU_K", "lru_2": "LRU_2",
-                        "slru": "SLRU", "s4lru": "S4LRU",
+                        "slru": "SLRU", "s4lru": "S4LRU", "sklru": "SkLRU",
+                        "kclock": "KClock", "k_clock": "KClock", "clockpro": "ClockPro", "clock_pro": "ClockPro",
+                        "arraylru": "ArrayLRU", "array_lru": "ArrayLRU",
+                        "arrayfifo": "ArrayFIFO", "array_fifo": "ArrayFIFO",
                         "mimir": "mimir", "mithril": "Mithril", "amp": "AMP", "pg": "PG",
 
                         "lrfu": "LRFU", "slruml": "SLRUML", "scoreml": "ScoreML",
@@ -108,10 +122,12 @@ CACHE_NAME_CONVRETER = {"optimal": "Optimal", "opt": "Optimal",
                         "asig4": "ASig4", "asig5": "ASig5", "asigopt": "ASigOPT"
                         }
 
-CACHE_NAME_TO_CLASS_DICT = {"LRU":LRU, "MRU":MRU, "ARC":ARC, "Optimal":Optimal,
+CACHE_NAME_TO_CLASS_DICT = {"LRU":LRU, "MRU":MRU, "ARC":ARC, "CAR":CAR, "Optimal":Optimal,
                             "FIFO":FIFO, "Clock":Clock, "Random":Random,
+                            "KClock":KClock, "ClockPro":ClockPro,
 
-                            "SLRU":SLRU, "S4LRU":S4LRU,
+                            "SLRU":SLRU, "S4LRU":S4LRU, "SkLRU":SkLRU,
+                            "ArrayLRU":ArrayLRU, "ArrayFIFO":ArrayFIFO,
 
                             "ASig":ASig, "ASig2":ASig2, "ASig3":ASig3, "ASig4":ASig4,
                             "ASig5":ASig5, "ASigOPT":ASigOPT
@@ -138,6 +154,7 @@ def cache_name_to_class(cache_name):
                            "supported algorithms {}".format(name, CACHE_NAME_CONVRETER.values()))
 
 
-__all__ = ["ALLOW_C_MIMIRCACHE", "INTERNAL_USE", "DEF_NUM_BIN_PROF", "DEF_NUM_THREADS",
+__all__ = ["ALLOW_C_MIMIRCACHE", "INTERNAL_USE", "DEF_NUM_BIN_PROF", "DEF_NUM_THREADS", "DEF_BATCH_SIZE",
+           "DEF_DERIVED_DATA_DIR", "DEF_DERIVED_DATA_MAX_SIZE",
            "C_AVAIL_CACHE", "C_AVAIL_CACHEREADER", "CACHE_NAME_CONVRETER", "CACHE_NAME_TO_CLASS_DICT",
            "cache_name_to_class"]
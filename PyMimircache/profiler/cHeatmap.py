@@ -22,6 +22,7 @@ if ALLOW_C_MIMIRCACHE:
 from PyMimircache import const
 from PyMimircache.utils.printing import *
 from PyMimircache.profiler.utilProfiler import set_fig
+from PyMimircache.utils.derivedDataCache import get_derived_data_cache
 
 
 
@@ -61,9 +62,13 @@ class CHeatmap:
 
         assert time_interval != -1 or num_of_pixel_of_time_dim != -1, \
             "please provide at least one parameter, time_interval or num_of_pixel_of_time_dim"
-        return c_heatmap.get_breakpoints(reader.c_reader, time_mode=time_mode,
-                                                    time_interval=time_interval,
-                                                    num_of_pixel_of_time_dim=num_of_pixel_of_time_dim)
+        params = {"time_mode": time_mode, "time_interval": time_interval,
+                  "num_of_pixel_of_time_dim": num_of_pixel_of_time_dim}
+        return get_derived_data_cache().get_or_compute(
+            reader, "breakpoints",
+            lambda: c_heatmap.get_breakpoints(reader.c_reader, time_mode=time_mode,
+                                              time_interval=time_interval,
+                                              num_of_pixel_of_time_dim=num_of_pixel_of_time_dim), params)
 
 
     def heatmap(self, reader, time_mode, plot_type,
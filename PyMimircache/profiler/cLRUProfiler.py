@@ -9,13 +9,12 @@ Author: Jason Yang <peter.waynechina@gmail.com> 2016/07
 
 """
 import os
-import socket
-from PyMimircache.const import INTERNAL_USE
 from PyMimircache.const import ALLOW_C_MIMIRCACHE
 if ALLOW_C_MIMIRCACHE:
     import PyMimircache.CMimircache.LRUProfiler as c_LRUProfiler
-from PyMimircache.cacheReader.binaryReader import BinaryReader
 from PyMimircache.cacheReader.abstractReader import AbstractReader
+from PyMimircache.profiler.pyShardsProfiler import PyShardsProfiler
+from PyMimircache.utils.derivedDataCache import get_derived_data_cache
 import matplotlib.pyplot as plt
 from PyMimircache.utils.printing import *
 from matplotlib.ticker import FuncFormatter
@@ -40,7 +39,7 @@ class CLRUProfiler:
         :param reader: reader for feeding data into profiler
         :param cache_size: size of cache, if -1, then use max possible size
         :param cache_params: parameters about cache, such as block_unit_size
-        :param kwargs: no_load_rd
+        :param kwargs: no_load_rd, do not reuse reuse distance from the derived data cache
         """
 
         # make sure reader is valid
@@ -66,14 +65,9 @@ class CLRUProfiler:
         self.get_hit_rate = self.get_hit_ratio
 
 
-        # INTERNAL USE to cache intermediate reuse distance
+        # reuse distance is saved in and reused from the derived data cache
         self.already_load_rd = False
-        if INTERNAL_USE and not kwargs.get("no_load_rd", False) and \
-                socket.gethostname().lower() in ["master", "node2", "node3"] and \
-                ".." not in reader.file_loc:
-            if not reader.already_load_rd:
-                self.use_precomputedRD()
-                self.already_load_rd = True
+        self.use_derived_data = not kwargs.get("no_load_rd", False)
 
 
     def save_reuse_dist(self, file_loc, rd_type):
@@ -108,47 +102,19 @@ class CLRUProfiler:
 
     def _del_reuse_dist_file(self):
         """
-        an internal function that deletes the pre-computed reuse distance
+        an internal function that deletes the reuse distance in the derived data cache
         """
 
-        assert INTERNAL_USE == True, "this function is only used internally"
-        rd_dat_path = self.reader.file_loc.replace("/home/jason/ALL_DATA/",
-                                                   "/research/jason/preComputedData/RD/")
-        rd_dat_path = rd_dat_path.replace("/home/cloudphysics/traces/",
-                                          "/research/jason/preComputedData/RD/cphyVscsi")
-
-        if not os.path.exists(rd_dat_path):
+        if not get_derived_data_cache().remove(self.reader, "rd"):
             WARNING("pre-computed reuse distance file does not exist")
-        else:
-            os.remove(rd_dat_path)
-
 
     def use_precomputedRD(self):
         """
-        this is an internal used function, it tries to load precomputed reuse distance to avoid the expensive
-        O(NlogN) reuse distance computation, if the data does not exists, then compute it and save it
+        get reuse distance, it is loaded from the derived data cache to avoid the expensive
+        O(NlogN) reuse distance computation, if the data does not exist, then compute it and save it
         :return:
         """
 
-        has_rd = True
-        if not self.already_load_rd and not self.reader.already_load_rd:
-            if "/home/cloudphysics/traces/" not in self.reader.file_loc and \
-                    "/home/jason/ALL_DATA" not in self.reader.file_loc:
-                has_rd = False
-
-            rd_dat_path = self.reader.file_loc.replace("/home/jason/ALL_DATA/",
-                                                       "/research/jason/preComputedData/RD/")
-            rd_dat_path = rd_dat_path.replace("/home/cloudphysics/traces/",
-                                              "/research/jason/preComputedData/RD/cphyVscsi")
-
-            if has_rd and os.path.exists(rd_dat_path):
-                DEBUG("loading reuse distance from {}".format(rd_dat_path))
-                self.load_reuse_dist(rd_dat_path, "rd")
-            else:
-                if not os.path.exists(os.path.dirname(rd_dat_path)):
-                    os.makedirs(os.path.dirname(rd_dat_path))
-                self.save_reuse_dist(rd_dat_path, "rd")
-                INFO("reuse distance calculated and saved at {}".format(rd_dat_path))
         return self.get_reuse_distance()
 
     def get_hit_count(self, **kargs):
@@ -193,32 +159,20 @@ class CLRUProfiler:
 
     def get_hit_ratio_shards(self, sample_ratio=0.01, **kwargs):
         """
-        experimental function
-        :param sample_ratio:
-        :param kwargs:
-        :return:
-        """
-        from PyMimircache.cacheReader.tracePreprocesser import TracePreprocessor
-        kargs = {}
-        if 'cache_size' not in kwargs:
-            kargs['cache_size'] = self.cache_size
-        else:
-            kargs['cache_size'] = kwargs['cache_size']
+        approximate hit ratio with spatial sampling (SHARDS), see PyShardsProfiler
 
-        pp = TracePreprocessor(self.reader)
-        N1, N2, traceName, fmt = pp.prepare_for_shards(sample_ratio=sample_ratio, has_time=False)
-        correction = N2 - N1
-        print("correction: {}".format(correction))
-        # correction = 0
-        tempReader = BinaryReader(traceName, init_params={"label":1, "fmt": fmt})
+        :param sample_ratio: the sample rate, or the initial sample rate if sample_size is given
+        :param kwargs: cache_size, sample_size (enables fixed size sampling), seed
+        :return: a numpy array of CACHE_SIZE+3, the same layout as get_hit_ratio
+        """
 
         if self.block_unit_size != 0:
-            print("not supported yet")
+            WARNING("not supported yet")
             return None
-        else:
-            hit_ratio = c_LRUProfiler.get_hit_ratio_seq_shards(tempReader.c_reader, sample_ratio=sample_ratio,
-                                                       correction=correction, **kargs)
-        return hit_ratio
+        profiler = PyShardsProfiler(self.reader, kwargs.get("cache_size", self.cache_size),
+                                    sample_rate=sample_ratio, sample_size=kwargs.get("sample_size"),
+                                    seed=kwargs.get("seed", 0))
+        return profiler.get_hit_ratio()
 
 
     def get_reuse_distance(self, **kargs):
@@ -230,8 +184,10 @@ class CLRUProfiler:
         if self.block_unit_size != 0:
             WARNING("reuse distance calculation does not support variable obj size, "
                     "calculating without considering size")
-        rd = c_LRUProfiler.get_reuse_dist_seq(self.reader.c_reader, **kargs)
-        return rd
+        if not self.use_derived_data:
+            return c_LRUProfiler.get_reuse_dist_seq(self.reader.c_reader, **kargs)
+        return get_derived_data_cache().get_or_compute(
+            self.reader, "rd", lambda: c_LRUProfiler.get_reuse_dist_seq(self.reader.c_reader, **kargs), kargs)
 
     def get_future_reuse_distance(self, **kargs):
         """
@@ -242,8 +198,10 @@ class CLRUProfiler:
         if self.block_unit_size != 0:
             WARNING("future reuse distance calculation does not support variable obj size, "
                 "calculating without considering size")
-        frd = c_LRUProfiler.get_future_reuse_dist(self.reader.c_reader, **kargs)
-        return frd
+        if not self.use_derived_data:
+            return c_LRUProfiler.get_future_reuse_dist(self.reader.c_reader, **kargs)
+        return get_derived_data_cache().get_or_compute(
+            self.reader, "frd", lambda: c_LRUProfiler.get_future_reuse_dist(self.reader.c_reader, **kargs), kargs)
 
 
     def plotHRC(self, figname="HRC.png", auto_resize=False, threshold=0.98, **kwargs):
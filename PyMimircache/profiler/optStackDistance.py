@@ -0,0 +1,119 @@
+# coding=utf-8
+
+"""
+this module computes the stack distance of Belady's optimal algorithm (OPT) in one pass over the trace,
+OPT is a stack algorithm, a request hits in an OPT cache of size C if and only if its OPT stack distance
+is at most C, so the hit ratio curve of OPT for all cache sizes comes from one histogram of stack distances
+
+the OPT stack is maintained with the priority stack update of Mattson et al. (1970), the priority of
+an object is the time of its next request (earlier is higher), the requested object leaves its depth d
+and is pushed down from the top, at each depth above d the pushed object and the object there swap
+if the object there has lower priority, and the object pushed out of depth d - 1 takes depth d,
+as in Optimal, an object that is not requested again is not kept in the cache
+
+the pushed object only swaps at the depths holding a new maximum of the next request time (the records),
+every other object stays where it is, the records are found with a running maximum in numpy
+and moved together, so each request costs a few numpy operations over the depths above it
+instead of one python step per depth
+
+"""
+
+import numpy as np
+
+from PyMimircache.profiler.utilProfiler import get_next_access_dist
+from PyMimircache.utils.derivedDataCache import get_derived_data_cache
+
+
+__all__ = ["get_opt_stack_dist"]
+
+
+# the priority of an object that is not requested again
+_NEVER = np.iinfo(np.int64).max
+
+
+def _cal_opt_stack_dist(obj_ids, next_access, max_size):
+    """
+    :param obj_ids: a numpy array of dense object ids (beginning from 0) of the requests
+    :param next_access: the distance to the next request of the same object, -1 if there is none
+    :param max_size: the max stack distance that is tracked, deeper objects are dropped
+    :return: a numpy int64 array of OPT stack distances (beginning from 1), -1 for misses at size max_size
+    """
+
+    n = len(obj_ids)
+    next_time = np.where(next_access == -1, _NEVER, np.arange(n, dtype=np.int64) + next_access)
+    # the object and its next request time at each depth
+    stack_ids = np.full(max_size, -1, dtype=np.int64)
+    stack_next = np.full(max_size, -1, dtype=np.int64)
+    depth_of = np.full(int(obj_ids.max()) + 1 if n else 0, -1, dtype=np.int64)
+    dist = np.full(n, -1, dtype=np.int64)
+    size = 0
+
+    for t, (obj, priority) in enumerate(zip(obj_ids.tolist(), next_time.tolist())):
+        depth = int(depth_of[obj])
+        if depth == 0:
+            stack_next[0] = priority
+            dist[t] = 1
+            continue
+        if depth > 0:
+            dist[t] = depth + 1
+            end = depth
+        else:
+            end = size
+
+        if end:
+            later = stack_next[:end] > priority
+            first = int(later.argmax())
+            if later[first]:
+                # the records from the first object with a later next request, they move to the next record
+                segment = stack_next[first: end]
+                running_max = np.maximum.accumulate(segment)
+                is_record = np.empty(len(segment), dtype=np.bool_)
+                is_record[0] = True
+                np.greater(segment[1:], running_max[:-1], out=is_record[1:])
+                records = np.flatnonzero(is_record)
+                records += first
+                moved_ids = stack_ids[records]
+                moved_next = stack_next[records]
+                stack_ids[records[1:]] = moved_ids[:-1]
+                stack_next[records[1:]] = moved_next[:-1]
+                depth_of[moved_ids[:-1]] = records[1:]
+                stack_ids[first] = obj
+                stack_next[first] = priority
+                depth_of[obj] = first
+                # the last record is pushed to depth end
+                obj, priority = int(moved_ids[-1]), int(moved_next[-1])
+
+        if end < max_size:
+            stack_ids[end] = obj
+            stack_next[end] = priority
+            depth_of[obj] = end
+            if end == size:
+                size += 1
+        else:
+            # pushed out of the tracked depths
+            depth_of[obj] = -1
+    return dist
+
+
+def get_opt_stack_dist(reader, max_size):
+    """
+    the OPT stack distance of each request, it is saved in the derived data cache
+
+    :param reader: reader for reading trace
+    :param max_size: the max stack distance that is tracked, usually the max cache size of interest
+    :return: a numpy int64 array, -1 for requests that miss in an OPT cache of size max_size
+    """
+
+    assert max_size > 0, "max size must be positive"
+
+    def compute():
+        next_access = get_next_access_dist(reader)
+        reader.reset()
+        labels = [batch["label"] for batch in reader.iter_batches(fields=("label", ))]
+        reader.reset()
+        if not labels:
+            return np.zeros(0, dtype=np.int64)
+        _, obj_ids = np.unique(np.concatenate(labels), return_inverse=True)
+        return _cal_opt_stack_dist(obj_ids.reshape(-1), next_access, max_size)
+
+    return get_derived_data_cache().get_or_compute(reader, "opt_stack_dist", compute, {"max_size": max_size})
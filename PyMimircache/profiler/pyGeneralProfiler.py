@@ -19,9 +19,12 @@ import numpy as np
 from concurrent.futures import as_completed, ProcessPoolExecutor
 
 from PyMimircache.cacheReader.abstractReader import AbstractReader
+from PyMimircache.cacheReader.prefetchReader import PrefetchReader
 from PyMimircache.const import *
 from PyMimircache.utils.printing import *
 from PyMimircache.profiler.utilProfiler import util_plotHRC
+from PyMimircache.profiler.optStackDistance import get_opt_stack_dist
+from PyMimircache.cache.optimal import Optimal
 
 
 __all__ = ["PyGeneralProfiler"]
@@ -30,7 +33,8 @@ def _cal_hit_count_subprocess(cache_class,
                               cache_size,
                               reader_class,
                               reader_params,
-                              cache_params=None):
+                              cache_params=None,
+                              prefetch=True):
     """
     subprocess for simulating a cache, this will be used as init func for simulating a cache,
     it reads data from reader and calculates the number of hits and misses
@@ -40,25 +44,24 @@ def _cal_hit_count_subprocess(cache_class,
     :param reader_class: the __class__ attribute of reader, this will be used to create local reader instance
     :param reader_params:   parameters for reader, used in creating local reader instance
     :param cache_params:    parameters for cache, used in creating cache
+    :param prefetch:        whether read the trace on a background thread while simulating
     :return: a tuple of number of hits and number of misses
     """
 
     if cache_params is None:
         cache_params = {}
     process_reader = reader_class(**reader_params)
+    if prefetch:
+        process_reader = PrefetchReader(process_reader, fields=("label", ))
     cache = cache_class(cache_size, **cache_params)
     n_hits = 0
     n_misses = 0
 
-    n = 0
-    for req in process_reader:
-        if n == 0:
-            n += 1
-        hit = cache.access(req, )
-        if hit:
-            n_hits += 1
-        else:
-            n_misses += 1
+    for batch in process_reader.iter_batches(fields=("label", )):
+        hits, _ = cache.access_batch(batch["label"])
+        num_of_hits_in_batch = int(np.count_nonzero(hits))
+        n_hits += num_of_hits_in_batch
+        n_misses += len(hits) - num_of_hits_in_batch
     process_reader.close()
     # print("size {} \t {}: {}".format(cache_size, n_hits, n_misses))
     return n_hits, n_misses
@@ -84,6 +87,7 @@ class PyGeneralProfiler:
         self.bin_size = bin_size
         self.num_of_bins = num_of_bins
         self.num_of_threads = kwargs.get("num_of_threads", DEF_NUM_THREADS)
+        self.prefetch = kwargs.get("prefetch", True)
         self.num_of_trace_elements = 0
 
         assert isinstance(reader, AbstractReader), \
@@ -123,6 +127,9 @@ class PyGeneralProfiler:
         :return: True if succeed, else False
         """
 
+        if self.cache_class is Optimal:
+            return self._run_opt()
+
         reader_params = self.reader.get_params()
         reader_params["open_c_reader"] = False
 
@@ -132,7 +139,7 @@ class PyGeneralProfiler:
             future_to_size_ind = {ppe.submit(_cal_hit_count_subprocess,
                                              self.cache_class, self.bin_size * ind,
                                              self.reader.__class__, reader_params,
-                                             self.cache_params): ind \
+                                             self.cache_params, self.prefetch): ind \
                                 for ind in range(self.num_of_bins, 0, -1)}
             for future in as_completed(future_to_size_ind):
                 result = future.result()
@@ -158,6 +165,24 @@ class PyGeneralProfiler:
 
 
 
+    def _run_opt(self):
+        """
+        OPT is a stack algorithm, so the hit count of all cache sizes is obtained from
+        the OPT stack distances computed in one pass, instead of simulating each cache size
+        :return: True
+        """
+
+        dist = get_opt_stack_dist(self.reader, self.bin_size * self.num_of_bins)
+        self.num_of_trace_elements = len(dist)
+        hit_dist = dist[dist > 0]
+        # a request of stack distance d hits from the bin of size ceil(d / bin_size)
+        self.hit_count[:] = np.bincount((hit_dist + self.bin_size - 1) // self.bin_size,
+                                        minlength=self.num_of_bins + 1)[:self.num_of_bins + 1]
+        self.hit_ratio[:] = np.cumsum(self.hit_count) / max(self.num_of_trace_elements, 1)
+        self.has_ran = True
+        return True
+
+
     def get_hit_count(self, **kwargs):
         """
         obtain hit count at cache size [0, bin_size, bin_size*2 ...]
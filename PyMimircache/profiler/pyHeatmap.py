@@ -22,7 +22,6 @@ Author: Jason Yang <peter.waynechina@gmail.com> 2016/08
 
 """
 
-import pickle
 from collections import deque
 from multiprocessing import Array, Process, Queue
 
@@ -79,46 +78,16 @@ class PyHeatmap:
 
     def _prepare_reuse_distance_and_break_points(self, mode, reader,
                                                  time_interval=-1, num_of_pixels=-1,
-                                                 calculate=True, save=False,
                                                  **kwargs):
-        reader.reset()
-
-        break_points = []
-
-        if calculate:
-            # build profiler for extracting reuse distance (For LRU)
-            p = LRUProfiler(reader)
-            reuse_dist = p.get_reuse_distance()
-
-            if save:
-                # needs to save the data
-                if not os.path.exists('temp/'):
-                    os.makedirs('temp/')
-                with open('temp/reuse.dat', 'wb') as ofile:
-                    # pickle.dump(reuse_dist_python_list, ofile)
-                    pickle.dump(reuse_dist, ofile)
-
-        else:
-            # the reuse distance has already been calculated, just load it
-            with open('temp/reuse.dat', 'rb') as ifile:
-                # reuse_dist_python_list = pickle.load(ifile)
-                reuse_dist = pickle.load(ifile)
-
-            breakpoints_filename = 'temp/break_points_' + mode + str(time_interval) + '.dat'
-            # check whether the break points distribution table has been calculated
-            if os.path.exists(breakpoints_filename):
-                with open(breakpoints_filename, 'rb') as ifile:
-                    break_points = pickle.load(ifile)
-
-        # check break points are loaded or not, if not need to calculate it
-        if not break_points:
-            break_points = CHeatmap.get_breakpoints(reader, mode,
-                                                      time_interval=time_interval,
-                                                      num_of_pixels=num_of_pixels)
-            if save:
-                with open('temp/break_points_' + mode + str(time_interval) + '.dat', 'wb') as ifile:
-                    pickle.dump(break_points, ifile)
+        """
+        get reuse distance and break points, both are reused from the derived data cache once computed
+        """
 
+        reader.reset()
+        reuse_dist = LRUProfiler(reader).get_reuse_distance()
+        break_points = CHeatmap.get_breakpoints(reader, mode,
+                                                time_interval=time_interval,
+                                                num_of_pixels=num_of_pixels)
         return reuse_dist, break_points
 
     def _prepare_multiprocess_params_LRU(self, mode, plot_type, break_points, **kwargs):
@@ -7,6 +7,7 @@ Author: Jason Yang <peter.waynechina@gmail.com> 2016/08
 """
 
 import math
+import numpy as np
 
 from PyMimircache import *
 from PyMimircache.cache.optimal import Optimal
@@ -51,9 +52,7 @@ def calc_hit_ratio_start_time_end_time_subprocess_general(order, cache, break_po
 
     result_list = []
     total_hc = 0  # total hit count
-    total_mc = 0  # total miss count
     pos_in_break_points = order + 1
-    line_num = 0
     # if type(reader) != plainCacheReader:
     #     reader_new = plainCacheReader('temp.dat')
     # else:
@@ -64,30 +63,30 @@ def calc_hit_ratio_start_time_end_time_subprocess_general(order, cache, break_po
     else:
         reader_new = type(reader)(reader.file_loc, open_c_reader=False)
 
-    # TODO: figure out line size here and add seek method in reader base class
-    # TODO: use mmap here to improve performance
-
-    for line in reader_new:
-        if line_num < break_points_share_array[order]:
-            line_num += 1
-            continue
-        # fix this hack
-        if cache == Optimal:
-            c.ts = line_num
-
-        line_num += 1
-        if c.access(line, ):
-            total_hc += 1
-        else:
-            total_mc += 1
-
-        if pos_in_break_points < len(break_points_share_array) and \
-                        line_num == break_points_share_array[pos_in_break_points]:
-            hr = total_hc / (break_points_share_array[pos_in_break_points] - break_points_share_array[order])
+    # start from the break point directly, text readers seek through the offset index
+    line_num = break_points_share_array[order]
+    reader_new.set_read_pos(line_num)
+    if cache == Optimal:
+        c.ts = line_num
+
+    # the break points after the starting one, the hit ratio is calculated at each of them
+    end_points = np.array(break_points_share_array[order + 1:], dtype=np.int64)
+    for batch in reader_new.iter_batches(fields=("label", )):
+        if pos_in_break_points >= len(break_points_share_array):
+            break
+        hits, _ = c.access_batch(batch["label"])
+        hit_count = np.cumsum(hits)
+        batch_end = line_num + len(hits)
+        # the break points inside this batch
+        ends = end_points[pos_in_break_points - order - 1:]
+        ends = ends[ends <= batch_end]
+        for end in ends.tolist():
+            hr = (total_hc + int(hit_count[end - line_num - 1])) / (end - break_points_share_array[order])
             result_list.append((order, pos_in_break_points - 1, hr))
             pos_in_break_points += 1
-            # print("{}: {}".format(total_hc, total_mc))
-    q.access(result_list, )
+        total_hc += int(hit_count[-1])
+        line_num = batch_end
+    q.put(result_list, )
     reader_new.close()
 
 
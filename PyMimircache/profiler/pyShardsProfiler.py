@@ -0,0 +1,256 @@
+# coding=utf-8
+
+"""
+this module provides the LRU profiler with spatial sampling (SHARDS) in python,
+it computes reuse distances on the trace sampled by a SamplingReader and scales them by the sample rate,
+so an approximate hit ratio curve of a large trace can be obtained from a small fraction of its objects
+
+reuse distances are computed with a Fenwick tree over the last access time of sampled objects,
+the time is renumbered when the tree is full, so memory is proportional to the number of sampled objects
+
+in fixed rate mode, the difference between the expected and the actual number of sampled requests
+is added to the smallest reuse distance (SHARDS_adj),
+in fixed size mode, when the sample rate is lowered, the objects dropped by the reader are removed
+and the histogram is rescaled to the new rate
+
+"""
+
+import os
+import heapq
+import numpy as np
+
+from PyMimircache.cacheReader.abstractReader import AbstractReader
+from PyMimircache.cacheReader.samplingReader import SamplingReader, threshold_to_rate
+from PyMimircache.utils.printing import *
+from PyMimircache.profiler.utilProfiler import util_plotHRC
+
+
+__all__ = ["PyShardsProfiler"]
+
+
+class _ReuseDistanceCounter:
+    """
+    compute LRU reuse distances (the number of distinct objects accessed since last access) one by one
+    """
+
+    def __init__(self, capacity=1 << 16):
+        """
+        :param capacity: the initial number of time slots in the Fenwick tree
+        """
+
+        self.capacity = capacity
+        self.tree = [0] * (capacity + 1)
+        self.last_time = {}
+        self.now = 0
+
+    def _add(self, t, delta):
+        i, tree, capacity = t + 1, self.tree, self.capacity
+        while i <= capacity:
+            tree[i] += delta
+            i += i & -i
+
+    def _compact(self):
+        """
+        renumber the last access time of live objects to 0, 1, 2 ..., and grow the tree if more than half is live
+        """
+
+        live = sorted(self.last_time, key=self.last_time.get)
+        self.last_time = {label: t for t, label in enumerate(live)}
+        self.capacity = max(self.capacity, 2 * len(live))
+        # the tree of ones at time [0, len(live))
+        self.tree = [max(0, min(i, len(live)) - (i - (i & -i))) for i in range(self.capacity + 1)]
+        self.tree[0] = 0
+        self.now = len(live)
+
+    def access(self, label):
+        """
+        :param label: the label of the request
+        :return: the reuse distance, -1 for cold miss
+        """
+
+        last_time = self.last_time
+        t = last_time.get(label)
+        if t is None:
+            dist = -1
+        else:
+            # the number of live objects accessed after t
+            i, s, tree = t + 1, 0, self.tree
+            while i > 0:
+                s += tree[i]
+                i -= i & -i
+            dist = len(last_time) - s
+            self._add(t, -1)
+        if self.now == self.capacity:
+            if t is not None:
+                del last_time[label]
+            self._compact()
+            last_time = self.last_time
+        self._add(self.now, 1)
+        last_time[label] = self.now
+        self.now += 1
+        return dist
+
+    def remove(self, label):
+        """
+        remove an object, it is a cold miss when accessed again
+
+        :param label: the label of the object
+        """
+
+        t = self.last_time.pop(label, None)
+        if t is not None:
+            self._add(t, -1)
+
+
+class PyShardsProfiler:
+    """
+    LRU profiler with spatial sampling
+    """
+
+    all = ["get_hit_count", "get_hit_ratio", "get_sample_rate", "plotHRC"]
+
+    def __init__(self, reader, cache_size=-1, sample_rate=0.01, sample_size=None, seed=0, adjust=True, **kwargs):
+        """
+        :param reader: a SamplingReader, or a reader which is then sampled with sample_rate, sample_size and seed
+        :param cache_size: the max cache size of the hit ratio curve, -1 for the max reuse distance
+        :param sample_rate: the sample rate of fixed rate mode, or the initial sample rate of fixed size mode
+        :param sample_size: the max number of sampled objects, enables fixed size mode if given
+        :param seed: the seed of the hash function
+        :param adjust: whether correct the difference between expected and actual number of sampled requests,
+                        fixed rate mode only
+        """
+
+        assert isinstance(reader, AbstractReader), "you provided an invalid cacheReader: {}".format(reader)
+        if not isinstance(reader, SamplingReader):
+            reader = SamplingReader(reader.copy(), sample_rate=sample_rate, sample_size=sample_size, seed=seed)
+        self.reader = reader
+        self.cache_size = cache_size
+        self.adjust = adjust and reader.sample_size is None
+        assert cache_size == -1 or (isinstance(cache_size, int) and cache_size > 0), \
+            "cache size {} is not valid".format(cache_size)
+
+        # the number of requests of scaled reuse distance i, the cold misses and the sample rate at the end
+        self.reuse_dist_count = None
+        self.num_of_cold_miss = 0
+        self.sample_rate = None
+        self.has_ran = False
+
+    def _run(self):
+        """
+        compute the histogram of scaled reuse distances of the sampled trace
+        """
+
+        reader = self.reader
+        reader.reset()
+        counter = _ReuseDistanceCounter()
+        # a max heap of (negated hash, label) of the sampled objects, used for dropping objects in fixed size mode
+        hash_heap = []
+        fixed_size = reader.sample_size is not None
+        hist = np.zeros(1, dtype=np.float64)
+        num_of_cold_miss = 0.0
+        threshold = None
+
+        for batch in reader.iter_batches(fields=("label", )):
+            labels, thresholds = batch["label"].tolist(), batch["threshold"]
+            hashes = batch["hash"].tolist() if fixed_size else None
+            # the threshold only changes in fixed size mode, process the batch in runs of the same threshold
+            boundaries = [0] + (np.flatnonzero(np.diff(thresholds)) + 1).tolist() + [len(labels)]
+            for begin, end in zip(boundaries[:-1], boundaries[1:]):
+                run_threshold = int(thresholds[begin])
+                if threshold is not None and run_threshold < threshold:
+                    while hash_heap and -hash_heap[0][0] > run_threshold:
+                        counter.remove(heapq.heappop(hash_heap)[1])
+                    ratio = threshold_to_rate(run_threshold) / threshold_to_rate(threshold)
+                    hist *= ratio
+                    num_of_cold_miss *= ratio
+                threshold = run_threshold
+
+                dists = []
+                for i in range(begin, end):
+                    dist = counter.access(labels[i])
+                    if dist == -1:
+                        num_of_cold_miss += 1
+                        if fixed_size:
+                            heapq.heappush(hash_heap, (-hashes[i], labels[i]))
+                    else:
+                        dists.append(dist)
+                if dists:
+                    count = np.bincount((np.array(dists) / threshold_to_rate(threshold)).astype(np.int64))
+                    if len(count) > len(hist):
+                        hist = np.concatenate((hist, np.zeros(len(count) - len(hist))))
+                    hist[:len(count)] += count
+
+        assert threshold is not None, "no request is sampled, please use a larger sample rate"
+        self.sample_rate = threshold_to_rate(threshold)
+        if self.adjust:
+            expected = reader.get_num_of_scanned_req() * self.sample_rate
+            hist[0] += expected - (np.sum(hist) + num_of_cold_miss)
+        reader.reset()
+
+        self.reuse_dist_count = hist
+        self.num_of_cold_miss = num_of_cold_miss
+        self.has_ran = True
+
+    def get_sample_rate(self):
+        """
+        :return: the sample rate at the end of the trace
+        """
+
+        if not self.has_ran:
+            self._run()
+        return self.sample_rate
+
+    def get_hit_count(self, **kwargs):
+        """
+        estimated hit count of the original trace,
+        0~size(included) are for counting scaled rd=0~size, size+1 is out of range, size+2 is cold miss,
+        so total is size+3 buckets
+
+        :param kwargs: cache_size
+        :return: a numpy array of size+3
+        """
+
+        if not self.has_ran:
+            self._run()
+        cache_size = kwargs.get("cache_size", self.cache_size)
+        if cache_size == -1:
+            cache_size = len(self.reuse_dist_count)
+        hit_count = np.zeros(cache_size + 3, dtype=np.float64)
+        count = self.reuse_dist_count[:cache_size + 1]
+        hit_count[:len(count)] = count
+        hit_count[cache_size + 1] = np.sum(self.reuse_dist_count[cache_size + 1:])
+        hit_count[cache_size + 2] = self.num_of_cold_miss
+        return hit_count / self.sample_rate
+
+    def get_hit_ratio(self, **kwargs):
+        """
+        estimated hit ratio of the original trace
+
+        :param kwargs: cache_size
+        :return: a numpy array of CACHE_SIZE+3, 0~CACHE_SIZE corresponds to hit ratio of size 0~CACHE_SIZE,
+         size 0 should always be 0, CACHE_SIZE+1 is out of range, CACHE_SIZE+2 is cold miss,
+         so total is CACHE_SIZE+3 buckets
+        """
+
+        hit_count = self.get_hit_count(**kwargs)
+        total = np.sum(hit_count)
+        hit_ratio = np.zeros(len(hit_count), dtype=np.float64)
+        hit_ratio[1:-2] = np.cumsum(hit_count[:-3]) / total
+        hit_ratio[-2] = (hit_count[-3] + hit_count[-2]) / total
+        hit_ratio[-1] = hit_count[-1] / total
+        return hit_ratio
+
+    def plotHRC(self, **kwargs):
+        """
+        plot hit ratio curve of the given trace
+
+        :param kwargs: figname, cache_unit_size (unit: Byte), no_clear, no_save
+        :return: hit ratio
+        """
+
+        hit_ratio = self.get_hit_ratio(**kwargs)[:-2]
+        dat_name = os.path.basename(self.reader.file_loc)
+        kwargs["figname"] = kwargs.get("figname", "HRC_{}_shards.png".format(dat_name))
+        kwargs["label"] = kwargs.get("label", "LRU_shards")
+        util_plotHRC(list(range(len(hit_ratio))), hit_ratio, **kwargs)
+        return hit_ratio
@@ -486,6 +486,27 @@ def rt_popularity_2d(reader, granularity=10, logX=True, logY=False, cdf=True,
     return l
 
 
+def _find_first_after(times, begin, ts):
+    """
+    find the first request from begin whose time is larger than ts,
+    the search window grows geometrically, so the cost is proportional to the distance
+
+    :param times: a numpy array of timestamps
+    :param begin: the index to search from
+    :param ts: the timestamp
+    :return: the index of the request, len(times) if there is no such request
+    """
+
+    window = 1024
+    while begin < len(times):
+        found = np.flatnonzero(times[begin: begin + window] > ts)
+        if len(found):
+            return begin + int(found[0])
+        begin += window
+        window *= 2
+    return len(times)
+
+
 def interval_hit_ratio_2d(reader, cache_size, decay_coef=0.2,
                           time_mode="v", time_interval=10000, figname="IHRC_2d.png",
                           **kwargs):
@@ -523,31 +544,26 @@ def interval_hit_ratio_2d(reader, cache_size, decay_coef=0.2,
                 hit_ratio_list.append(ewma_hit_ratio)
 
     elif time_mode == "r":
-        ind = 0
-        req_cnt_interval = 0
-
-        # read time and request label
-        line = reader.read_time_req()
-        t, req = line
-        last_time_interval_cutoff = line[0]
-
-        while line:
-            last_time = t
-            t, req = line
-            if t - last_time_interval_cutoff > time_interval:
-                hit_ratio_interval = hit_cnt_interval / req_cnt_interval
-                ewma_hit_ratio = ewma_hit_ratio * decay_coef + hit_ratio_interval * (1 - decay_coef)
-                hit_cnt_interval = 0
-                req_cnt_interval = 0
-                last_time_interval_cutoff = last_time
-                hit_ratio_list.append(ewma_hit_ratio)
-
-            rd = rd_list[ind]
-            req_cnt_interval += 1
-            if rd != -1 and rd <= cache_size:
-                hit_cnt_interval += 1
-
-            line = reader.read_time_req()
+        # read timestamps in batches instead of one request at a time
+        reader.reset()
+        times = np.concatenate([batch["time"] for batch in reader.iter_batches(fields=("time", ))])
+        rd_list = np.asarray(rd_list)
+        is_hit = (rd_list != -1) & (rd_list <= cache_size)
+
+        # an interval ends before the first request more than time_interval after the cutoff,
+        # then the cutoff becomes the time of the last request in the interval
+        interval_begin = 0
+        last_time_interval_cutoff = times[0]
+        ind = 1
+        while ind < len(times):
+            ind = _find_first_after(times, ind, last_time_interval_cutoff + time_interval)
+            if ind == len(times):
+                break
+            hit_ratio_interval = np.count_nonzero(is_hit[interval_begin:ind]) / (ind - interval_begin)
+            ewma_hit_ratio = ewma_hit_ratio * decay_coef + hit_ratio_interval * (1 - decay_coef)
+            hit_ratio_list.append(ewma_hit_ratio)
+            last_time_interval_cutoff = times[ind - 1]
+            interval_begin = ind
             ind += 1
 
     kwargs_plot = {}
@@ -11,6 +11,7 @@
 
 import os
 import math
+import numpy as np
 try:
     # pypy3 fails on this
     import matplotlib.pyplot
@@ -23,6 +24,7 @@ import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 
 from PyMimircache.utils.printing import *
+from PyMimircache.utils.derivedDataCache import get_derived_data_cache
 
 
 def get_breakpoints(reader, time_mode, time_interval, **kwargs):
@@ -40,6 +42,12 @@ def get_breakpoints(reader, time_mode, time_interval, **kwargs):
     :return: a numpy list of break points begin with 0, ends with total_num_requests
     """
 
+    derived_data_cache = get_derived_data_cache()
+    params = {"time_mode": time_mode, "time_interval": time_interval}
+    bp = derived_data_cache.get(reader, "breakpoints", params)
+    if bp is not None:
+        return bp.tolist()
+
     bp = []
     if time_mode == "v":
         num_req = reader.get_num_of_req()
@@ -48,24 +56,77 @@ def get_breakpoints(reader, time_mode, time_interval, **kwargs):
         if bp[-1] != num_req:
             bp.append(num_req)
     elif time_mode == "r":
+        # break points are searched in a batch of timestamps,
+        # when the next one is not in the batch, jump to it through the timestamp index
+        time_index = reader.get_time_index()
+        batch_size = time_index.step * 16
+        reader.reset()
         bp.append(0)
-        ind = 0
-        line = reader.read_time_req()
-        last_ts = line[0]
-        while line:
-            if line[0] - last_ts > time_interval:
+        batch = reader.read_batch(batch_size, ("time", ))
+        # an empty trace (or time slice) has no break point other than 0
+        if batch is not None:
+            times = batch["time"]
+            # times holds the timestamps of requests [begin, begin + len(times))
+            begin, ind, last_ts = 0, 0, times[0]
+            is_sorted = bool(np.all(times[1:] >= times[:-1]))
+            while True:
+                threshold = last_ts + time_interval
+                if is_sorted:
+                    next_ind = begin + int(np.searchsorted(times, threshold, side="right"))
+                else:
+                    found = np.flatnonzero(times[ind + 1 - begin:] > threshold)
+                    next_ind = ind + 1 + int(found[0]) if len(found) else begin + len(times)
+                if next_ind < begin + len(times):
+                    ind, last_ts = next_ind, times[next_ind - begin]
+                    bp.append(ind)
+                    continue
+                ind, last_ts = time_index.locate(reader, threshold, begin=begin + len(times), inclusive=False)
+                if last_ts is None:
+                    break
                 bp.append(ind)
-                last_ts = line[0]
-            line = reader.read_time_req()
-            ind += 1
-        if bp[-1] != ind:
-            bp.append(ind)
+                batch = reader.read_batch(batch_size, ("time", ))
+                if batch is None:
+                    break
+                begin, times = ind, batch["time"]
+                is_sorted = bool(np.all(times[1:] >= times[:-1]))
+        if bp[-1] != time_index.num_of_req:
+            bp.append(time_index.num_of_req)
+        reader.reset()
     else:
         raise RuntimeError("unknown time_mode {}".format(time_mode))
 
+    derived_data_cache.put(reader, "breakpoints", bp, params)
     return bp
 
 
+def get_next_access_dist(reader):
+    """
+    the distance (in number of requests) from each request to the next request of the same object,
+    it is computed with a stable sort of the requests by object, and saved in the derived data cache
+
+    :param reader: reader for reading trace
+    :return: a numpy int64 array, -1 for requests that are not accessed again
+    """
+
+    def compute():
+        reader.reset()
+        labels = [batch["label"] for batch in reader.iter_batches(fields=("label", ))]
+        reader.reset()
+        if not labels:
+            return np.zeros(0, dtype=np.int64)
+        _, ids = np.unique(np.concatenate(labels), return_inverse=True)
+        ids = ids.reshape(-1)
+        # requests of the same object are adjacent and in time order after a stable sort
+        order = np.argsort(ids, kind="stable")
+        cur, nxt = order[:-1], order[1:]
+        same_obj = ids[cur] == ids[nxt]
+        dist = np.full(len(order), -1, dtype=np.int64)
+        dist[cur[same_obj]] = nxt[same_obj] - cur[same_obj]
+        return dist
+
+    return get_derived_data_cache().get_or_compute(reader, "next_access", compute)
+
+
 def util_plotHRC(x_list, hit_ratio, **kwargs):
     """
     plot hit ratio curve of the given trace under given algorithm
@@ -36,6 +36,7 @@ from PyMimircache.profiler.cHeatmap import CHeatmap
 from PyMimircache.profiler.pyHeatmap import PyHeatmap
 
 from PyMimircache.cacheReader.traceStat import TraceStat
+from PyMimircache.cacheReader.traceCompactor import compact_trace
 from multiprocessing import cpu_count
 from PyMimircache.profiler.utilProfiler import set_fig
 
@@ -50,6 +51,7 @@ class Cachecow:
            "vscsi",
            "binary",
            "stat",
+           "compact",
            "num_of_req",
            "num_of_uniq_req",
            "get_reuse_distance",
@@ -101,7 +103,7 @@ class Cachecow:
         if self.reader:
             self.reader.close()
         if trace_type == "p":
-            self.reader = PlainReader(file_path, data_type=data_type)
+            self.reader = PlainReader(file_path, data_type=data_type, **kwargs)
 
         elif trace_type == "c":
             assert "init_params" in kwargs, "please provide init_params for csv trace"
@@ -246,6 +248,20 @@ class Cachecow:
         return TraceStat(self.reader).get_stat()
 
 
+    def compact(self, out_path, label_fmt="I"):
+        """
+        convert the opened trace into a compact binary trace with dense integer labels,
+        the compacted trace can be opened later using traceCompactor.open_compacted_trace
+        or binary with the init_params saved in the sidecar, see traceCompactor for details
+
+        :param out_path: the location of the compacted trace
+        :param label_fmt: "I" for 32-bit label ids or "Q" for 64-bit label ids
+        :return: a dict of metadata of the compacted trace
+        """
+        assert self.reader, "you haven't provided a data file"
+        return compact_trace(self.reader, out_path, label_fmt=label_fmt)
+
+
     def num_of_req(self):
         """
 
@@ -0,0 +1,277 @@
+# coding=utf-8
+
+"""
+this module provides a persistent cache of data derived from traces, such as reuse distance,
+next access distance and break points, so that the expensive passes over a trace are computed once
+
+the cache is content addressed, each entry is keyed by
+    the fingerprint of the trace:   a hash of the whole content of the trace,
+                                    so a copy of the trace at another path or on another node shares the entry,
+                                    and any change of the content misses the cache
+    the parameters of the reader:   how the trace is parsed (columns, data type, block size ...),
+                                    the location of the trace is replaced by its fingerprint
+    the kind of the data and the parameters of the computation
+
+each entry is a .npy file in the cache directory, the modification time of an entry is updated on each hit,
+and the least recently used entries are removed when the total size exceeds max_size
+
+the directory and the max size default to DEF_DERIVED_DATA_DIR and DEF_DERIVED_DATA_MAX_SIZE,
+which can be set with environment variables PYMIMIRCACHE_DERIVED_DATA_DIR and PYMIMIRCACHE_DERIVED_DATA_MAX_SIZE
+
+"""
+
+import os
+import glob
+import hashlib
+import tempfile
+import numpy as np
+
+from PyMimircache.const import DEF_DERIVED_DATA_DIR, DEF_DERIVED_DATA_MAX_SIZE
+from PyMimircache.utils.printing import *
+
+
+# the size of each read when hashing a trace
+FINGERPRINT_CHUNK_SIZE = 1 << 20
+
+# reader parameters that do not change the requests read from a trace
+IGNORED_READER_PARAMS = {"open_c_reader", "lock", "label_table"}
+
+# (real path, size, modification time, inode) -> fingerprint, so a trace is only hashed once in a process
+_fingerprints = {}
+
+
+def trace_fingerprint(file_loc):
+    """
+    the fingerprint of a trace, it does not depend on the location of the trace,
+    the whole trace is hashed in one streaming pass, the result is remembered in the process
+    until the size, modification time or inode of the trace changes
+
+    :param file_loc: location of the trace
+    :return: a hex string
+    """
+
+    stat = os.stat(file_loc)
+    memo_key = (os.path.realpath(file_loc), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    if memo_key not in _fingerprints:
+        h = hashlib.blake2b(str(stat.st_size).encode(), digest_size=16)
+        with open(file_loc, "rb") as ifile:
+            for chunk in iter(lambda: ifile.read(FINGERPRINT_CHUNK_SIZE), b""):
+                h.update(chunk)
+        _fingerprints[memo_key] = h.hexdigest()
+    return _fingerprints[memo_key]
+
+
+def _canonical(params):
+    """
+    convert reader or computation parameters into a canonical string,
+    the location of a trace is replaced by its fingerprint and classes are replaced by their names
+
+    :param params: parameters, can be nested dicts and lists
+    :return: a string
+    """
+
+    if isinstance(params, dict):
+        items = []
+        for name in sorted(params, key=str):
+            if name in IGNORED_READER_PARAMS:
+                continue
+            value = params[name]
+            if name == "file_loc" and isinstance(value, str):
+                value = trace_fingerprint(value)
+            items.append("{!r}:{}".format(name, _canonical(value)))
+        return "{" + ",".join(items) + "}"
+    elif isinstance(params, (list, tuple)):
+        return "[" + ",".join(_canonical(value) for value in params) + "]"
+    elif isinstance(params, type):
+        return params.__name__
+    return repr(params)
+
+
+class DerivedDataCache:
+    """
+    a size bounded persistent cache of numpy arrays derived from traces
+    """
+
+    all = ["get", "put", "get_or_compute", "remove", "clear", "get_key"]
+
+    def __init__(self, cache_dir=DEF_DERIVED_DATA_DIR, max_size=DEF_DERIVED_DATA_MAX_SIZE, enabled=True):
+        """
+        :param cache_dir: the directory of the cache
+        :param max_size: the max total size of cached data in bytes
+        :param enabled: whether use the cache, if False, get always misses and put does nothing
+        """
+
+        assert max_size > 0, "max size must be positive"
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.enabled = enabled
+
+    def get_key(self, reader, kind, params=None):
+        """
+        :param reader: the reader of the trace
+        :param kind: the kind of the data, such as rd, frd, next_access and breakpoints
+        :param params: the parameters of the computation
+        :return: the key of the data, a hex string
+        """
+
+        reader_params = reader.get_params() or {"file_loc": reader.file_loc}
+        description = "{}|{}|{}|{}".format(kind, reader.__class__.__name__,
+                                           _canonical(reader_params), _canonical(params or {}))
+        return hashlib.blake2b(description.encode(), digest_size=20).hexdigest()
+
+    def _get_path(self, reader, kind, params=None):
+        return os.path.join(self.cache_dir, "{}_{}.npy".format(kind, self.get_key(reader, kind, params)))
+
+    def get(self, reader, kind, params=None):
+        """
+        :param reader: the reader of the trace
+        :param kind: the kind of the data
+        :param params: the parameters of the computation
+        :return: the cached numpy array, None if it is not cached
+        """
+
+        if not self.enabled:
+            return None
+        path = self._get_path(reader, kind, params)
+        try:
+            data = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        try:
+            # the modification time is the time of last use for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, reader, kind, data, params=None):
+        """
+        save data to the cache, least recently used entries are removed if the cache is full,
+        a cache directory that cannot be written is skipped with a warning
+
+        :param reader: the reader of the trace
+        :param kind: the kind of the data
+        :param data: a numpy array or a list of numbers
+        :param params: the parameters of the computation
+        :return: True if saved, otherwise False
+        """
+
+        if not self.enabled:
+            return False
+        data = np.asarray(data)
+        if data.nbytes > self.max_size:
+            return False
+        path = self._get_path(reader, kind, params)
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a temporary file first, so that other processes never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as ofile:
+                np.save(ofile, data, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except (OSError, ValueError) as e:
+            WARNING("cannot save {} of {} to {}: {}".format(kind, reader.file_loc, self.cache_dir, e))
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        self._evict()
+        return True
+
+    def get_or_compute(self, reader, kind, compute, params=None):
+        """
+        get the data from the cache, if it is not cached, compute and save it
+
+        :param reader: the reader of the trace
+        :param kind: the kind of the data
+        :param compute: a function without parameter that computes the data
+        :param params: the parameters of the computation
+        :return: the data
+        """
+
+        data = self.get(reader, kind, params)
+        if data is None:
+            data = compute()
+            self.put(reader, kind, data, params)
+        return data
+
+    def remove(self, reader, kind, params=None):
+        """
+        remove the data from the cache
+
+        :param reader: the reader of the trace
+        :param kind: the kind of the data
+        :param params: the parameters of the computation
+        :return: True if the data was cached
+        """
+
+        try:
+            os.remove(self._get_path(reader, kind, params))
+        except OSError:
+            return False
+        return True
+
+    def _evict(self):
+        """
+        remove least recently used entries until the total size is not larger than max_size
+        """
+
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.npy")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        """
+        remove all entries
+        """
+
+        for path in glob.glob(os.path.join(self.cache_dir, "*.npy")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def __repr__(self):
+        return "DerivedDataCache at {}, max size {}".format(self.cache_dir, self.max_size)
+
+
+_derived_data_cache = None
+
+
+def get_derived_data_cache():
+    """
+    :return: the derived data cache shared by profilers
+    """
+
+    global _derived_data_cache
+    if _derived_data_cache is None:
+        _derived_data_cache = DerivedDataCache()
+    return _derived_data_cache
+
+
+def set_derived_data_cache(cache_dir=DEF_DERIVED_DATA_DIR, max_size=DEF_DERIVED_DATA_MAX_SIZE, enabled=True):
+    """
+    configure the derived data cache shared by profilers
+
+    :param cache_dir: the directory of the cache
+    :param max_size: the max total size of cached data in bytes
+    :param enabled: whether use the cache
+    :return: the derived data cache
+    """
+
+    global _derived_data_cache
+    _derived_data_cache = DerivedDataCache(cache_dir, max_size, enabled)
+    return _derived_data_cache
@@ -0,0 +1,299 @@
+# coding=utf-8
+
+"""
+this module provides the sketches used for approximate trace statistics,
+all of them use bounded memory and are updated with numpy arrays of hashed labels,
+so a trace can be processed in batches without a python loop over requests
+
+    HyperLogLog:        number of unique objects
+    CountMinSketch:     frequency of an object
+    HeavyHitters:       the most popular objects, admitted by the frequencies from a CountMinSketch
+    FrequencySample:    exact frequencies of a fixed-size hash-based sample of the objects,
+                        used for estimating the fraction of objects accessed only once
+
+"""
+
+import math
+import heapq
+import mmh3
+import numpy as np
+from statistics import NormalDist
+
+
+U64_MASK = (1 << 64) - 1
+
+
+def hash_labels(labels, seed=0):
+    """
+    hash labels into uniformly distributed 64-bit integers,
+    integer labels are hashed with splitmix64 in numpy, other labels are converted to str and hashed with murmur3
+
+    :param labels: a numpy array of labels
+    :param seed: the seed of the hash function
+    :return: a numpy uint64 array
+    """
+
+    labels = np.asarray(labels)
+    if labels.dtype.kind in "iu":
+        h = labels.astype(np.uint64) + np.uint64((0x9E3779B97F4A7C15 * (seed + 1)) & U64_MASK)
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return h ^ (h >> np.uint64(31))
+    return np.fromiter((mmh3.hash64(label if isinstance(label, (str, bytes)) else str(label), seed, signed=False)[0]
+                        for label in labels.tolist()), dtype=np.uint64, count=len(labels))
+
+
+def z_score(confidence):
+    """
+    :param confidence: the confidence level, such as 0.99
+    :return: the z score of the two-sided normal interval at the confidence level
+    """
+
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog for estimating the number of unique objects, the relative standard error is 1.04 / sqrt(2^p)
+    """
+
+    all = ["add", "cardinality", "standard_error"]
+
+    def __init__(self, p=14):
+        """
+        :param p: the number of index bits, 2^p registers (bytes) are used
+        """
+
+        assert 4 <= p <= 24, "p must be in [4, 24]"
+        self.p = p
+        self.num_of_registers = 1 << p
+        self.registers = np.zeros(self.num_of_registers, dtype=np.uint8)
+
+    @classmethod
+    def from_error(cls, error, confidence=0.99):
+        """
+        :param error: the target relative error
+        :param confidence: the probability that the relative error is within the target
+        :return: a HyperLogLog with enough registers
+        """
+
+        num_of_registers = (1.04 * z_score(confidence) / error) ** 2
+        return cls(min(max(int(math.ceil(math.log2(num_of_registers))), 4), 24))
+
+    def add(self, hashes):
+        """
+        :param hashes: a numpy uint64 array of hashed labels
+        """
+
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        num_of_bits = 64 - self.p
+        ind = (hashes >> np.uint64(num_of_bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << num_of_bits) - 1)
+        # the bit length of rest, computed from two exact 32-bit halves
+        high, low = rest >> np.uint64(32), rest & np.uint64(0xFFFFFFFF)
+        bit_length = np.where(high > 0, np.frexp(high.astype(np.float64))[1] + 32,
+                              np.frexp(low.astype(np.float64))[1])
+        rank = (num_of_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, ind, rank)
+
+    def cardinality(self):
+        """
+        :return: the estimated number of unique objects
+        """
+
+        m = self.num_of_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        num_of_zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and num_of_zeros > 0:
+            # linear counting is more accurate for small cardinality
+            estimate = m * math.log(m / num_of_zeros)
+        return estimate
+
+    def standard_error(self):
+        """
+        :return: the relative standard error
+        """
+
+        return 1.04 / math.sqrt(self.num_of_registers)
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch for estimating frequencies, an estimate is never smaller than the true frequency,
+    and it exceeds the true frequency by more than e / width * (total count) with probability at most e^-depth
+    """
+
+    all = ["add", "query", "error_bound"]
+
+    def __init__(self, width=2048, depth=5):
+        """
+        :param width: the number of counters in each row
+        :param depth: the number of rows
+        """
+
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total_count = 0
+
+    @classmethod
+    def from_error(cls, error, confidence=0.99):
+        """
+        :param error: the target error relative to total count
+        :param confidence: the probability that the error is within the target
+        :return: a CountMinSketch
+        """
+
+        return cls(int(math.ceil(math.e / error)), max(int(math.ceil(math.log(1 / (1 - confidence)))), 1))
+
+    def _get_indexes(self, hashes):
+        # derive one index per row from two 32-bit halves (Kirsch-Mitzenmacher)
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        h2 = (hashes >> np.uint64(32)).astype(np.int64) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, hashes, counts=None):
+        """
+        :param hashes: a numpy uint64 array of hashed labels
+        :param counts: the number of accesses of each label, 1 for each if not given
+        """
+
+        if counts is None:
+            counts = np.ones(len(hashes), dtype=np.int64)
+        for row, ind in zip(self.table, self._get_indexes(hashes)):
+            row += np.bincount(ind, weights=counts, minlength=self.width).astype(np.int64)
+        self.total_count += int(np.sum(counts))
+
+    def query(self, hashes):
+        """
+        :param hashes: a numpy uint64 array of hashed labels
+        :return: a numpy array of estimated frequencies
+        """
+
+        return np.min([row[ind] for row, ind in zip(self.table, self._get_indexes(hashes))], axis=0)
+
+    def error_bound(self):
+        """
+        :return: the max overestimate of a frequency with probability 1 - e^-depth
+        """
+
+        return math.e / self.width * self.total_count
+
+
+class HeavyHitters:
+    """
+    track the most popular objects, an object becomes a candidate when its frequency estimated by
+    a CountMinSketch is among the largest, after that its accesses are counted exactly,
+    so the frequency of a candidate is its estimate at admission plus the exact count since then,
+    an object is only considered when it is accessed, which is when its frequency can change
+    """
+
+    all = ["update", "get_top"]
+
+    def __init__(self, k, count_min_sketch, slack=4):
+        """
+        :param k: the number of popular objects needed
+        :param count_min_sketch: the CountMinSketch that has been updated with the same accesses
+        :param slack: slack * k candidates are kept to reduce the chance of missing a popular object
+        """
+
+        self.k = k
+        self.count_min_sketch = count_min_sketch
+        self.capacity = max(slack * k, k + 16)
+        # candidate label -> estimated frequency
+        self.candidates = {}
+
+    def update(self, labels, hashes, counts):
+        """
+        :param labels: a numpy array of unique labels accessed since last update,
+                        the CountMinSketch must have been updated with them
+        :param hashes: the hashes of the labels
+        :param counts: the number of accesses of each label since last update
+        """
+
+        candidates = self.candidates
+        is_candidate = np.zeros(len(labels), dtype=bool)
+        if candidates:
+            is_candidate = np.isin(labels, np.array(list(candidates.keys()), dtype=labels.dtype))
+            for label, count in zip(labels[is_candidate].tolist(), counts[is_candidate].tolist()):
+                candidates[label] += count
+
+        others = np.flatnonzero(~is_candidate)
+        estimates = self.count_min_sketch.query(hashes[others])
+        threshold = min(candidates.values()) if len(candidates) >= self.capacity else 0
+        selected = np.flatnonzero(estimates > threshold)
+        if len(selected) > self.capacity:
+            selected = selected[np.argpartition(estimates[selected], -self.capacity)[-self.capacity:]]
+        for label, estimate in zip(labels[others[selected]].tolist(), estimates[selected].tolist()):
+            candidates[label] = estimate
+        if len(candidates) > self.capacity:
+            self.candidates = dict(heapq.nlargest(self.capacity, candidates.items(), key=lambda x: x[1]))
+
+    def get_top(self, n=None):
+        """
+        :param n: the number of objects, k if not given
+        :return: a list of (obj, estimated frequency) in descending order of frequency
+        """
+
+        return heapq.nlargest(n if n is not None else self.k, self.candidates.items(), key=lambda x: x[1])
+
+
+class FrequencySample:
+    """
+    a fixed-size sample of objects selected by their hashes, the objects whose hash is not larger than a threshold
+    are sampled, their frequencies are exact, the threshold is lowered when the sample grows too large,
+    so the sample is a uniform sample of the unique objects
+    """
+
+    all = ["update", "get_sample_rate", "get_num_of_obj_with_freq"]
+
+    def __init__(self, max_size=16384):
+        """
+        :param max_size: the max number of objects in the sample
+        """
+
+        self.max_size = max_size
+        self.threshold = U64_MASK
+        self.freq = {}
+
+    def update(self, hashes, counts):
+        """
+        :param hashes: a numpy uint64 array of hashed labels, each label appears once
+        :param counts: the number of accesses of each label
+        """
+
+        selected = np.flatnonzero(hashes <= np.uint64(self.threshold))
+        freq = self.freq
+        for h, count in zip(hashes[selected].tolist(), counts[selected].tolist()):
+            freq[h] = freq.get(h, 0) + count
+        if len(freq) > self.max_size:
+            kept = heapq.nsmallest(self.max_size, freq.keys())
+            self.threshold = kept[-1]
+            self.freq = {h: freq[h] for h in kept}
+
+    def get_sample_rate(self):
+        """
+        :return: the fraction of unique objects in the sample
+        """
+
+        return (self.threshold + 1) / (1 << 64)
+
+    def is_exact(self):
+        """
+        :return: True if all objects are in the sample
+        """
+
+        return self.threshold == U64_MASK
+
+    def get_num_of_obj_with_freq(self, freq):
+        """
+        :param freq: the frequency
+        :return: the number of objects in the sample with the given frequency
+        """
+
+        return sum(1 for count in self.freq.values() if count == freq)
+
+    def __len__(self):
+        return len(self.freq)
@@ -252,7 +252,7 @@ setup(
     url="http://mimircache.info",
 
     ext_modules=extensions,
-    install_requires=["heapdict", "mmh3", "matplotlib", "numpy"]
+    install_requires=["mmh3", "matplotlib", "numpy"]
 )
 
 
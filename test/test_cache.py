@@ -0,0 +1,202 @@
+# coding=utf-8
+"""
+this module tests the python cache replacement algorithms against each other and the profilers
+
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import random
+import unittest
+import numpy as np
+
+from PyMimircache.cacheReader.vscsiReader import VscsiReader
+from PyMimircache.cache.lru import LRU
+from PyMimircache.cache.fifo import FIFO
+from PyMimircache.cache.random import Random
+from PyMimircache.cache.slru import SLRU
+from PyMimircache.cache.s4lru import S4LRU
+from PyMimircache.cache.skLRU import SkLRU
+from PyMimircache.cache.optimal import Optimal
+from PyMimircache.cache.clock import Clock
+from PyMimircache.cache.kClock import KClock
+from PyMimircache.cache.clockPro import ClockPro
+from PyMimircache.cache.arc import ARC
+from PyMimircache.cache.car import CAR
+from PyMimircache.cache.arrayLRU import ArrayLRU
+from PyMimircache.cache.arrayFIFO import ArrayFIFO
+from PyMimircache.profiler.pyGeneralProfiler import PyGeneralProfiler
+from PyMimircache.profiler.optStackDistance import get_opt_stack_dist
+
+
+DAT_FOLDER = "../data/"
+if not os.path.exists(DAT_FOLDER):
+    if os.path.exists("data/"):
+        DAT_FOLDER = "data/"
+    elif os.path.exists("../PyMimircache/data/"):
+        DAT_FOLDER = "../PyMimircache/data/"
+
+
+class CacheTest(unittest.TestCase):
+    def test_array_cache(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER), label_table=True)
+        ids = reader.read_batch(reader.get_num_of_req(), ("label", ))["label"].tolist()
+        for cache_class, array_cache_class in ((LRU, ArrayLRU), (FIFO, ArrayFIFO)):
+            for cache_size in (1, 200, 5000):
+                cache = cache_class(cache_size)
+                # start with a small id index to exercise growing
+                array_cache = array_cache_class(cache_size, num_of_ids=16)
+                hits = [cache.access(req_id) for req_id in ids]
+                self.assertEqual([array_cache.access(req_id) for req_id in ids], hits)
+                self.assertEqual(len(array_cache), len(cache))
+                self.assertTrue(all(array_cache.has(req_id) for req_id in cache.cacheline_dict))
+
+        array_cache = ArrayLRU(3)
+        for req_id in (1, 2, 3, 1):
+            array_cache.access(req_id)
+        self.assertEqual(array_cache.evict(), 2)
+        self.assertFalse(array_cache.has(2))
+        self.assertEqual(len(array_cache), 2)
+
+        # a negative id does not wrap around to the end of the id index
+        for array_cache_class in (ArrayLRU, ArrayFIFO):
+            array_cache = array_cache_class(4, num_of_ids=8)
+            array_cache.access(7)
+            self.assertFalse(array_cache.has(-1))
+            self.assertRaises(AssertionError, array_cache.access, -1)
+            self.assertTrue(array_cache.access(7))
+            self.assertEqual(len(array_cache), 1)
+
+        p = PyGeneralProfiler(reader, "ArrayLRU", cache_size=2000, bin_size=200, num_of_threads=os.cpu_count())
+        self.assertEqual(p.get_hit_count()[8], 158)
+        reader.close()
+
+    def test_access_batch(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        ids = reader.read_batch(reader.get_num_of_req(), ("label", ))["label"]
+        for cache_class, cache_params in ((LRU, {}), (FIFO, {}), (Random, {}), (SLRU, {}), (S4LRU, {}),
+                                          (Optimal, {"reader": reader}), (ArrayLRU, {})):
+            random.seed(0)
+            cache = cache_class(2000, **cache_params)
+            hits = [cache.access(req_id) for req_id in ids.tolist()]
+            random.seed(0)
+            cache = cache_class(2000, **cache_params)
+            batch_hits, num_of_evictions = zip(*[cache.access_batch(ids[i: i + 10000])
+                                                 for i in range(0, len(ids), 10000)])
+            self.assertEqual(np.concatenate(batch_hits).tolist(), hits, cache_class.__name__)
+            if cache_class != Optimal:
+                # Optimal does not insert objects that are not requested again
+                self.assertEqual(sum(num_of_evictions), len(hits) - sum(hits) - len(cache), cache_class.__name__)
+        reader.close()
+
+    def test_clock(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        ids = reader.read_batch(reader.get_num_of_req(), ("label", ))["label"]
+        reader.close()
+
+        for cache_class in (Clock, KClock, ClockPro):
+            cache = cache_class(2000)
+            hits = [cache.access(req_id) for req_id in ids.tolist()]
+            self.assertEqual(len(cache), 2000)
+            batch_hits, _ = cache_class(2000).access_batch(ids)
+            self.assertEqual(batch_hits.tolist(), hits, cache_class.__name__)
+            if cache_class == Clock:
+                self.assertEqual(sum(hits), 19565)
+            elif cache_class == ClockPro:
+                self.assertEqual(sum(hits), 21208)
+
+        # the referenced objects get a second chance
+        cache = Clock(3)
+        for req_id in (1, 2, 3, 4, 2, 5):
+            cache.access(req_id)
+        self.assertTrue(cache.has(2))
+        self.assertFalse(cache.has(3))
+        self.assertEqual(cache.evict(), 2)
+        self.assertFalse(cache.access(6))
+        self.assertEqual(sorted(cache.slot_dict), [4, 5, 6])
+
+        # with 2 bits, an object hit twice survives a round of the hand that evicts it with 1 bit
+        for cache_class, survived in ((Clock, False), (KClock, True)):
+            cache = cache_class(2)
+            for req_id in (1, 1, 1, 2, 3):
+                cache.access(req_id)
+            self.assertEqual(cache.has(1), survived)
+
+    def test_arc(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        ids = reader.read_batch(reader.get_num_of_req(), ("label", ))["label"].tolist()
+        reader.close()
+
+        for cache_class, num_of_hits in ((ARC, 18631), (CAR, 18496)):
+            cache = cache_class(200)
+            hits = []
+            for req_id in ids:
+                hits.append(cache.access(req_id))
+                self.assertLessEqual(len(cache.t1) + len(cache.b1), 200)
+                self.assertLessEqual(len(cache) + len(cache.b1) + len(cache.b2), 400)
+            self.assertEqual(len(cache), 200)
+            self.assertTrue(0 <= cache.p <= 200)
+            self.assertTrue(cache.num_of_b1_hits > 0 and cache.num_of_b2_hits > 0)
+            self.assertEqual(sum(hits), num_of_hits, cache_class.__name__)
+
+        # a hit in B1 increases the target size of T1, then the LRU object of T2 is evicted
+        cache = ARC(2)
+        for req_id in (1, 2, 1, 3):
+            cache.access(req_id)
+        self.assertEqual(list(cache.b1), [2])
+        self.assertFalse(cache.access(2))
+        self.assertEqual((cache.p, cache.num_of_b1_hits), (1, 1))
+        self.assertEqual((list(cache.t1), list(cache.t2), list(cache.b2)), ([3], [2], [1]))
+
+        # CAR gives a second chance to the referenced object at the hand of T1
+        cache = CAR(2)
+        for req_id in (1, 2, 1, 3):
+            cache.access(req_id)
+        self.assertEqual((list(cache.t1), list(cache.t2), list(cache.b1)), ([3], [1], [2]))
+
+    def test_segmented_lru(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        ids = reader.read_batch(reader.get_num_of_req(), ("label", ))["label"].tolist()
+        reader.close()
+
+        for cache, num_of_hits in ((SLRU(2000), 20126), (SLRU(200, ratio=3), 16533), (S4LRU(200), 16577)):
+            self.assertEqual(sum(cache.access(req_id) for req_id in ids), num_of_hits)
+            self.assertEqual(len(cache), cache.cache_size)
+            self.assertEqual([len(segment) for segment in cache.segments], cache.segment_sizes)
+        self.assertEqual(SLRU(200, ratio=3).segment_sizes, [50, 150])
+
+        # with one segment it is LRU
+        lru, sklru = LRU(300), SkLRU(300, segment_ratios=(1, ))
+        self.assertEqual([sklru.access(req_id) for req_id in ids], [lru.access(req_id) for req_id in ids])
+
+        # a hit moves an object up one segment, the LRU object of a full segment moves down
+        cache = SkLRU(3, segment_ratios=(1, 1, 1))
+        for req_id in (1, 1, 1, 2, 2):
+            cache.access(req_id)
+        self.assertEqual([list(segment) for segment in cache.segments], [[], [2], [1]])
+        cache.access(2)
+        self.assertEqual([list(segment) for segment in cache.segments], [[], [1], [2]])
+        for req_id in (3, 4):
+            cache.access(req_id)
+        self.assertFalse(cache.has(3))
+        self.assertEqual(cache.evict(), 4)
+        self.assertEqual(cache.evict(), 1)
+
+    def test_optimal(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        opt_dist = get_opt_stack_dist(reader, 2000)
+        for cache_size in (1, 200, 2000):
+            cache = Optimal(cache_size, reader)
+            hits = [cache.access(req_id) for req_id in reader]
+            reader.reset()
+            self.assertEqual(hits, ((opt_dist > 0) & (opt_dist <= cache_size)).tolist())
+            self.assertLessEqual(len(cache), cache_size)
+            # outdated heap entries are dropped
+            self.assertLessEqual(len(cache.heap), 2 * cache_size + 1)
+        self.assertEqual(sum(hits), 32006)
+        reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+# coding=utf-8
+"""
+this module tests the derived data cache
+
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import unittest
+from PyMimircache.cacheReader.vscsiReader import VscsiReader
+from PyMimircache.cacheReader.plainReader import PlainReader
+from PyMimircache.profiler.utilProfiler import get_breakpoints, get_next_access_dist
+from PyMimircache.utils.derivedDataCache import trace_fingerprint, DerivedDataCache, get_derived_data_cache, set_derived_data_cache
+
+
+DAT_FOLDER = "../data/"
+if not os.path.exists(DAT_FOLDER):
+    if os.path.exists("data/"):
+        DAT_FOLDER = "data/"
+    elif os.path.exists("../PyMimircache/data/"):
+        DAT_FOLDER = "../PyMimircache/data/"
+
+
+class DerivedDataCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.old_cache = get_derived_data_cache()
+        self.cache = set_derived_data_cache(os.path.join(self.tmp_dir, "derived"))
+
+    def tearDown(self):
+        set_derived_data_cache(self.old_cache.cache_dir, self.old_cache.max_size, self.old_cache.enabled)
+        shutil.rmtree(self.tmp_dir)
+
+    def test_content_addressed(self):
+        copy_loc = os.path.join(self.tmp_dir, "copy.vscsi")
+        shutil.copy("{}/trace.vscsi".format(DAT_FOLDER), copy_loc)
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        copy_reader = VscsiReader(copy_loc)
+        self.assertEqual(self.cache.get_key(reader, "rd"), self.cache.get_key(copy_reader, "rd"))
+        self.assertNotEqual(self.cache.get_key(reader, "rd"), self.cache.get_key(reader, "frd"))
+        self.assertNotEqual(self.cache.get_key(reader, "rd"), self.cache.get_key(reader, "rd", {"begin": 1}))
+        self.assertNotEqual(self.cache.get_key(reader, "rd"),
+                            self.cache.get_key(PlainReader("{}/trace.txt".format(DAT_FOLDER)), "rd"))
+
+        data = np.arange(10)
+        self.assertTrue(self.cache.put(reader, "rd", data))
+        self.assertTrue(np.array_equal(self.cache.get(copy_reader, "rd"), data))
+        self.assertIsNone(self.cache.get(reader, "frd"))
+        self.assertTrue(self.cache.remove(reader, "rd"))
+        self.assertIsNone(self.cache.get(copy_reader, "rd"))
+        reader.close()
+        copy_reader.close()
+
+        # rewriting one record in the middle of the trace without changing its size misses the cache
+        self.assertGreater(os.path.getsize(copy_loc), 1 << 20)
+        fingerprint = trace_fingerprint(copy_loc)
+        stat = os.stat(copy_loc)
+        with open(copy_loc, "r+b") as ofile:
+            ofile.seek(87500 * 4)
+            record = ofile.read(4)
+            ofile.seek(87500 * 4)
+            ofile.write(bytes(255 - b for b in record))
+        os.utime(copy_loc, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertEqual(os.path.getsize(copy_loc), stat.st_size)
+        self.assertNotEqual(trace_fingerprint(copy_loc), fingerprint)
+
+    def test_eviction(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        cache = DerivedDataCache(self.cache.cache_dir, max_size=3000)
+        for i in range(3):
+            cache.put(reader, "data", np.zeros(100, dtype=np.int64), {"i": i})
+            # make sure the modification times differ
+            os.utime(cache._get_path(reader, "data", {"i": i}), ns=(i * 10 ** 9, i * 10 ** 9))
+        cache.get(reader, "data", {"i": 0})
+        cache.put(reader, "data", np.zeros(100, dtype=np.int64), {"i": 3})
+        self.assertIsNotNone(cache.get(reader, "data", {"i": 0}))
+        self.assertIsNone(cache.get(reader, "data", {"i": 1}))
+        self.assertIsNotNone(cache.get(reader, "data", {"i": 3}))
+        reader.close()
+
+    def test_derived_data(self):
+        reader = PlainReader("{}/trace.txt".format(DAT_FOLDER))
+        requests = list(reader)
+        reader.reset()
+        last_pos, expected = {}, [-1] * len(requests)
+        for i, req in enumerate(requests):
+            if req in last_pos:
+                expected[last_pos[req]] = i - last_pos[req]
+            last_pos[req] = i
+        self.assertEqual(get_next_access_dist(reader).tolist(), expected)
+        self.assertEqual(get_next_access_dist(reader).tolist(), expected)
+
+        bp = get_breakpoints(reader, "v", 1000)
+        self.assertEqual(get_breakpoints(reader, "v", 1000), bp)
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 2)
+        reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
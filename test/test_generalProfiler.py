@@ -10,6 +10,7 @@ import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 import unittest
+import numpy as np
 
 from PyMimircache.cacheReader.csvReader import CsvReader
 from PyMimircache.cacheReader.plainReader import PlainReader
@@ -18,6 +19,8 @@ from PyMimircache.cacheReader.binaryReader import BinaryReader
 
 from PyMimircache.profiler.cGeneralProfiler import CGeneralProfiler
 from PyMimircache.profiler.pyGeneralProfiler import PyGeneralProfiler
+from PyMimircache.profiler.optStackDistance import get_opt_stack_dist
+from PyMimircache.cache.optimal import Optimal
 
 
 
@@ -145,6 +148,23 @@ class GeneralProfilerTest(unittest.TestCase):
         p2.plotHRC(figname="test_b_py.png", cache_unit_size=32*1024)
         reader.close()
 
+    def test_Optimal_one_pass(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        dist = get_opt_stack_dist(reader, 2000)
+        ids = reader.read_batch(reader.get_num_of_req(), ("label", ))["label"]
+        reader.reset()
+        for cache_size in (1, 50, 2000):
+            hits, _ = Optimal(cache_size, reader).access_batch(ids)
+            self.assertEqual(np.count_nonzero((dist > 0) & (dist <= cache_size)), np.count_nonzero(hits))
+
+        p = PyGeneralProfiler(reader, "Optimal", cache_size=2000, bin_size=200)
+        hc = p.get_hit_count()
+        self.assertEqual(hc[0], 0)
+        self.assertEqual(hc[1], 21163)
+        self.assertEqual(sum(hc), 32006)
+        self.assertAlmostEqual(p.get_hit_ratio()[-1], 32006 / reader.get_num_of_req())
+        reader.close()
+
 
 if __name__ == "__main__":
     unittest.main()
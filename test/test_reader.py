@@ -8,14 +8,33 @@ Author: Jason Yang <peter.waynechina@gmail.com> 2016/08
 
 import os
 import sys
+import gzip
+import struct
+import pickle
+import shutil
+import tempfile
+import numpy as np
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 import unittest
 import PyMimircache.CMimircache.CacheReader as c_cacheReader
-from PyMimircache.cacheReader.csvReader import CsvReader
+from PyMimircache.cacheReader.csvReader import CsvReader, split_csv_block
 from PyMimircache.cacheReader.plainReader import PlainReader
 from PyMimircache.cacheReader.vscsiReader import VscsiReader
 from PyMimircache.cacheReader.binaryReader import BinaryReader
+from PyMimircache.cacheReader.traceCompactor import compact_trace, open_compacted_trace, load_label_dict
+from PyMimircache.cacheReader.labelTable import LabelTable
+from PyMimircache.cacheReader.compressedFile import compress_trace, split_regions, BlockCompressedFile, \
+    detect_compression
+from PyMimircache.cacheReader.traceShards import count_in_shards, split_shards
+from PyMimircache.cacheReader.traceStat import TraceStat
+from PyMimircache.cacheReader.timeSliceReader import TimeSliceReader
+from PyMimircache.cacheReader.mergedReader import MergedReader
+from PyMimircache.cacheReader.prefetchReader import PrefetchReader
+from PyMimircache.cacheReader.requestItem import Req, RequestBatch
+from PyMimircache.cache.lru import LRU
+from PyMimircache.profiler.utilProfiler import get_breakpoints
+from PyMimircache.utils.derivedDataCache import get_derived_data_cache, set_derived_data_cache
 
 DAT_FOLDER = "../data/"
 if not os.path.exists(DAT_FOLDER):
@@ -130,6 +149,23 @@ class PyReaderTest(unittest.TestCase):
         line = reader.read_complete_req()
         self.assertListEqual(line, [2147483880, 512, 1, 42, 256, 42932747, 5633898745540])
 
+    def test_reader_binary_mmap(self):
+        reader = BinaryReader("{}/trace.vscsi".format(DAT_FOLDER), data_type='l',
+                              init_params={"label": 6, "real_time": 7, "size": 2, "fmt": "<3I2H2Q"})
+        labels = reader.labels()
+        self.assertEqual(len(labels), 113872)
+        self.assertEqual(labels[0], 42932745)
+        self.assertTrue(labels.base is not None)
+        self.assertAlmostEqual(float(reader.timestamps()[1]), 5633898611441.0)
+        self.assertEqual(reader.sizes()[0], 512)
+
+        # columnar access does not move the read position
+        self.assertEqual(int(reader.read_one_req()), 42932745)
+        reader.close()
+
+        with VscsiReader("{}/trace.vscsi".format(DAT_FOLDER)) as reader:
+            self.assertListEqual(list(reader.labels()[:3]), [42932745, 42932746, 42932747])
+
     def test_reader_csv(self):
         reader = CsvReader("{}/trace.csv".format(DAT_FOLDER),
                            init_params={"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5,
@@ -199,6 +235,365 @@ class PyReaderTest(unittest.TestCase):
         for req1, req2 in zip(v_reader, c_reader):
             self.assertEqual(req1, req2)
 
+    def test_read_batch(self):
+        readers = [PlainReader("{}/trace.txt".format(DAT_FOLDER), data_type="l"),
+                   CsvReader("{}/trace.csv".format(DAT_FOLDER), data_type="l",
+                             init_params={"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5,
+                                          'delimiter': ','}),
+                   VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))]
+        for reader in readers:
+            batch = reader.read_batch(3)
+            self.assertListEqual(batch["label"].tolist(), [42932745, 42932746, 42932747])
+            if reader.support_real_time:
+                self.assertAlmostEqual(float(batch["time"][1]), 5633898611441.0)
+            num_of_req = len(batch["label"]) + \
+                         sum(len(b["label"]) for b in reader.iter_batches(10000, fields=("label", )))
+            self.assertEqual(num_of_req, 113872)
+            self.assertIsNone(reader.read_batch(10))
+            reader.reset()
+            self.assertEqual(int(reader.read_one_req()), 42932745)
+            reader.close()
+
+    def test_split_csv_block(self):
+        block = b"1, 5633898368802,2a,512,42932745\r\n\r\n  \n1,5633898611441,2a,512,42932746"
+        line_begins, tokens = split_csv_block(block, b",", [2, 5])
+        self.assertEqual(len(line_begins), 2)
+        self.assertListEqual(tokens[5].astype(int).tolist(), [42932745, 42932746])
+        self.assertListEqual(tokens[2].astype(float).tolist(), [5633898368802.0, 5633898611441.0])
+
+        # a long field does not make the other fields as wide as it, they are sliced line by line
+        urls = ["http://cdn/{}{}".format(i, "x" * (1000 if i % 100 == 0 else i % 7)) for i in range(3000)]
+        _, tokens = split_csv_block("".join("{},{},GET\n".format(i, url) for i, url in enumerate(urls)).encode(),
+                                    b",", [1, 2])
+        self.assertEqual(tokens[2].dtype, object)
+        self.assertListEqual(tokens[2].tolist(), [url.encode() for url in urls])
+        self.assertEqual(tokens[1].dtype.itemsize, 4)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            trace_loc = os.path.join(tmp_dir, "cdn.csv")
+            with open(trace_loc, "w") as ofile:
+                for i, url in enumerate(urls):
+                    ofile.write("{},{},{}\n".format(i, url, "GET" if i < 2000 else "GET" + " " * 200))
+            reader = CsvReader(trace_loc, init_params={"real_time": 1, "label": 2, "op": 3, "delimiter": ","})
+            batches = list(reader.iter_batches(700))
+            self.assertListEqual(np.concatenate([batch["label"] for batch in batches]).tolist(), urls)
+            self.assertEqual(set(np.concatenate([batch["op"] for batch in batches]).tolist()), {"GET"})
+            reader.reset()
+            self.assertListEqual(list(reader), urls)
+            reader.close()
+
+    def test_compact_trace(self):
+        reader = CsvReader("{}/trace.csv".format(DAT_FOLDER),
+                           init_params={"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5,
+                                        'delimiter': ','})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_path = os.path.join(tmp_dir, "trace.compact")
+            meta = compact_trace(reader, out_path)
+            self.assertEqual(meta["num_of_req"], 113872)
+            self.assertEqual(meta["num_of_uniq_req"], 48974)
+
+            compacted_reader = open_compacted_trace(out_path, open_c_reader=False)
+            self.assertEqual(compacted_reader.get_num_of_uniq_req(), 48974)
+            self.assertListEqual(compacted_reader.read_complete_req(), [1, 5633898368802, 512, 1])
+            label_dict = load_label_dict(out_path)
+            self.assertListEqual(label_dict[compacted_reader.labels()[:3] - 1].tolist(),
+                                 ["42932745", "42932746", "42932747"])
+            compacted_reader.close()
+        reader.close()
+
+        # large or negative sizes and fractional timestamps are kept as they are
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            trace_path = os.path.join(tmp_dir, "trace.csv")
+            times = [0.25, 1.5, 2.75, 1e9 + 0.125]
+            sizes = [5 << 30, 512, -1, 1 << 40]
+            with open(trace_path, "w") as ofile:
+                for i, (t, size) in enumerate(zip(times, sizes)):
+                    ofile.write("{},{},{}\n".format(t, size, i))
+            reader = CsvReader(trace_path, init_params={"real_time": 1, "size": 2, "label": 3, "delimiter": ","})
+            out_path = os.path.join(tmp_dir, "trace.compact")
+            meta = compact_trace(reader, out_path)
+            self.assertEqual(meta["init_params"]["fmt"], "<Idq")
+            self.assertEqual(meta["time_span"], 1e9 + 0.125 - 0.25)
+            compacted_reader = open_compacted_trace(out_path, open_c_reader=False)
+            batch = compacted_reader.read_batch(10)
+            self.assertListEqual(batch["time"].tolist(), times)
+            self.assertListEqual(batch["size"].tolist(), sizes)
+            compacted_reader.close()
+
+            # the fmt chosen from the first batch cannot hold later values
+            self.assertRaises(RuntimeError, compact_trace, reader, out_path, batch_size=1)
+            reader.close()
+
+    def test_label_table(self):
+        reader = CsvReader("{}/trace.csv".format(DAT_FOLDER), label_table=True,
+                           init_params={"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5,
+                                        'delimiter': ','})
+        self.assertListEqual([reader.read_one_req() for _ in range(3)], [1, 2, 3])
+        batch = reader.read_batch(10000)
+        self.assertEqual(batch["label"].dtype.kind, "i")
+        reader.reset()
+        self.assertListEqual(batch["label"][:100].tolist(), [reader.read_one_req() for _ in range(103)][3:])
+        reader.close()
+
+        # readers sharing one table emit the same ids
+        label_table = LabelTable()
+        v_reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER), label_table=label_table)
+        p_reader = PlainReader("{}/trace.txt".format(DAT_FOLDER), data_type='l', label_table=label_table)
+        for req1, req2 in zip(v_reader, p_reader.copy()):
+            self.assertEqual(req1, req2)
+        self.assertEqual(len(label_table), 48974)
+        self.assertEqual(label_table.get_label(1), 42932745)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            label_table.save(os.path.join(tmp_dir, "labels.npy"))
+            loaded_table = LabelTable.load(os.path.join(tmp_dir, "labels.npy"))
+            self.assertEqual(len(loaded_table), 48974)
+            self.assertEqual(loaded_table.get_id(42932746), 2)
+        v_reader.close()
+        p_reader.close()
+
+    def test_compressed_trace(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            gz_loc = os.path.join(tmp_dir, "trace.csv.gz")
+            block_loc = os.path.join(tmp_dir, "trace.csv.blk")
+            with open("{}/trace.csv".format(DAT_FOLDER), "rb") as ifile, gzip.open(gz_loc, "wb") as ofile:
+                ofile.write(ifile.read())
+            index = compress_trace(gz_loc, block_loc, block_size=1 << 16)
+            self.assertEqual(sum(block[3] for block in index["blocks"]), 113873)
+
+            for file_loc in (gz_loc, block_loc):
+                reader = CsvReader(file_loc, data_type="l",
+                                   init_params={"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5,
+                                                'delimiter': ','})
+                self.assertEqual(reader.get_num_of_req(), 113872)
+                batch = reader.read_batch(3)
+                self.assertListEqual(batch["label"].tolist(), [42932745, 42932746, 42932747])
+                self.assertEqual(sum(len(b["label"]) for b in reader.iter_batches(10000)), 113872 - 3)
+                reader.reset()
+                self.assertEqual(reader.read_one_req(), 42932745)
+                copied_reader = reader.copy()
+                self.assertEqual(copied_reader.read_one_req(), 42932745)
+                copied_reader.close()
+                reader.close()
+
+            regions = split_regions(block_loc, 4)
+            self.assertEqual(len(regions), 4)
+            num_of_lines = 0
+            for region in regions:
+                with BlockCompressedFile(block_loc, region=region) as region_file:
+                    num_of_lines += sum(1 for _ in region_file)
+            self.assertEqual(num_of_lines, 113873)
+
+            # an uncompressed binary trace beginning with the gzip magic is not taken as gzip
+            binary_loc = os.path.join(tmp_dir, "trace.bin")
+            with open(binary_loc, "wb") as ofile:
+                ofile.write(struct.pack("<II", 0x8b1f, 1) + struct.pack("<II", 2, 2))
+            self.assertIsNone(detect_compression(binary_loc))
+            reader = BinaryReader(binary_loc, init_params={"label": 1, "real_time": 2, "fmt": "<II"})
+            self.assertListEqual(list(reader), [0x8b1f, 2])
+            reader.close()
+            self.assertEqual(detect_compression(gz_loc), "gzip")
+            self.assertEqual(detect_compression(block_loc), "block")
+
+    def test_set_read_pos(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shutil.copy("{}/trace.csv".format(DAT_FOLDER), tmp_dir)
+            reader = CsvReader(os.path.join(tmp_dir, "trace.csv"), data_type="l",
+                               init_params={"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5,
+                                            'delimiter': ','})
+            requests = list(reader)
+            for pos in (0, 1, 1024, 1025, 100000, 113871):
+                reader.set_read_pos(pos)
+                self.assertEqual(reader.read_one_req(), requests[pos])
+            reader.set_read_pos(113872)
+            self.assertIsNone(reader.read_one_req())
+
+            reader.set_read_pos(10)
+            reader.skip_n_req(5000)
+            self.assertEqual(reader.read_one_req(), requests[5010])
+            self.assertTrue(os.path.exists(os.path.join(tmp_dir, "trace.csv.offsets.npz")))
+            reader.close()
+
+            # the saved index is reused
+            reader = CsvReader(os.path.join(tmp_dir, "trace.csv"), data_type="l",
+                               init_params={"header": True, "label": 5, 'delimiter': ','})
+            self.assertIsNotNone(reader.get_offset_index())
+            self.assertEqual(reader.get_num_of_req(), 113872)
+            reader.close()
+
+    def test_time_slice_reader(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shutil.copy("{}/trace.vscsi".format(DAT_FOLDER), tmp_dir)
+            shutil.copy("{}/trace.csv".format(DAT_FOLDER), tmp_dir)
+            vscsi_reader = VscsiReader(os.path.join(tmp_dir, "trace.vscsi"))
+            csv_reader = CsvReader(os.path.join(tmp_dir, "trace.csv"),
+                                   init_params={"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5,
+                                                'delimiter': ','})
+            for reader in (vscsi_reader, csv_reader):
+                times = np.concatenate([batch["time"] for batch in reader.iter_batches(fields=("time", ))])
+                reader.reset()
+                requests = list(reader)
+                start_ts, end_ts = times[0] + 1e9, times[0] + 2e9
+                begin = int(np.searchsorted(times, start_ts))
+                end = int(np.searchsorted(times, end_ts))
+
+                slice_reader = TimeSliceReader(reader, start_ts, end_ts)
+                self.assertEqual(slice_reader.get_begin_pos(), begin)
+                self.assertEqual(list(slice_reader), requests[begin:end])
+                slice_reader.reset()
+                self.assertEqual(slice_reader.read_time_req(), (times[begin].item(), requests[begin]))
+                self.assertEqual(slice_reader.get_num_of_req(), end - begin)
+                self.assertEqual(TimeSliceReader(reader, end_ts).get_num_of_req(), len(requests) - end)
+                self.assertTrue(os.path.exists(reader.file_loc + ".times.npz"))
+                # an empty time slice has no break point other than 0, computed without the derived data cache
+                empty_reader = TimeSliceReader(reader, times[-1] + 1)
+                self.assertEqual(empty_reader.get_num_of_req(), 0)
+                old_cache = get_derived_data_cache()
+                set_derived_data_cache(enabled=False)
+                try:
+                    self.assertEqual(get_breakpoints(empty_reader, "r", 1e6), [0])
+                finally:
+                    set_derived_data_cache(old_cache.cache_dir, old_cache.max_size, old_cache.enabled)
+                reader.close()
+
+    def test_merged_reader(self):
+        csv_params = {"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5, 'delimiter': ','}
+        readers = [VscsiReader("{}/trace.vscsi".format(DAT_FOLDER)),
+                   CsvReader("{}/trace.csv".format(DAT_FOLDER), init_params=csv_params)]
+        expected = []
+        for ind, reader in enumerate(readers):
+            for n, (t, req) in enumerate(iter(reader.read_time_req, None)):
+                expected.append((t, ind, n, "{}:{}".format(ind, req)))
+            reader.reset()
+        expected.sort()
+
+        merged_reader = MergedReader(readers, namespace=True, buffer_size=1000)
+        self.assertEqual(merged_reader.get_num_of_req(), 227744)
+        batches = list(merged_reader.iter_batches(fields=("label", "time")))
+        self.assertEqual(np.concatenate([batch["time"] for batch in batches]).tolist(),
+                         [t for t, _, _, _ in expected])
+        self.assertEqual(np.concatenate([batch["source"] for batch in batches]).tolist(),
+                         [ind for _, ind, _, _ in expected])
+        merged_reader.reset()
+        self.assertEqual(list(merged_reader), [req for _, _, _, req in expected])
+        merged_reader.reset()
+        self.assertEqual(merged_reader.read_time_req(), (expected[0][0], expected[0][3]))
+        merged_reader.close()
+
+        # a field is left out if any source does not provide it, whatever the order of sources
+        csv_params = {"header": True, "real_time": 2, 'label': 5, 'delimiter': ','}
+        for vscsi_first in (True, False):
+            readers = [VscsiReader("{}/trace.vscsi".format(DAT_FOLDER)),
+                       CsvReader("{}/trace.csv".format(DAT_FOLDER), init_params=csv_params)]
+            if not vscsi_first:
+                readers.reverse()
+            merged_reader = MergedReader(readers, buffer_size=1000)
+            batches = list(merged_reader.iter_batches(1000))
+            self.assertEqual(sum(len(batch["label"]) for batch in batches), 227744)
+            self.assertTrue(all(set(batch) == {"label", "time", "source"} for batch in batches))
+            merged_reader.close()
+
+    def test_prefetch_reader(self):
+        reader = CsvReader("{}/trace.csv".format(DAT_FOLDER),
+                           init_params={"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5,
+                                        'delimiter': ','})
+        requests = list(reader)
+        reader.reset()
+        prefetch_reader = PrefetchReader(reader, batch_size=1000, depth=2, fields=("label", "time"))
+        batches = list(prefetch_reader.iter_batches(777, fields=("label", "size")))
+        self.assertEqual(set(batches[0]), {"label"})
+        self.assertEqual(len(batches[0]["label"]), 777)
+        self.assertEqual(np.concatenate([batch["label"] for batch in batches]).tolist(), requests)
+        stats = prefetch_reader.get_stats()
+        self.assertEqual(stats["num_of_batches"], 114)
+        self.assertLessEqual(stats["max_buffer_depth"], 2)
+
+        prefetch_reader.reset()
+        prefetch_reader.read_batch(10)
+        prefetch_reader.reset()
+        self.assertEqual(list(prefetch_reader), requests)
+        self.assertEqual(prefetch_reader.get_num_of_req(), 113872)
+        prefetch_reader.close()
+
+    def test_vscsi_column_helpers(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        records = list(reader.lines())
+        reader.reset()
+        sizes = [record[1] for record in records]
+        times = [record[6] for record in records]
+        self.assertEqual(reader.get_timestamp_list().tolist(), times)
+        self.assertEqual(reader.get_size_list().tolist(), sizes)
+        self.assertEqual(reader.get_op_list().tolist(), [record[3] for record in records])
+        self.assertAlmostEqual(reader.get_average_size(), sum(sizes) / len(sizes))
+        self.assertEqual(reader.get_size_percentile(50), np.percentile(sizes, 50, method="lower"))
+        self.assertEqual(reader.get_size_percentile([0, 100]).tolist(), [min(sizes), max(sizes)])
+
+        ratio = reader.get_read_write_ratio()
+        self.assertAlmostEqual(ratio["read"], sum(record[3] == 0x28 for record in records) / len(records))
+        self.assertAlmostEqual(ratio["read"] + ratio["write"] + ratio["other"], 1)
+        inter_arrival, counts = reader.get_inter_arrival_distribution()
+        self.assertEqual(np.sum(counts), len(records) - 1)
+        self.assertEqual(np.sum(inter_arrival * counts), times[-1] - times[0])
+        reader.close()
+
+    def test_count_in_shards(self):
+        reader = CsvReader("{}/trace.csv".format(DAT_FOLDER),
+                           init_params={"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5,
+                                        'delimiter': ','})
+        shards = split_shards(reader, 4)
+        self.assertEqual(len(shards), 4)
+        self.assertEqual(shards[0][0], reader.data_begin)
+        num_of_req, freq = count_in_shards(reader, with_freq=True, num_of_threads=2, shard_size=1 << 20)
+        self.assertEqual(num_of_req, 113872)
+        self.assertEqual(len(freq), 48974)
+        self.assertEqual(sum(freq.values()), 113872)
+        self.assertEqual(freq, reader.get_req_freq_distribution())
+        reader.close()
+
+    def test_lazy_construction(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        self.assertIsNone(reader._lock)
+        self.assertIsNone(reader._c_reader)
+        # parameters can be sent to worker processes
+        copied_reader = VscsiReader(**pickle.loads(pickle.dumps(reader.get_params())))
+        self.assertEqual(copied_reader.get_num_of_req(), 113872)
+        self.assertIs(reader.copy().lock, reader.lock)
+        copied_reader.close()
+        reader.close()
+
+    def test_approximate_trace_stat(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        stat = TraceStat(reader, approximate=True, error=0.02)
+        self.assertEqual(stat.num_of_requests, 113872)
+        self.assertEqual(stat.time_span, 7200089885)
+        self.assertLessEqual(abs(stat.num_of_uniq_obj - 48974), stat.error_bounds["num_of_uniq_obj"])
+        self.assertLessEqual(abs(stat.num_of_obj_with_freq_1 - 21049), stat.error_bounds["num_of_obj_with_freq_1"])
+        top = dict(stat.get_top_N())
+        for obj, freq in [(3345071, 1630), (6160447, 1342), (6160455, 1341), (1313767, 652)]:
+            self.assertIn(obj, top)
+            self.assertGreaterEqual(top[obj], freq)
+            self.assertLessEqual(top[obj], freq + stat.error_bounds["top_N_popular_obj"])
+        reader.close()
+
+    def test_request_batch(self):
+        reader = CsvReader("{}/trace.csv".format(DAT_FOLDER),
+                           init_params={"header": True, "real_time": 2, "op": 3, "size": 4, 'label': 5,
+                                        'delimiter': ','})
+        batch = next(reader.iter_request_batches(n=100))
+        self.assertEqual(len(batch), 100)
+        self.assertIsNone(batch.costs)
+        req = batch[0]
+        self.assertEqual(req.item_id, "42932745")
+        self.assertEqual(req.size, int(batch.sizes[0]))
+        self.assertFalse(hasattr(req, "__dict__"))
+        self.assertEqual(len(batch[batch.ids == "42932745"]), int(np.sum(batch.ids == "42932745")))
+        self.assertEqual(list(RequestBatch.from_reqs([batch[i] for i in range(10)]).ids), list(batch.ids[:10]))
+
+        cache = LRU(2)
+        self.assertFalse(cache.access_req(Req(1)))
+        self.assertTrue(cache.access(1))
+        reader.close()
+
     def test_context_manager(self):
         with VscsiReader("{}/trace.vscsi".format(DAT_FOLDER)) as reader:
             self.assertEqual(reader.get_num_of_req(), 113872)
@@ -0,0 +1,63 @@
+# coding=utf-8
+"""
+this module provides unittest for SamplingReader and PyShardsProfiler
+
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import unittest
+import numpy as np
+
+from PyMimircache.cacheReader.vscsiReader import VscsiReader
+from PyMimircache.cacheReader.samplingReader import SamplingReader
+from PyMimircache.profiler.pyShardsProfiler import PyShardsProfiler
+
+
+DAT_FOLDER = "../data/"
+if not os.path.exists(DAT_FOLDER):
+    if os.path.exists("data/"):
+        DAT_FOLDER = "data/"
+    elif os.path.exists("../PyMimircache/data/"):
+        DAT_FOLDER = "../PyMimircache/data/"
+
+
+class ShardsProfilerTest(unittest.TestCase):
+    def test_sampling_reader(self):
+        reader = SamplingReader(VscsiReader("{}/trace.vscsi".format(DAT_FOLDER)), sample_rate=0.1)
+        labels = [req for req in reader]
+        self.assertEqual(len(labels), reader.get_num_of_req())
+        self.assertEqual(reader.get_num_of_scanned_req(), 0)
+        # all requests of a sampled object are kept
+        freq = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER)).get_req_freq_distribution()
+        for label in set(labels[:100]):
+            self.assertEqual(labels.count(label), freq[label])
+        self.assertAlmostEqual(len(set(labels)) / len(freq), 0.1, delta=0.01)
+
+        reader = SamplingReader(VscsiReader("{}/trace.vscsi".format(DAT_FOLDER)), sample_rate=1, sample_size=1000)
+        for _ in reader.iter_batches():
+            pass
+        self.assertLess(reader.get_sample_rate(), 0.05)
+        self.assertEqual(len(reader._sampled_hashes), 1000)
+        reader.close()
+
+    def test_shards_profiler(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        # without sampling the hit ratio is the same as LRU
+        hr = PyShardsProfiler(reader, cache_size=2000, sample_rate=1).get_hit_ratio()
+        self.assertEqual(len(hr), 2003)
+        self.assertAlmostEqual(hr[0], 0.0)
+        self.assertAlmostEqual(hr[200], 0.14751651)
+        self.assertAlmostEqual(hr[2000], 0.17285197)
+        self.assertAlmostEqual(hr[-1], 48974 / 113872)
+
+        exact = PyShardsProfiler(reader, cache_size=20000, sample_rate=1).get_hit_ratio()
+        for kwargs in [{"sample_rate": 0.1}, {"sample_rate": 1, "sample_size": 2000}]:
+            p = PyShardsProfiler(reader, cache_size=20000, **kwargs)
+            self.assertLess(np.mean(np.abs(p.get_hit_ratio()[:-2] - exact[:-2])), 0.03)
+        reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
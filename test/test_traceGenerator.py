@@ -0,0 +1,98 @@
+# coding=utf-8
+"""
+this module tests TraceWriter and the synthetic workload generators
+
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import unittest
+from PyMimircache.cacheReader.vscsiReader import VscsiReader
+from PyMimircache.cacheReader.binaryReader import BinaryReader
+from PyMimircache.cacheReader.traceWriter import TraceWriter
+from PyMimircache.cacheReader.traceGenerator import ZipfGenerator, ScanGenerator, LoopGenerator, \
+    ShiftingGenerator, MixtureGenerator, generate_batches, generate_trace
+
+
+DAT_FOLDER = "../data/"
+if not os.path.exists(DAT_FOLDER):
+    if os.path.exists("data/"):
+        DAT_FOLDER = "data/"
+    elif os.path.exists("../PyMimircache/data/"):
+        DAT_FOLDER = "../PyMimircache/data/"
+
+
+class TraceGeneratorTest(unittest.TestCase):
+    def test_trace_writer(self):
+        reader = VscsiReader("{}/trace.vscsi".format(DAT_FOLDER))
+        batch = reader.read_batch(5000)
+        reader.close()
+        init_params = {"label": 2, "real_time": 1, "size": 4, "op": 5, "fmt": "<qQIxIB"}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            trace_loc = os.path.join(tmp_dir, "trace.bin")
+            writer = TraceWriter(trace_loc, init_params, buffer_size=1000)
+            for i in range(10):
+                writer.write(batch["label"][i], batch["time"][i], batch["size"][i], batch["op"][i])
+            writer.write_batch({field: column[10:700] for field, column in batch.items()})
+            writer.write_batch({field: column[700:] for field, column in batch.items()})
+            self.assertEqual(writer.num_of_req, 5000)
+
+            binary_reader = writer.get_reader()
+            self.assertEqual(binary_reader.get_num_of_req(), 5000)
+            written = binary_reader.read_batch(5000)
+            for field in ("label", "time", "size", "op"):
+                self.assertEqual(written[field].tolist(), batch[field].tolist())
+            self.assertTrue(np.all(binary_reader.get_records()["f3"] == 0))
+            binary_reader.close()
+
+    def test_generators(self):
+        rng = np.random.default_rng(0)
+        labels = ZipfGenerator(100, alpha=1.0)(200000, rng)
+        self.assertEqual(labels.min(), 1)
+        self.assertLessEqual(labels.max(), 100)
+        freq = np.bincount(labels, minlength=101)[1:] / len(labels)
+        expected = 1 / np.arange(1, 101)
+        self.assertLess(np.max(np.abs(freq - expected / np.sum(expected))), 0.01)
+
+        scan = ScanGenerator(start=10)
+        self.assertEqual(np.concatenate([scan(3, rng), scan(2, rng)]).tolist(), [10, 11, 12, 13, 14])
+        loop = LoopGenerator(3)
+        self.assertEqual(np.concatenate([loop(4, rng), loop(4, rng)]).tolist(), [1, 2, 3, 1, 2, 3, 1, 2])
+        shifting = ShiftingGenerator(10, shift_interval=100, shift_size=5)(300, rng)
+        self.assertTrue(np.all(shifting[:100] <= 10) and np.all(shifting[200:] > 10))
+
+        mixture = MixtureGenerator([ScanGenerator(1000), LoopGenerator(10)], weights=[1, 3])(10000, rng)
+        scanned = mixture[mixture >= 1000]
+        self.assertEqual(scanned.tolist(), list(range(1000, 1000 + len(scanned))))
+        self.assertAlmostEqual(len(scanned) / len(mixture), 0.25, delta=0.02)
+
+        batches = list(generate_batches(1000, LoopGenerator(10), arrival_rate=1000, seed=1, chunk_size=300))
+        self.assertEqual([len(batch["label"]) for batch in batches], [300, 300, 300, 100])
+        times = np.concatenate([batch["time"] for batch in batches])
+        self.assertTrue(np.all(np.diff(times) >= 0))
+        self.assertNotIn("size", batches[0])
+
+    def test_generate_trace(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            trace_loc = os.path.join(tmp_dir, "zipf.bin")
+            init_params = generate_trace(trace_loc, 100000, ZipfGenerator(1000, 0.8), seed=2, chunk_size=30000)
+            reader = BinaryReader(trace_loc, init_params, data_type="l")
+            self.assertEqual(reader.get_num_of_req(), 100000)
+            batch = {field: np.array(column) for field, column in reader.read_batch(100000).items()}
+            self.assertLessEqual(len(np.unique(batch["label"])), 1000)
+            self.assertAlmostEqual(np.mean(batch["op"]), 0.3, delta=0.01)
+            self.assertTrue(np.all(np.diff(batch["time"]) >= 0))
+            reader.close()
+
+            generate_trace(trace_loc, 100000, ZipfGenerator(1000, 0.8), seed=2, chunk_size=30000)
+            reader = BinaryReader(trace_loc, init_params, data_type="l")
+            self.assertEqual(reader.read_batch(100000)["label"].tolist(), batch["label"].tolist())
+            reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()